@@ -9,6 +9,14 @@ class DynamicArrayException(Exception):
     pass
 
 
+class ConcurrentModificationException(RuntimeError):
+    """
+    Raised by a hash map iterator when the map gained, lost or moved
+    entries since the iterator was created
+    """
+    pass
+
+
 class DynamicArray:
     """
     Class implementing a Dynamic Array
@@ -16,6 +24,8 @@ class DynamicArray:
     append, pop, swap, get_at_index, set_at_index, length
     """
 
+    __slots__ = ('_data',)
+
     def __init__(self, arr=None) -> None:
         """Initialize new dynamic array using a list."""
         self._data = arr.copy() if arr else []
@@ -100,11 +110,16 @@ class SLNode:
     Singly Linked List node for use in a hash map
     """
 
-    def __init__(self, key: str, value: object, next: "SLNode" = None) -> None:
-        """Initialize node given a key and value."""
+    # no per-instance dict, since a map holds one node per entry
+    __slots__ = ('key', 'value', 'next', 'hash')
+
+    def __init__(self, key: str, value: object, next: "SLNode" = None,
+                 hash: int = None) -> None:
+        """Initialize node given a key, value and the full hash of the key."""
         self.key = key
         self.value = value
         self.next = next
+        self.hash = hash
 
     def __str__(self) -> str:
         """Override string method to provide more readable output."""
@@ -116,6 +131,8 @@ class LinkedListIterator:
     Separate iterator class for LinkedList
     """
 
+    __slots__ = ('_node',)
+
     def __init__(self, current_node: SLNode) -> None:
         """Initialize the iterator with a node."""
         self._node = current_node
@@ -138,9 +155,11 @@ class LinkedListIterator:
 class LinkedList:
     """
     Class implementing a Singly Linked List
-    Supported methods are: insert, remove, contains, length, iterator
+    Supported methods are: insert, remove, contains, find, length, iterator
     """
 
+    __slots__ = ('_head', '_size')
+
     def __init__(self) -> None:
         """
         Initialize new linked list;
@@ -165,20 +184,28 @@ class LinkedList:
         """Return an iterator for the list, starting at the head."""
         return LinkedListIterator(self._head)
 
-    def insert(self, key: str, value: object) -> None:
+    def insert(self, key: str, value: object, hash: int = None) -> None:
         """Insert new node at front of the list."""
-        self._head = SLNode(key, value, self._head)
+        self._head = SLNode(key, value, self._head, hash)
+        self._size += 1
+
+    def insert_node(self, node: SLNode) -> None:
+        """Insert an existing node at front of the list."""
+        node.next = self._head
+        self._head = node
         self._size += 1
 
-    def remove(self, key: str) -> bool:
+    def remove(self, key: str, hash: int = None) -> bool:
         """
         Remove first node with matching key.
         Return True if removal was successful, False otherwise.
+        If the full hash of the key is given, nodes with a different
+        cached hash are skipped without comparing their keys.
         """
         previous, node = None, self._head
         while node:
 
-            if node.key == key:
+            if (hash is None or node.hash == hash) and node.key == key:
                 if previous:
                     previous.next = node.next
                 else:
@@ -189,15 +216,39 @@ class LinkedList:
             previous, node = node, node.next
         return False
 
-    def contains(self, key: str) -> SLNode:
-        """Return node with matching key, or None if no match"""
+    def contains(self, key: str, hash: int = None) -> SLNode:
+        """
+        Return node with matching key, or None if no match.
+        If the full hash of the key is given, nodes with a different
+        cached hash are skipped without comparing their keys.
+        """
         node = self._head
+        if hash is None:
+            while node:
+                if node.key == key:
+                    return node
+                node = node.next
+            return node
         while node:
-            if node.key == key:
+            if node.hash == hash and node.key == key:
                 return node
             node = node.next
         return node
 
+    def find(self, key: str, hash: int = None) -> tuple:
+        """
+        Return node with matching key, or None if no match, along with
+        the number of nodes examined.
+        """
+        probes = 0
+        node = self._head
+        while node:
+            probes += 1
+            if (hash is None or node.hash == hash) and node.key == key:
+                return node, probes
+            node = node.next
+        return None, probes
+
     def length(self) -> int:
         """Return the length of the list."""
         return self._size
@@ -207,11 +258,21 @@ class LinkedList:
 
 class HashEntry:
 
-    def __init__(self, key: str, value: object) -> None:
+    # no per-instance dict, since a map holds one entry per key
+    __slots__ = ('key', 'value', 'hash', 'expires', 'is_tombstone')
+
+    def __init__(self, key: str, value: object, hash: int = None,
+                 expires: float = None) -> None:
         """Initialize an entry for use in a hash map."""
         self.key = key
         self.value = value
 
+        # Full hash of the key, so the table can be rebuilt without rehashing
+        self.hash = hash
+
+        # Clock reading at which the entry expires, None if it never does
+        self.expires = expires
+
         # Set this value to True when you "delete" a HashEntry
         self.is_tombstone = False
 
@@ -0,0 +1,164 @@
+# Name: Blake Jennings
+# Email: blakej94@gmail.com
+# Description: Hashes whole batches of keys at once for the get_many and
+#              contains_many methods of the hash maps. When NumPy is
+#              installed, the hash functions from a6_include and hashing are
+#              evaluated column by column over a padded matrix of the encoded
+#              keys; otherwise, or for any other hash function, each key is
+#              hashed on its own.
+
+from a6_include import DynamicArray, hash_function_1, hash_function_2
+from hashing import (FNV_OFFSET, FNV_PRIME, PRIME64_1, PRIME64_2, PRIME64_3,
+                     fnv1a, xx_hash)
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+def as_list(keys) -> list:
+    """
+    Returns the keys of a DynamicArray or any other iterable as a list.
+
+    :param keys: DynamicArray or iterable of keys
+
+    :return:     list of the keys
+    """
+    if isinstance(keys, DynamicArray):
+        return [keys.get_at_index(ind) for ind in range(keys.length())]
+    return list(keys)
+
+
+def _code_points(keys: list):
+    """
+    Returns the keys as a matrix of their code points, one row per key,
+    padded with zeros on the right.
+    """
+    matrix = np.array(keys, dtype=str)
+    width = matrix.dtype.itemsize // 4
+    return matrix.view(np.uint32).reshape(len(keys), width).astype(np.int64)
+
+
+def _words(keys: list) -> tuple:
+    """
+    Returns the UTF-8 encoded keys as a padded uint8 matrix viewed as
+    little-endian 64-bit words, one row per key, along with the byte length
+    and number of words of every key.
+    """
+    encoded = [key.encode() for key in keys]
+    lengths = np.array([len(data) for data in encoded], dtype=np.uint64)
+    width = max(8, -(-int(lengths.max(initial=0)) // 8)*8)
+    matrix = np.array(encoded, dtype='S%d' % width).view(np.uint8)
+    words = matrix.reshape(len(keys), width).view('<u8').astype(np.uint64)
+    return words, lengths, (lengths+np.uint64(7)) // np.uint64(8)
+
+
+def _rotl(values, bits: int):
+    """Rotates 64-bit values left by the given number of bits."""
+    return (values << np.uint64(bits)) | (values >> np.uint64(64-bits))
+
+
+def _mix64(hashes):
+    """Vectorized hashing.mix64."""
+    hashes = hashes ^ (hashes >> np.uint64(33))
+    hashes = hashes*np.uint64(PRIME64_2)
+    hashes = hashes ^ (hashes >> np.uint64(29))
+    hashes = hashes*np.uint64(PRIME64_3)
+    return hashes ^ (hashes >> np.uint64(32))
+
+
+def _hash_function_1(keys: list):
+    """Vectorized a6_include.hash_function_1."""
+    return _code_points(keys).sum(axis=1)
+
+
+def _hash_function_2(keys: list):
+    """Vectorized a6_include.hash_function_2."""
+    points = _code_points(keys)
+    weights = np.arange(1, points.shape[1]+1, dtype=np.int64)
+    return (points*weights).sum(axis=1)
+
+
+def _fnv1a(keys: list):
+    """Vectorized hashing.fnv1a."""
+    words, lengths, counts = _words(keys)
+    prime = np.uint64(FNV_PRIME)
+    hashes = np.full(len(keys), FNV_OFFSET, dtype=np.uint64)
+    for column in range(words.shape[1]):
+        hashes = np.where(column < counts,
+                          (hashes ^ words[:, column])*prime, hashes)
+    hashes = (hashes ^ lengths)*prime
+    return hashes ^ (hashes >> np.uint64(32))
+
+
+def _xx_hash(keys: list, seed: int = 0):
+    """Vectorized hashing.xx_hash."""
+    words, lengths, counts = _words(keys)
+    hashes = lengths+np.uint64((seed+PRIME64_3) & ((1 << 64)-1))
+    for column in range(words.shape[1]):
+        lane = _rotl(words[:, column]*np.uint64(PRIME64_2), 31)
+        mixed = hashes ^ (lane*np.uint64(PRIME64_1))
+        mixed = _rotl(mixed, 27)*np.uint64(PRIME64_1)+np.uint64(PRIME64_3)
+        hashes = np.where(column < counts, mixed, hashes)
+    return _mix64(hashes)
+
+
+_VECTORIZED = {
+    hash_function_1: _hash_function_1,
+    hash_function_2: _hash_function_2,
+    fnv1a: _fnv1a,
+    xx_hash: _xx_hash,
+}
+
+
+def _vectorized(function):
+    """
+    Returns the NumPy version of a hash function, or None if NumPy is not
+    installed or the function has no vectorized form.
+    """
+    if np is None:
+        return None
+    if function in _VECTORIZED:
+        return _VECTORIZED[function]
+    seed = getattr(function, 'seed', None)
+    if seed is not None:
+        return lambda keys: _xx_hash(keys, seed)
+    return None
+
+
+def hash_keys(keys: list, function) -> list:
+    """
+    Hashes a list of keys, giving the same values as calling the hash
+    function on every key.
+
+    :param keys:     list of keys to hash
+    :param function: hash function of the map
+
+    :return:         list of the full hashes of the keys
+    """
+    vectorized = _vectorized(function)
+    if vectorized is None or not keys:
+        return [function(key) for key in keys]
+    return vectorized(keys).tolist()
+
+
+def bucket_indices(keys: list, function, capacity: int) -> tuple:
+    """
+    Hashes a list of keys and reduces the hashes to bucket indices of a
+    table with the given capacity.
+
+    :param keys:     list of keys to hash
+    :param function: hash function of the map
+    :param capacity: capacity of the table
+
+    :return:         tuple of the list of full hashes and the list of
+                     bucket indices of the keys
+    """
+    vectorized = _vectorized(function)
+    if vectorized is None or not keys:
+        hashes = [function(key) for key in keys]
+        return hashes, [hash % capacity for hash in hashes]
+    hashes = vectorized(keys)
+    indices = hashes % hashes.dtype.type(capacity)
+    return hashes.tolist(), indices.tolist()
@@ -0,0 +1,7 @@
+# Name: Blake Jennings
+# Email: blakej94@gmail.com
+# Description: Benchmarks for the hash map implementations. Each module can be
+#              run on its own from the repository root, e.g.
+#              python -m bench.oa_layout
+#              bench.suite runs the workloads of bench.workloads against
+#              every map and hash function and saves the results as JSON.
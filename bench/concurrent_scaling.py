@@ -0,0 +1,114 @@
+# Name: Blake Jennings
+# Email: blakej94@gmail.com
+# Description: Measures how throughput scales with 1 to 16 threads for the
+#              lock-striped ConcurrentHashMap and for a separate chaining
+#              HashMap behind one global lock. Every thread runs the same
+#              mix of gets, puts and removes over a shared key space. On a
+#              free-threaded CPython build the threads run in parallel; with
+#              the GIL the benchmark shows the locking overhead instead.
+
+import argparse
+import random
+import sys
+import threading
+import time
+
+from concurrent_hash_map import ConcurrentHashMap
+from hash_map_sc import HashMap
+from hashing import fnv1a
+
+
+class LockedHashMap:
+    """
+    Separate chaining HashMap behind a single global lock, the baseline
+    """
+
+    def __init__(self, capacity: int, function) -> None:
+        """Initialize the map and its lock."""
+        self._map = HashMap(capacity, function)
+        self._lock = threading.Lock()
+
+    def put(self, key: str, value: object) -> None:
+        """Put while holding the global lock."""
+        with self._lock:
+            self._map.put(key, value)
+
+    def get(self, key: str) -> object:
+        """Get while holding the global lock."""
+        with self._lock:
+            return self._map.get(key)
+
+    def remove(self, key: str) -> None:
+        """Remove while holding the global lock."""
+        with self._lock:
+            self._map.remove(key)
+
+
+def run(m, threads: int, ops: int, keys: list, writes: float) -> float:
+    """
+    Runs ops operations on every one of the given number of threads,
+    started together, and returns the total throughput.
+
+    :param m:       map to operate on
+    :param threads: number of threads
+    :param ops:     operations per thread
+    :param keys:    shared key space
+    :param writes:  fraction of operations that are puts or removes
+
+    :return:        operations per second over all threads
+    """
+    barrier = threading.Barrier(threads+1)
+
+    def work(seed: int) -> None:
+        """Run the operation mix with its own random generator."""
+        r = random.Random(seed)
+        plan = [(r.choice(keys), r.random()) for _ in range(ops)]
+        barrier.wait()
+        for key, roll in plan:
+            if roll < writes/2:
+                m.put(key, roll)
+            elif roll < writes:
+                m.remove(key)
+            else:
+                m.get(key)
+
+    workers = [threading.Thread(target=work, args=(seed,)) for seed in range(threads)]
+    for worker in workers:
+        worker.start()
+    barrier.wait()
+    start = time.perf_counter()
+    for worker in workers:
+        worker.join()
+    return threads*ops/(time.perf_counter()-start)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description='Throughput of the striped and globally locked maps by thread count.')
+    parser.add_argument('--ops', type=int, default=50_000,
+                        help='operations per thread')
+    parser.add_argument('--keys', type=int, default=100_000,
+                        help='size of the shared key space')
+    parser.add_argument('--writes', type=float, default=0.2,
+                        help='fraction of puts and removes')
+    parser.add_argument('--stripes', type=int, default=16,
+                        help='lock stripes of the ConcurrentHashMap')
+    args = parser.parse_args()
+
+    gil = getattr(sys, '_is_gil_enabled', lambda: True)()
+    print(f"Python {sys.version.split()[0]}, GIL {'enabled' if gil else 'disabled'}")
+    keys = ['key' + str(i) for i in range(args.keys)]
+    print(f"{'threads':>7}  {'locked ops/s':>12}  {'striped ops/s':>13}  {'speedup':>7}")
+    for threads in (1, 2, 4, 8, 16):
+        results = []
+        for m in (LockedHashMap(args.keys, fnv1a),
+                  ConcurrentHashMap(args.keys, fnv1a, stripes=args.stripes)):
+            for ind in range(0, len(keys), 2):
+                m.put(keys[ind], ind)
+            results.append(run(m, threads, args.ops, keys, args.writes))
+        print(f"{threads:>7}  {results[0]:12.0f}  {results[1]:13.0f}  "
+              f"{results[1]/results[0]:7.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+# Name: Blake Jennings
+# Email: blakej94@gmail.com
+# Description: Quality and throughput report for the hash functions:
+#              chi-square of the bucket distribution, avalanche behaviour
+#              and keys hashed per second on several kinds of keys.
+
+import argparse
+import random
+import time
+import uuid
+
+from a6_include import hash_function_1, hash_function_2
+from bench.workloads import anagram_keys, sequential_keys
+from capacity import ladder_prime
+from hashing import fnv1a, seeded_hash, xx_hash
+
+FUNCTIONS = (
+    ('hash_function_1', hash_function_1),
+    ('hash_function_2', hash_function_2),
+    ('fnv1a', fnv1a),
+    ('xx_hash', xx_hash),
+    ('seeded_hash', seeded_hash(0x5eed)),
+)
+
+
+def key_sets(count: int, rng: random.Random) -> dict:
+    """
+    Builds the key sets the report runs on.
+
+    :param count: number of keys in each set
+    :param rng:   random number generator to draw keys from
+
+    :return:      dictionary of key set name to list of keys
+    """
+    return {
+        'sequential': sequential_keys(count),
+        'uuid': [str(uuid.UUID(int=rng.getrandbits(128))) for _ in range(count)],
+        'path': ['/srv/data/%d/%d/file_%d.json' % (i % 97, i % 13, i)
+                 for i in range(count)],
+        'anagram': anagram_keys(count, rng),
+    }
+
+
+def chi_square(function, keys: list, buckets: int) -> float:
+    """
+    Chi-square statistic of the bucket counts, divided by its degrees of
+    freedom, so a uniform distribution scores close to 1.
+
+    :param function: hash function to test
+    :param keys:     keys to distribute
+    :param buckets:  number of buckets
+
+    :return:         normalised chi-square statistic
+    """
+    counts = [0]*buckets
+    for key in keys:
+        counts[function(key) % buckets] += 1
+    expected = len(keys)/buckets
+    return sum((count-expected)**2 for count in counts)/expected/(buckets-1)
+
+
+def avalanche(function, keys: list) -> float:
+    """
+    Average fraction of the 64 output bits that change when a single bit
+    of one character of the key is flipped. An ideal hash scores 0.5.
+
+    :param function: hash function to test
+    :param keys:     ASCII keys to flip bits in
+
+    :return:         average fraction of changed output bits
+    """
+    changed = trials = 0
+    for key in keys:
+        base = function(key)
+        for ind in range(len(key)):
+            for bit in range(7):
+                flipped = key[:ind] + chr(ord(key[ind]) ^ (1 << bit)) + key[ind+1:]
+                changed += bin((base ^ function(flipped)) & ((1 << 64)-1)).count('1')
+                trials += 1
+    return changed/trials/64
+
+
+def throughput(function, keys: list) -> float:
+    """
+    Number of keys the function hashes per second.
+
+    :param function: hash function to time
+    :param keys:     keys to hash
+
+    :return:         keys per second
+    """
+    start = time.perf_counter()
+    for key in keys:
+        function(key)
+    return len(keys)/(time.perf_counter()-start)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description='Distribution, avalanche and speed of the hash functions.')
+    parser.add_argument('--keys', type=int, default=100_000,
+                        help='number of keys in each key set')
+    parser.add_argument('--seed', type=int, default=1, help='random seed')
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    sets = key_sets(args.keys, rng)
+    buckets = ladder_prime(args.keys // 4)
+    print(f"chi-square / dof over {buckets} buckets (1.0 is uniform), "
+          f"avalanche (0.5 is ideal), keys hashed per second")
+    for set_name, keys in sets.items():
+        print(f"\n{set_name} keys")
+        sample = [key for key in keys[:200] if key.isascii()]
+        for name, function in FUNCTIONS:
+            print(f"  {name:>16}: chi2 {chi_square(function, keys, buckets):10.2f}  "
+                  f"avalanche {avalanche(function, sample):5.3f}  "
+                  f"{throughput(function, keys):10.0f} keys/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+# Name: Blake Jennings
+# Email: blakej94@gmail.com
+# Description: Measures with tracemalloc how many bytes both hash maps hold
+#              per entry, and per bucket while still empty, along with the
+#              size of a single node, entry, bucket and array object.
+
+import argparse
+import sys
+import tracemalloc
+
+import hash_map_oa
+import hash_map_sc
+from a6_include import DynamicArray, HashEntry, LinkedList, SLNode
+from hashing import fnv1a
+
+
+def object_size(obj) -> int:
+    """Return the size of an object together with its attribute dict, if any."""
+    size = sys.getsizeof(obj)
+    if hasattr(obj, '__dict__'):
+        size += sys.getsizeof(obj.__dict__)
+    return size
+
+
+def traced(build) -> int:
+    """
+    Returns the bytes still allocated by a function's result once it has
+    returned.
+
+    :param build: function without arguments that builds a map
+
+    :return:      bytes traced while the result is alive
+    """
+    tracemalloc.start()
+    base = tracemalloc.get_traced_memory()[0]
+    result = build()
+    held = tracemalloc.get_traced_memory()[0]-base
+    tracemalloc.stop()
+    del result
+    return held
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description='Bytes per entry and per empty bucket of both hash maps.')
+    parser.add_argument('--keys', type=int, default=1_000_000,
+                        help='number of key/value pairs per map')
+    args = parser.parse_args()
+
+    print("object sizes in bytes")
+    for name, obj in (('SLNode', SLNode('key', 1)), ('HashEntry', HashEntry('key', 1)),
+                      ('LinkedList', LinkedList()), ('DynamicArray', DynamicArray())):
+        print(f"  {name:>12}: {object_size(obj)}")
+
+    # the values are the keys themselves, so only the map's own objects count
+    keys = ['key' + str(i) for i in range(args.keys)]
+    print(f"\n{'map':>3}  {'empty bytes/bucket':>18}  {'bytes/entry':>11}  {'MB':>7}")
+    for name, module in (('sc', hash_map_sc), ('oa', hash_map_oa)):
+        capacity = 100_003
+        empty = traced(lambda: module.HashMap(capacity, fnv1a))/capacity
+        held = traced(lambda: module.HashMap.from_items(((key, key) for key in keys), fnv1a))
+        print(f"{name:>3}  {empty:18.1f}  {held/args.keys:11.1f}  {held/1e6:7.1f}")
+
+
+if __name__ == "__main__":
+    main()
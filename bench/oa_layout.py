@@ -0,0 +1,74 @@
+# Name: Blake Jennings
+# Email: blakej94@gmail.com
+# Description: Compares the memory use and throughput of the HashEntry based
+#              open addressing map with the parallel array based one. Both
+#              use the same hash function, fnv1a, so that the comparison
+#              measures the table layout rather than the hash function.
+
+import argparse
+import time
+import tracemalloc
+
+import hash_map_oa
+import hash_map_oa_array
+from hashing import fnv1a
+
+
+def measure(map_class, keys: list) -> dict:
+    """
+    Builds a map of the given keys and times put, get and remove on it.
+
+    :param map_class: HashMap class to measure
+    :param keys:      list of string keys to insert
+
+    :return:          dictionary of the measurements
+    """
+    tracemalloc.start()
+    start = time.perf_counter()
+    m = map_class(11, fnv1a)
+    for ind, key in enumerate(keys):
+        m.put(key, ind)
+    put_time = time.perf_counter()-start
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    start = time.perf_counter()
+    for key in keys:
+        m.get(key)
+    get_time = time.perf_counter()-start
+
+    start = time.perf_counter()
+    for key in keys:
+        m.remove(key)
+    remove_time = time.perf_counter()-start
+
+    count = len(keys)
+    return {
+        'bytes_per_key': current/count,
+        'peak_bytes': peak,
+        'put_ops_per_sec': count/put_time,
+        'get_ops_per_sec': count/get_time,
+        'remove_ops_per_sec': count/remove_time,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description='Memory and speed of the HashEntry and parallel array layouts.')
+    parser.add_argument('--keys', type=int, default=1_000_000,
+                        help='number of keys to insert')
+    args = parser.parse_args()
+
+    keys = ['str' + str(i) for i in range(args.keys)]
+    for name, module in (('HashEntry', hash_map_oa),
+                         ('parallel arrays', hash_map_oa_array)):
+        result = measure(module.HashMap, keys)
+        print(f"{name:>16}: {result['bytes_per_key']:8.1f} B/key  "
+              f"peak {result['peak_bytes']/2**20:8.1f} MiB  "
+              f"put {result['put_ops_per_sec']:10.0f}/s  "
+              f"get {result['get_ops_per_sec']:10.0f}/s  "
+              f"remove {result['remove_ops_per_sec']:10.0f}/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+# Name: Blake Jennings
+# Email: blakej94@gmail.com
+# Description: Compares the probing strategies of the open addressing map.
+#              Tables are filled directly to each target load, bypassing the
+#              usual 0.5 resize threshold, and then measured for mean and p99
+#              probe length, read from the lookup histogram of stats.py, and
+#              lookup throughput.
+
+import argparse
+import time
+
+from capacity import next_prime
+from hash_map_oa import PROBING, HashMap
+from hashing import fnv1a
+from stats import Histogram, disable_stats, enable_stats
+
+
+def upper_bound(histogram: Histogram, fraction: float) -> object:
+    """
+    Returns the upper bound of the histogram bucket that holds the given
+    fraction of the observed values, 'inf' for the unbounded last bucket.
+
+    :param histogram: histogram of probe lengths
+    :param fraction:  fraction of the values, between 0 and 1
+
+    :return:          upper bound of the bucket
+    """
+    total = 0
+    for bound, count in zip(histogram.bounds+('inf',), histogram.counts):
+        total += count
+        if total >= fraction*histogram.count:
+            return bound
+    return 'inf'
+
+
+def measure(probing: str, capacity: int, load: float) -> dict:
+    """
+    Fills a table of one probing strategy to the given load and measures
+    its lookups of present and absent keys.
+
+    :param probing:  probing strategy of the map
+    :param capacity: capacity of the table
+    :param load:     target load factor
+
+    :return:         dictionary of the measurements
+    """
+    m = HashMap(capacity, fnv1a, probing=probing)
+    keys = ['key' + str(i) for i in range(int(load*m.get_capacity()))]
+    misses = ['miss' + str(i) for i in range(len(keys))]
+    for ind, key in enumerate(keys):
+        # insert without the load check so the table reaches the target load
+        m._insert(key, ind, fnv1a(key))
+
+    stats = enable_stats(m)
+    for key in keys:
+        m.get(key)
+    hits, stats.lookups = stats.lookups, Histogram()
+    for key in misses:
+        m.get(key)
+    missed = stats.lookups
+    disable_stats(m)
+
+    start = time.perf_counter()
+    for key in keys:
+        m.get(key)
+    for key in misses:
+        m.get(key)
+    elapsed = time.perf_counter()-start
+
+    return {
+        'load': m.table_load(),
+        'hit_mean': hits.mean(),
+        'hit_p99': upper_bound(hits, 0.99),
+        'miss_mean': missed.mean(),
+        'miss_p99': upper_bound(missed, 0.99),
+        'ops_per_sec': 2*len(keys)/elapsed,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description='Probe lengths and lookup speed of the probing strategies.')
+    parser.add_argument('--capacity', type=int, default=20_000,
+                        help='capacity of every table')
+    args = parser.parse_args()
+
+    capacity = next_prime(args.capacity)
+    print(f"{'probing':>10} {'load':>5}  {'hit mean':>8} {'hit p99':>7}  "
+          f"{'miss mean':>9} {'miss p99':>8}  {'gets/s':>10}")
+    for probing in PROBING:
+        for target in (0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9):
+            result = measure(probing, capacity, target)
+            print(f"{probing:>10} {result['load']:5.2f}  "
+                  f"{result['hit_mean']:8.2f} {result['hit_p99']:>7}  "
+                  f"{result['miss_mean']:9.2f} {result['miss_p99']:>8}  "
+                  f"{result['ops_per_sec']:10.0f}")
+
+
+if __name__ == "__main__":
+    main()
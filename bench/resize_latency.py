@@ -0,0 +1,79 @@
+# Name: Blake Jennings
+# Email: blakej94@gmail.com
+# Description: Measures the latency of every single put while both hash maps
+#              grow from empty, with resizes done all at once and with
+#              incremental rehashing, and reports the p50, p99, p99.9 and
+#              worst put latency. The cyclic garbage collector is paused while
+#              timing unless --gc is given, so its pauses do not hide the
+#              resizes.
+
+import argparse
+import gc
+import time
+
+import hash_map_oa
+import hash_map_sc
+from bench.suite import percentile
+from hashing import fnv1a
+
+
+def measure(module, count: int, incremental: bool, batch: int,
+            collect: bool = False) -> dict:
+    """
+    Puts count keys into a new map one at a time and times every put.
+
+    :param module:      hash map module to measure
+    :param count:       number of keys to put
+    :param incremental: True to resize with incremental rehashing
+    :param batch:       buckets moved per operation while rehashing
+    :param collect:     True to leave the garbage collector running
+
+    :return:            dictionary of the latencies in microseconds
+    """
+    m = module.HashMap(11, fnv1a, incremental=incremental, rehash_batch=batch)
+    keys = ['key' + str(i) for i in range(count)]
+    latencies = []
+    clock = time.perf_counter_ns
+    if not collect:
+        gc.disable()
+    try:
+        for ind, key in enumerate(keys):
+            start = clock()
+            m.put(key, ind)
+            latencies.append(clock()-start)
+    finally:
+        gc.enable()
+    latencies.sort()
+    return {
+        'p50': percentile(latencies, 0.5)/1000,
+        'p99': percentile(latencies, 0.99)/1000,
+        'p999': percentile(latencies, 0.999)/1000,
+        'max': latencies[-1]/1000,
+        'total': sum(latencies)/1e9,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description='Per-put latency of both hash maps with and without incremental rehashing.')
+    parser.add_argument('--keys', type=int, default=200_000,
+                        help='number of keys put into every map')
+    parser.add_argument('--batch', type=int, default=8,
+                        help='buckets moved per operation while rehashing')
+    parser.add_argument('--gc', action='store_true',
+                        help='leave the garbage collector running while timing')
+    args = parser.parse_args()
+
+    print(f"{'map':>4} {'incremental':>11}  {'p50 us':>7} {'p99 us':>7} "
+          f"{'p99.9 us':>8} {'max us':>10}  {'total s':>7}")
+    for name, module in (('sc', hash_map_sc), ('oa', hash_map_oa)):
+        for incremental in (False, True):
+            result = measure(module, args.keys, incremental, args.batch,
+                             args.gc)
+            print(f"{name:>4} {str(incremental):>11}  {result['p50']:7.2f} "
+                  f"{result['p99']:7.2f} {result['p999']:8.2f} "
+                  f"{result['max']:10.0f}  {result['total']:7.2f}")
+
+
+if __name__ == "__main__":
+    main()
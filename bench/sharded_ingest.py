@@ -0,0 +1,59 @@
+# Name: Blake Jennings
+# Email: blakej94@gmail.com
+# Description: Measures bulk ingest throughput of the ShardedHashMap with a
+#              growing number of shard processes against a single HashMap
+#              in this process. Process start-up is not timed. Scaling over
+#              one shard is only near-linear up to the number of CPU cores.
+
+import argparse
+import multiprocessing
+import time
+
+import hash_map_oa
+import hash_map_sc
+from hashing import fnv1a
+from sharded_hash_map import ShardedHashMap
+
+_MODULES = {'sc': hash_map_sc, 'oa': hash_map_oa}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description='Bulk ingest throughput of the sharded map by number of shards.')
+    parser.add_argument('--keys', type=int, default=1_000_000,
+                        help='number of key/value pairs to ingest')
+    parser.add_argument('--map-type', choices=sorted(_MODULES), default='sc',
+                        help='kind of HashMap owned by every shard')
+    parser.add_argument('--batch-size', type=int, default=50_000,
+                        help='pairs sent to the shards per round trip')
+    parser.add_argument('--max-shards', type=int,
+                        default=multiprocessing.cpu_count(),
+                        help='largest number of shards to measure')
+    args = parser.parse_args()
+
+    items = [('key' + str(i), i) for i in range(args.keys)]
+
+    m = _MODULES[args.map_type].HashMap(11, fnv1a)
+    start = time.perf_counter()
+    m.put_many(items)
+    baseline = args.keys/(time.perf_counter()-start)
+    print(f"{multiprocessing.cpu_count()} CPUs, {args.keys} keys, map type {args.map_type}")
+    print(f"{'shards':>6}  {'keys/s':>10}  {'vs local':>8}  {'vs 1 shard':>10}")
+    print(f"{'local':>6}  {baseline:10.0f}  {1:8.2f}  {'':>10}")
+
+    shards = 1
+    single = None
+    while shards <= args.max_shards:
+        with ShardedHashMap(shards, fnv1a, map_type=args.map_type,
+                            batch_size=args.batch_size) as m:
+            start = time.perf_counter()
+            m.put_many(items)
+            rate = args.keys/(time.perf_counter()-start)
+            assert m.get_size() == args.keys
+        single = single or rate
+        print(f"{shards:>6}  {rate:10.0f}  {rate/baseline:8.2f}  {rate/single:10.2f}")
+        shards *= 2
+
+
+if __name__ == "__main__":
+    main()
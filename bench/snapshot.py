@@ -0,0 +1,91 @@
+# Name: Blake Jennings
+# Email: blakej94@gmail.com
+# Description: Compares the streaming snapshots of the separate chaining map
+#              (dump and load, with and without compression) with pickling
+#              the whole map object. Reports the snapshot size, dump and
+#              load throughput in MB/s and keys/s, and the peak memory
+#              traced while dumping.
+
+import argparse
+import os
+import pickle
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from hash_map_sc import HashMap
+from hashing import fnv1a
+
+
+def timed(function) -> tuple:
+    """
+    Calls a function and measures how long it takes.
+
+    :param function: function without arguments
+
+    :return:         tuple of its result and the seconds it took
+    """
+    start = time.perf_counter()
+    result = function()
+    return result, time.perf_counter()-start
+
+
+def peak_memory(function) -> int:
+    """
+    Calls a function again with tracemalloc running, which slows it down,
+    to find the peak memory it allocates.
+
+    :param function: function without arguments
+
+    :return:         peak memory traced while it ran, in bytes
+    """
+    tracemalloc.start()
+    function()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description='Size and speed of streaming snapshots against pickling the whole map.')
+    parser.add_argument('--keys', type=int, default=500_000,
+                        help='number of key/value pairs in the map')
+    args = parser.parse_args()
+
+    # pickling the map walks every chain recursively
+    sys.setrecursionlimit(max(sys.getrecursionlimit(), 10_000))
+    m = HashMap.from_items((('key' + str(i), 'value' + str(i)) for i in range(args.keys)), fnv1a)
+    print(f"{'method':>10}  {'MB':>6}  {'dump MB/s':>9}  {'dump keys/s':>11}  "
+          f"{'load MB/s':>9}  {'load keys/s':>11}  {'dump peak MB':>12}")
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'snapshot')
+        for name, compress in (('dump', False), ('dump zlib', True), ('pickle', None)):
+            if compress is None:
+                def dump(file):
+                    pickle.dump(m, file, pickle.HIGHEST_PROTOCOL)
+
+                def load(file):
+                    return pickle.load(file)
+            else:
+                def dump(file):
+                    m.dump(file, compress)
+
+                def load(file):
+                    return HashMap.load(file, fnv1a)
+
+            with open(path, 'wb') as file:
+                peak = peak_memory(lambda: dump(file))
+            with open(path, 'wb') as file:
+                _, dumped = timed(lambda: dump(file))
+            size = os.path.getsize(path)/1e6
+            with open(path, 'rb') as file:
+                loaded, seconds = timed(lambda: load(file))
+            assert loaded.get_size() == args.keys and loaded.get('key7') == 'value7'
+            print(f"{name:>10}  {size:6.1f}  {size/dumped:9.1f}  {args.keys/dumped:11.0f}  "
+                  f"{size/seconds:9.1f}  {args.keys/seconds:11.0f}  {peak/1e6:12.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,254 @@
+# Name: Blake Jennings
+# Email: blakej94@gmail.com
+# Description: Runs every combination of map (separate chaining or open
+#              addressing), hash function and workload, each in a fresh
+#              process, and reports throughput, p50/p99/p99.9 latency, peak
+#              RSS and bytes per entry. Results can be saved as JSON and
+#              compared with an earlier run to catch regressions.
+
+import argparse
+import gc
+import importlib
+import json
+import multiprocessing
+import platform
+import sys
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+
+from bench.workloads import GET, PUT, WORKLOADS, build
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+MAPS = {'sc': 'hash_map_sc', 'oa': 'hash_map_oa'}
+
+FUNCTIONS = {
+    'hash_function_1': 'a6_include:hash_function_1',
+    'hash_function_2': 'a6_include:hash_function_2',
+    'fnv1a': 'hashing:fnv1a',
+    'xx_hash': 'hashing:xx_hash',
+}
+
+# metrics where a higher value is better; for the others lower is better
+HIGHER_IS_BETTER = ('ops_per_sec',)
+
+
+def percentile(values: list, fraction: float) -> float:
+    """
+    Returns the value below which the given fraction of the values fall.
+
+    :param values:   sorted list of numbers
+    :param fraction: fraction between 0 and 1
+
+    :return:         the percentile value
+    """
+    return values[min(len(values)-1, int(fraction*len(values)))]
+
+
+def load_function(spec: str):
+    """
+    Returns a hash function given by its name in FUNCTIONS or as
+    'module:function', so new hash functions can be benchmarked without
+    changing this file.
+
+    :param spec: name or module:function path of the hash function
+
+    :return:     the hash function
+    """
+    module, _, name = FUNCTIONS.get(spec, spec).partition(':')
+    if not name:
+        raise ValueError(f"unknown hash function {spec}, use module:function")
+    return getattr(importlib.import_module(module), name)
+
+
+def _apply(m, operations: list, clock=None) -> list:
+    """
+    Applies operations to a map, timing each one if a clock is given.
+
+    :param m:          hash map
+    :param operations: list of (operation, key) pairs
+    :param clock:      function returning nanoseconds, or None
+
+    :return:           list of the latencies in nanoseconds, empty without
+                       a clock
+    """
+    put, get, remove = m.put, m.get, m.remove
+    latencies = []
+    for operation, key in operations:
+        start = clock() if clock else 0
+        if operation == GET:
+            get(key)
+        elif operation == PUT:
+            put(key, key)
+        else:
+            remove(key)
+        if clock:
+            latencies.append(clock()-start)
+    return latencies
+
+
+def run(map_name: str, function_name: str, workload: str, ops: int,
+        keys: int, seed: int) -> dict:
+    """
+    Measures one combination. Meant to run in a process of its own, so the
+    peak RSS belongs to this combination alone. The workload is applied
+    twice to fresh maps: once timed with the garbage collector paused, and
+    once under tracemalloc to find the bytes the map holds per entry,
+    excluding the keys, which exist before the map does.
+
+    :param map_name:      'sc' or 'oa'
+    :param function_name: hash function, see load_function
+    :param workload:      name of the workload
+    :param ops:           number of timed operations
+    :param keys:          number of distinct keys
+    :param seed:          random seed of the workload
+
+    :return:              dictionary of the results
+    """
+    module = importlib.import_module(MAPS[map_name])
+    function = load_function(function_name)
+    setup, operations = build(workload, ops, keys, seed)
+
+    m = module.HashMap(11, function)
+    m.put_many([(key, key) for key in setup])
+    gc.collect()
+    gc.disable()
+    try:
+        start = time.perf_counter()
+        latencies = _apply(m, operations, time.perf_counter_ns)
+        seconds = time.perf_counter()-start
+    finally:
+        gc.enable()
+    latencies.sort()
+    del m
+
+    tracemalloc.start()
+    base = tracemalloc.get_traced_memory()[0]
+    m = module.HashMap(11, function)
+    m.put_many([(key, key) for key in setup])
+    _apply(m, operations)
+    held = tracemalloc.get_traced_memory()[0]-base
+    tracemalloc.stop()
+
+    peak_rss = None
+    if resource is not None:
+        # kilobytes on Linux, bytes on macOS
+        scale = 1 if sys.platform == 'darwin' else 1024
+        peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss*scale/1e6
+    return {
+        'map': map_name,
+        'function': function_name,
+        'workload': workload,
+        'ops_per_sec': len(operations)/seconds,
+        'p50_us': percentile(latencies, 0.5)/1000,
+        'p99_us': percentile(latencies, 0.99)/1000,
+        'p999_us': percentile(latencies, 0.999)/1000,
+        'peak_rss_mb': peak_rss,
+        'bytes_per_entry': held/m.get_size() if m.get_size() else None,
+        'size': m.get_size(),
+        'capacity': m.get_capacity(),
+    }
+
+
+def compare(results: list, baseline: dict, threshold: float) -> int:
+    """
+    Prints how every result changed against the same combination of a
+    baseline run and flags changes for the worse beyond the threshold.
+
+    :param results:   list of result dictionaries of this run
+    :param baseline:  JSON document of an earlier run
+    :param threshold: relative change that counts as a regression
+
+    :return:          number of regressions
+    """
+    before = {(row['map'], row['function'], row['workload']): row
+              for row in baseline['results']}
+    regressions = 0
+    print(f"\n{'map':>3}  {'function':>16}  {'workload':>10}  {'ops/s':>8}  {'p99':>8}  "
+          f"{'bytes/entry':>11}")
+    for row in results:
+        old = before.get((row['map'], row['function'], row['workload']))
+        if old is None:
+            continue
+        changes = []
+        for metric in ('ops_per_sec', 'p99_us', 'bytes_per_entry'):
+            if not old[metric] or row[metric] is None:
+                changes.append('     n/a')
+                continue
+            change = row[metric]/old[metric]-1
+            worse = -change if metric in HIGHER_IS_BETTER else change
+            flag = '!' if worse > threshold else ' '
+            regressions += flag == '!'
+            changes.append(f'{change:+7.1%}{flag}')
+        print(f"{row['map']:>3}  {row['function']:>16}  {row['workload']:>10}  "
+              f"{changes[0]:>8}  {changes[1]:>8}  {changes[2]:>11}")
+    print(f"{regressions} regression(s) beyond {threshold:.0%}")
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description='Benchmark every map, hash function and workload.')
+    parser.add_argument('--maps', nargs='+', choices=sorted(MAPS), default=sorted(MAPS))
+    parser.add_argument('--functions', nargs='+', default=list(FUNCTIONS),
+                        help='names from FUNCTIONS or module:function paths')
+    parser.add_argument('--workloads', nargs='+', choices=list(WORKLOADS),
+                        default=list(WORKLOADS))
+    parser.add_argument('--ops', type=int, default=20_000,
+                        help='number of timed operations per workload')
+    parser.add_argument('--keys', type=int, default=5_000,
+                        help='number of distinct keys per workload')
+    parser.add_argument('--seed', type=int, default=1, help='random seed')
+    parser.add_argument('--output', help='file to save the results to as JSON')
+    parser.add_argument('--compare', help='JSON file of an earlier run to compare with')
+    parser.add_argument('--threshold', type=float, default=0.1,
+                        help='relative change that counts as a regression')
+    args = parser.parse_args()
+    for name in args.functions:
+        load_function(name)
+
+    print(f"{'map':>3}  {'function':>16}  {'workload':>10}  {'ops/s':>9}  {'p50 us':>7}  "
+          f"{'p99 us':>7}  {'p99.9 us':>8}  {'RSS MB':>7}  {'bytes/entry':>11}")
+    results = []
+    context = multiprocessing.get_context('spawn')
+    for map_name in args.maps:
+        for function_name in args.functions:
+            for workload in args.workloads:
+                # a new process for every combination keeps peak RSS apart
+                with ProcessPoolExecutor(1, mp_context=context) as executor:
+                    row = executor.submit(run, map_name, function_name, workload,
+                                          args.ops, args.keys, args.seed).result()
+                results.append(row)
+                rss = '-' if row['peak_rss_mb'] is None else f"{row['peak_rss_mb']:.1f}"
+                per_entry = '-' if row['bytes_per_entry'] is None else \
+                    f"{row['bytes_per_entry']:.0f}"
+                print(f"{map_name:>3}  {function_name:>16}  {workload:>10}  "
+                      f"{row['ops_per_sec']:9.0f}  {row['p50_us']:7.2f}  {row['p99_us']:7.2f}  "
+                      f"{row['p999_us']:8.2f}  {rss:>7}  {per_entry:>11}")
+
+    document = {
+        'meta': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'ops': args.ops,
+            'keys': args.keys,
+            'seed': args.seed,
+        },
+        'results': results,
+    }
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump(document, file, indent=2)
+    if args.compare:
+        with open(args.compare) as file:
+            baseline = json.load(file)
+        if compare(results, baseline, args.threshold):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
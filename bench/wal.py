@@ -0,0 +1,68 @@
+# Name: Blake Jennings
+# Email: blakej94@gmail.com
+# Description: Measures the durable hash map under different group commit
+#              settings: throughput of a mix of puts and removes, fsyncs per
+#              thousand operations, write amplification before and after a
+#              compaction, and how long replaying the log takes on startup.
+
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from hashing import fnv1a
+from wal import DurableHashMap
+
+# (name, sync_bytes, sync_interval)
+SETTINGS = (
+    ('every op', 0, 0.0),
+    ('4 KiB', 4*1024, 1.0),
+    ('64 KiB', 64*1024, 1.0),
+    ('10 ms', 1 << 40, 0.01),
+)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description='Throughput, fsyncs, write amplification and replay time of the durable map.')
+    parser.add_argument('--ops', type=int, default=20_000,
+                        help='number of puts and removes per setting')
+    parser.add_argument('--keys', type=int, default=5_000,
+                        help='number of distinct keys')
+    args = parser.parse_args()
+
+    rng = random.Random(1)
+    operations = [('key' + str(rng.randrange(args.keys)), rng.random() < 0.8)
+                  for _ in range(args.ops)]
+    print(f"{'commit':>9}  {'ops/s':>9}  {'fsyncs/1k':>9}  {'write amp':>9}  "
+          f"{'log MB':>7}  {'compacted':>9}  {'replay ms':>9}")
+    with tempfile.TemporaryDirectory() as directory:
+        for name, sync_bytes, sync_interval in SETTINGS:
+            path = os.path.join(directory, name.replace(' ', '_') + '.wal')
+            m = DurableHashMap(path, fnv1a, sync_bytes, sync_interval)
+            start = time.perf_counter()
+            for ind, (key, put) in enumerate(operations):
+                if put:
+                    m.put(key, 'value' + str(ind))
+                else:
+                    m.remove(key)
+            m.commit()
+            seconds = time.perf_counter()-start
+            stats = m.stats()
+            size = m.log_size()/1e6
+            m.close()
+
+            start = time.perf_counter()
+            m = DurableHashMap(path, fnv1a)
+            replay = time.perf_counter()-start
+            m.compact()
+            compacted = m.log_size()/1e6
+            m.close()
+            print(f"{name:>9}  {args.ops/seconds:9.0f}  {stats['fsyncs_per_1k_ops']:9.1f}  "
+                  f"{stats['write_amplification']:9.2f}  {size:7.2f}  {compacted:9.2f}  "
+                  f"{replay*1000:9.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+# Name: Blake Jennings
+# Email: blakej94@gmail.com
+# Description: Reproducible workloads for the benchmarks. Every workload is
+#              built from a seeded random number generator and consists of
+#              setup keys, put into the map before timing starts, and a list
+#              of timed (operation, key) pairs.
+
+import random
+from itertools import accumulate
+
+# Operations
+PUT = 0
+GET = 1
+REMOVE = 2
+
+
+def sequential_keys(count: int) -> list:
+    """Return 'str0', 'str1', ... like the examples of the hash maps use."""
+    return ['str' + str(i) for i in range(count)]
+
+
+def random_keys(count: int, rng: random.Random) -> list:
+    """Return distinct keys that look like user ids."""
+    keys = set()
+    while len(keys) < count:
+        keys.add('user:%012x' % rng.getrandbits(48))
+    return sorted(keys)
+
+
+def anagram_keys(count: int, rng: random.Random) -> list:
+    """
+    Return distinct permutations of the same ten letters, which all have
+    the same hash_function_1 value.
+    """
+    keys = set()
+    letters = list('abcdefghij')
+    while len(keys) < count:
+        rng.shuffle(letters)
+        keys.add(''.join(letters))
+    return sorted(keys)
+
+
+def _mixed(count: int, choose, rng: random.Random, writes: float) -> list:
+    """Return count gets and puts of keys drawn by choose, writes of them puts."""
+    return [(PUT if rng.random() < writes else GET, choose()) for _ in range(count)]
+
+
+def uniform(count: int, keys: int, rng: random.Random) -> tuple:
+    """
+    Reads and updates, 90% gets and 10% puts, of keys drawn uniformly from
+    a preloaded key set.
+
+    :param count: number of timed operations
+    :param keys:  number of distinct keys
+    :param rng:   random number generator
+
+    :return:      tuple of the setup keys and the timed operations
+    """
+    setup = random_keys(keys, rng)
+    return setup, _mixed(count, lambda: rng.choice(setup), rng, 0.1)
+
+
+def zipf(count: int, keys: int, rng: random.Random, exponent: float = 1.0) -> tuple:
+    """
+    Reads and updates like uniform, but the key of rank r is drawn with
+    probability proportional to 1 / r ** exponent, so a few hot keys get
+    most of the traffic.
+    """
+    setup = random_keys(keys, rng)
+    weights = list(accumulate(1/(rank+1)**exponent for rank in range(keys)))
+    return setup, _mixed(count, lambda: rng.choices(setup, cum_weights=weights)[0],
+                         rng, 0.1)
+
+
+def sequential(count: int, keys: int, rng: random.Random) -> tuple:
+    """
+    Puts 'str0' to 'str<n>' into an empty map, growing it through every
+    resize, then gets them back in the same order; keys is unused.
+    """
+    names = sequential_keys(count//2)
+    return [], [(PUT, key) for key in names]+[(GET, key) for key in names]
+
+
+def anagram(count: int, keys: int, rng: random.Random) -> tuple:
+    """
+    Gets and puts like uniform over keys that are all anagrams of each
+    other, the worst case of hash_function_1.
+    """
+    setup = anagram_keys(keys, rng)
+    return setup, _mixed(count, lambda: rng.choice(setup), rng, 0.1)
+
+
+def churn(count: int, keys: int, rng: random.Random) -> tuple:
+    """
+    Keeps the map at a steady size while its contents turn over: every
+    step puts a new key and removes a random live one, with a get of a
+    live key in between, which leaves tombstones behind in open addressing
+    maps.
+    """
+    setup = random_keys(keys, rng)
+    live = list(setup)
+    fresh = 0
+    operations = []
+    while len(operations) < count:
+        key = 'new:' + str(fresh)
+        fresh += 1
+        live.append(key)
+        operations.append((PUT, key))
+        operations.append((GET, rng.choice(live)))
+        ind = rng.randrange(len(live))
+        live[ind], live[-1] = live[-1], live[ind]
+        operations.append((REMOVE, live.pop()))
+    return setup, operations[:count]
+
+
+WORKLOADS = {
+    'uniform': uniform,
+    'zipf': zipf,
+    'sequential': sequential,
+    'anagram': anagram,
+    'churn': churn,
+}
+
+
+def build(name: str, count: int, keys: int, seed: int) -> tuple:
+    """
+    Builds a workload from its own generator seeded with seed, so the same
+    arguments always give the same operations.
+
+    :param name:  name of the workload, a key of WORKLOADS
+    :param count: number of timed operations
+    :param keys:  number of distinct keys
+    :param seed:  random seed
+
+    :return:      tuple of the setup keys and the timed operations
+    """
+    return WORKLOADS[name](count, keys, random.Random(seed))
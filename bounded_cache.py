@@ -0,0 +1,409 @@
+# Name: Blake Jennings
+# Email: blakej94@gmail.com
+# Description: A bounded cache built on the separate chaining HashMap. Every
+#              stored node is also threaded through a doubly linked recency
+#              list, so the least recently used entry can be found and
+#              evicted in constant time once the cache holds max_entries
+#              entries or max_bytes bytes. An optional TinyLFU admission
+#              policy keeps a count-min sketch of how often keys are used
+#              and only lets a new key in if it is used more often than the
+#              entry it would evict.
+
+import sys
+
+from a6_include import DynamicArray, SLNode, hash_function_1
+from batch import as_list
+from hash_map_sc import HashMap
+from hashing import MASK64, mix64
+
+GOLDEN64 = 0x9E3779B97F4A7C15
+
+
+class CacheNode(SLNode):
+    """
+    Singly Linked List node of a bucket that is also a node of the doubly
+    linked recency list of a BoundedCache
+    """
+
+    __slots__ = ('newer', 'older', 'size')
+
+    def __init__(self, key: str, value: object, next: "CacheNode" = None,
+                 hash: int = None, size: int = 0) -> None:
+        """Initialize node given a key, value, full hash and size in bytes."""
+        super().__init__(key, value, next, hash)
+        self.newer = None
+        self.older = None
+        self.size = size
+
+
+class CountMinSketch:
+    """
+    Approximate use counts of keys, kept in depth rows of width 4-bit
+    counters. A key's count is the smallest of its counters, which can only
+    overestimate. Every counter is halved once sample increments have been
+    made, so counts follow recent use rather than all-time use.
+    """
+
+    def __init__(self, width: int, depth: int = 4) -> None:
+        """Initialize the sketch, rounding width up to a power of two."""
+        self._width = 1 << max(4, (width-1).bit_length())
+        self._depth = depth
+        self._counters = bytearray(self._width*depth)
+        self._sample = 10*self._width
+        self._additions = 0
+
+    def _indices(self, hash: int) -> list:
+        """Return the counter of every row for the given full hash."""
+        width = self._width
+        hash &= MASK64
+        return [row*width+(mix64((hash+row*GOLDEN64) & MASK64) & (width-1))
+                for row in range(self._depth)]
+
+    def increment(self, hash: int) -> None:
+        """
+        Counts one more use of the key with the given full hash.
+
+        :param hash: full hash of the key
+
+        :return:     None
+        """
+        counters = self._counters
+        for ind in self._indices(hash):
+            if counters[ind] < 15:
+                counters[ind] += 1
+        self._additions += 1
+        if self._additions >= self._sample:
+            self._counters = bytearray(count >> 1 for count in counters)
+            self._additions >>= 1
+
+    def estimate(self, hash: int) -> int:
+        """
+        Returns the approximate number of recent uses of the key with the
+        given full hash.
+
+        :param hash: full hash of the key
+
+        :return:     estimated count, between 0 and 15
+        """
+        counters = self._counters
+        return min(counters[ind] for ind in self._indices(hash))
+
+
+def _sizeof(key: str, value: object) -> int:
+    """Default size of a cache entry: the shallow sizes of key and value."""
+    return sys.getsizeof(key)+sys.getsizeof(value)
+
+
+class BoundedCache(HashMap):
+    def __init__(self,
+                 max_entries: int = None,
+                 max_bytes: int = None,
+                 admission: str = None,
+                 capacity: int = 11,
+                 function: callable = hash_function_1,
+                 sizeof: callable = _sizeof,
+                 **options) -> None:
+        """
+        Initialize new BoundedCache that holds at most max_entries entries
+        and at most max_bytes bytes, as measured by sizeof(key, value);
+        either limit can be left out, but not both. Once a limit is
+        reached, the least recently used entries are evicted. get and put
+        make an entry the most recently used one; contains_key does not.
+        If admission is 'tinylfu', a new key is only admitted into a full
+        cache if it has been used more often lately than the entry that
+        would be evicted for it. The other arguments are passed on to
+        HashMap.
+        """
+        if max_entries is None and max_bytes is None:
+            raise ValueError("max_entries or max_bytes must be given")
+        if admission not in (None, 'tinylfu'):
+            raise ValueError("admission must be None or 'tinylfu'")
+        super().__init__(capacity, function, **options)
+        self._max_entries = max_entries
+        self._max_bytes = max_bytes
+        self._sizeof = sizeof
+        self._bytes = 0
+        self._sketch = None
+        if admission == 'tinylfu':
+            self._sketch = CountMinSketch(max_entries or 1024)
+
+        # sentinel of the circular recency list: its older node is the most
+        # recently used entry and its newer node the least recently used
+        self._recent = CacheNode(None, None)
+        self._recent.newer = self._recent.older = self._recent
+
+        # counters
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.rejections = 0
+
+    def get_bytes(self) -> int:
+        """
+        Return total size of the entries in bytes
+        """
+        return self._bytes
+
+    # ------------------------------------------------------------------ #
+
+    def _link(self, node: CacheNode) -> None:
+        """Make a node that is not in the recency list the most recent one."""
+        recent = self._recent
+        node.older = recent.older
+        node.newer = recent
+        recent.older.newer = node
+        recent.older = node
+
+    def _unlink(self, node: CacheNode) -> None:
+        """Take a node out of the recency list."""
+        node.older.newer = node.newer
+        node.newer.older = node.older
+
+    def _touch(self, node: CacheNode) -> None:
+        """Make a node the most recently used one."""
+        if self._recent.older is not node:
+            self._unlink(node)
+            self._link(node)
+
+    def _over(self, entries: int, size: int) -> bool:
+        """Determine if the given number of entries and bytes break a limit."""
+        return (self._max_entries is not None and entries > self._max_entries) or \
+            (self._max_bytes is not None and size > self._max_bytes)
+
+    def _discard(self, node: CacheNode) -> None:
+        """
+        Removes a node from its bucket and from the recency list.
+
+        :param node: node to remove
+
+        :return:     None
+        """
+        self._unlink(node)
+        buckets, ind = self._locate(node.hash)
+        link = buckets.get_at_index(ind)
+        link.remove(node.key, node.hash)
+        if link.length() == 0:
+            buckets.set_at_index(ind, None)
+        self._size -= 1
+        self._bytes -= node.size
+        self._mod_count += 1
+
+    def _evict(self, keep: CacheNode) -> None:
+        """
+        Evicts least recently used entries until the cache is within its
+        limits again, never evicting the given node.
+
+        :param keep: node that was just added or updated
+
+        :return:     None
+        """
+        while self._over(self._size, self._bytes):
+            victim = self._recent.newer
+            if victim is keep:
+                return
+            self._discard(victim)
+            self.evictions += 1
+
+    def _admit(self, hash: int, size: int) -> bool:
+        """
+        Decides whether a new key may enter the cache. Keys are always
+        admitted while there is room; in a full cache a TinyLFU cache only
+        admits keys used more often than the least recently used entry.
+
+        :param hash: full hash of the new key
+        :param size: size of the new entry in bytes
+
+        :return:     True if the key is admitted
+                     False otherwise
+        """
+        if self._max_bytes is not None and size > self._max_bytes:
+            return False
+        if self._sketch is None or not self._over(self._size+1, self._bytes+size):
+            return True
+        victim = self._recent.newer
+        return self._sketch.estimate(hash) > self._sketch.estimate(victim.hash)
+
+    def _insert(self, key: str, value: object, hash: int) -> None:
+        """
+        Adds or updates a key/value pair with an already computed hash,
+        makes it the most recently used entry and evicts entries until the
+        cache is within its limits. New keys the admission policy turns
+        away, and entries larger than max_bytes, are not stored.
+
+        :param key:   string to assign to key of key/value pair
+        :param value: object to assign to value of key/value pair
+        :param hash:  full hash of the key
+
+        :return:      None
+        """
+        if self._sketch is not None:
+            self._sketch.increment(hash)
+        link = self._chain_for(hash)
+        if self._stats is None:
+            node = link.contains(key, hash)
+        else:
+            node, probes = link.find(key, hash)
+            self._stats.insert(probes)
+        size = self._sizeof(key, value)
+        if node is not None:
+            if self._max_bytes is not None and size > self._max_bytes:
+                self._discard(node)
+                self.rejections += 1
+                return
+            self._bytes += size-node.size
+            node.value = value
+            node.size = size
+            self._touch(node)
+        elif self._admit(hash, size):
+            node = CacheNode(key, value, None, hash, size)
+            link.insert_node(node)
+            self._link(node)
+            self._size += 1
+            self._bytes += size
+            self._mod_count += 1
+        else:
+            self.rejections += 1
+            return
+        self._evict(node)
+
+    def get(self, key: str):
+        """
+        Returns the value associated with the given key and makes it the
+        most recently used entry, counting a hit or a miss.
+
+        :param key: key to find value of
+
+        :return:    value if the key exists in the cache
+                    None otherwise
+        """
+        if self._old_buckets is not None:
+            self._migrate()
+        hash = self._hash_function(key)
+        if self._sketch is not None:
+            self._sketch.increment(hash)
+        link = self._bucket_for(hash)
+        if self._stats is not None:
+            node = self._search(link, key, hash)
+        else:
+            node = None if link is None else link.contains(key, hash)
+        if node is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._touch(node)
+        return node.value
+
+    def get_many(self, keys) -> DynamicArray:
+        """
+        Returns the values associated with a batch of keys, calling get for
+        each of them so that hits, misses and recency are tracked.
+
+        :param keys: DynamicArray or iterable of keys to find values of
+
+        :return:     DynamicArray of the values in the order of the keys,
+                     None for every key that is not in the cache
+        """
+        return DynamicArray([self.get(key) for key in as_list(keys)])
+
+    def remove(self, key: str) -> None:
+        """
+        Removes the given key and its value from the cache.
+        Does nothing if the key does not exist.
+
+        :param key: key to remove from the cache
+
+        :return:    None
+        """
+        if self._old_buckets is not None:
+            self._migrate()
+        hash = self._hash_function(key)
+        link = self._bucket_for(hash)
+        node = None if link is None else link.contains(key, hash)
+        if node is not None:
+            self._unlink(node)
+            self._bytes -= node.size
+            super().remove(key)
+
+    def clear(self) -> None:
+        """
+        Clears the contents of the cache. The counters and the use counts
+        of the admission policy are kept.
+
+        :return: None
+        """
+        super().clear()
+        self._recent.newer = self._recent.older = self._recent
+        self._bytes = 0
+
+    def stats(self) -> dict:
+        """
+        Return the number of entries and bytes, the hit, miss, eviction and
+        rejection counters and the hit ratio of the cache.
+        """
+        lookups = self.hits+self.misses
+        return {
+            'entries': self._size,
+            'bytes': self._bytes,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'rejections': self.rejections,
+            'hit_ratio': self.hits/lookups if lookups else 0.0,
+        }
+
+# ------------------- BASIC TESTING ---------------------------------------- #
+
+
+if __name__ == "__main__":
+    import io
+    import random
+
+    print("\nLRU eviction example 1")
+    print("----------------------")
+    c = BoundedCache(max_entries=3)
+    for key in ('a', 'b', 'c'):
+        c.put(key, key.upper())
+    c.get('a')
+    c.put('d', 'D')
+    print(c.get_size(), c.contains_key('a'), c.contains_key('b'), c.get('d'))
+    c.put('c', 'updated')
+    c.put('e', 'E')
+    print(sorted(c.keys()), c.stats()['evictions'])
+
+    print("\nmax_bytes example 1")
+    print("-------------------")
+    c = BoundedCache(max_bytes=100, sizeof=lambda key, value: len(value))
+    for i in range(10):
+        c.put('str' + str(i), 'x' * 30)
+    print(c.get_size(), c.get_bytes(), sorted(c.keys()))
+    c.put('big', 'x' * 101)
+    c.put('str9', 'x' * 90)
+    print(c.get_size(), c.get_bytes(), c.contains_key('big'), c.stats()['rejections'])
+
+    print("\nLRU / TinyLFU hit ratio example 1")
+    print("---------------------------------")
+    # a skewed workload of memoized lookups interrupted by one-off scans
+    rng = random.Random(3)
+    weights = [1/(rank+1) for rank in range(5000)]
+    requests = []
+    for _ in range(20):
+        requests += ['hot' + str(rank) for rank in rng.choices(range(5000), weights, k=2000)]
+        requests += ['scan' + str(rng.randrange(10**9)) for _ in range(500)]
+    for admission in (None, 'tinylfu'):
+        c = BoundedCache(max_entries=500, admission=admission)
+        for key in requests:
+            if c.get(key) is None:
+                c.put(key, key)
+        stats = c.stats()
+        print(admission, c.get_size(), round(stats['hit_ratio'], 3), stats['evictions'] > 0)
+
+    print("\nfrom_items / load example 1")
+    print("---------------------------")
+    c = BoundedCache.from_items([('str' + str(i), i) for i in range(10)], hash_function_1,
+                                max_entries=4)
+    print(c.get_size(), sorted(c.keys()), c.stats()['evictions'])
+    snapshot = io.BytesIO()
+    c.dump(snapshot)
+    snapshot.seek(0)
+    c = BoundedCache.load(snapshot, max_entries=2, admission='tinylfu')
+    print(type(c).__name__, c.get_size(), sorted(c.keys()), c.stats()['rejections'])
@@ -0,0 +1,124 @@
+# Name: Blake Jennings
+# Email: blakej94@gmail.com
+# Description: Capacity planning for the hash maps: a precomputed ladder of
+#              prime capacities for growth and a Miller-Rabin primality test
+#              for arbitrary capacities.
+
+from bisect import bisect_left
+
+# Smallest prime at or above 3/4 of each power of two from 2^2 up to 2^41.
+# Each step roughly doubles the previous one while staying well away from
+# the powers of two themselves, and the last entry is past 2^40.
+PRIME_LADDER = (
+    3, 7, 13, 29, 53, 97, 193, 389, 769, 1543, 3079, 6151, 12289, 24593,
+    49157, 98317, 196613, 393241, 786433, 1572869, 3145739, 6291469,
+    12582917, 25165843, 50331653, 100663319, 201326611, 402653189,
+    805306457, 1610612741, 3221225473, 6442450967, 12884901893,
+    25769803799, 51539607599, 103079215111, 206158430209, 412316860441,
+    824633720837, 1649267441681,
+)
+
+# Witnesses that make Miller-Rabin deterministic for every n below
+# 3,317,044,064,679,887,385,961,981
+_WITNESSES = (2, 3, 5, 7, 11, 13, 17, 19, 23, 29, 31, 37)
+
+
+def is_prime(capacity: int) -> bool:
+    """
+    Determines if the given integer is a prime number using Miller-Rabin
+    with a fixed set of witnesses, which is exact for every capacity a
+    hash table could have.
+
+    :param capacity: integer to test
+
+    :return:         True if the integer is prime, False otherwise
+    """
+    if capacity < 2:
+        return False
+    for witness in _WITNESSES:
+        if capacity % witness == 0:
+            return capacity == witness
+
+    odd, twos = capacity-1, 0
+    while odd % 2 == 0:
+        odd //= 2
+        twos += 1
+
+    for witness in _WITNESSES:
+        x = pow(witness, odd, capacity)
+        if x == 1 or x == capacity-1:
+            continue
+        for _ in range(twos-1):
+            x = x*x % capacity
+            if x == capacity-1:
+                break
+        else:
+            return False
+    return True
+
+
+def next_prime(capacity: int) -> int:
+    """
+    Returns the smallest prime number that is greater than or equal to
+    the given capacity.
+
+    :param capacity: requested capacity
+
+    :return:         smallest prime at or above the capacity
+    """
+    if capacity <= 2:
+        return 2
+    if capacity % 2 == 0:
+        capacity += 1
+    while not is_prime(capacity):
+        capacity += 2
+    return capacity
+
+
+def ladder_prime(capacity: int) -> int:
+    """
+    Returns the smallest prime of PRIME_LADDER that is greater than or equal
+    to the given capacity, found by binary search. Capacities past the end
+    of the ladder fall back to next_prime.
+
+    :param capacity: requested capacity
+
+    :return:         smallest ladder prime at or above the capacity
+    """
+    ind = bisect_left(PRIME_LADDER, capacity)
+    if ind < len(PRIME_LADDER):
+        return PRIME_LADDER[ind]
+    return next_prime(capacity)
+
+
+def grow_capacity(capacity: int, factor: float = 2) -> int:
+    """
+    Returns the ladder prime a table of the given capacity should grow to:
+    the rung closest to capacity * factor, and at least the next rung
+    above the current capacity, so a small factor still grows the table.
+
+    :param capacity: current capacity of the table
+    :param factor:   desired growth factor
+
+    :return:         ladder prime above the capacity to grow to
+    """
+    return max(ladder_prime(int(capacity*factor*3/4)+1), ladder_prime(capacity+1))
+
+# ------------------- BASIC TESTING ---------------------------------------- #
+
+
+if __name__ == "__main__":
+
+    print("\nis_prime / next_prime example 1")
+    print("-------------------------------")
+    print([n for n in range(30) if is_prime(n)])
+    print(next_prime(1), next_prime(90), next_prime(2**61-2), is_prime(2**61-1))
+
+    print("\nprime ladder example 1")
+    print("----------------------")
+    print(ladder_prime(1), ladder_prime(100), ladder_prime(769), ladder_prime(2**42))
+    capacity, path = 11, []
+    for _ in range(6):
+        capacity = grow_capacity(capacity)
+        path.append(capacity)
+    print(path)
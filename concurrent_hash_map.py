@@ -0,0 +1,383 @@
+# Name: Blake Jennings
+# Email: blakej94@gmail.com
+# Description: A thread-safe hash map that uses separate chaining with lock
+#              striping. The buckets are split into segments, each with its
+#              own bucket array, lock and size counter, so writers only
+#              contend when their keys land in the same segment. Reads take
+#              no lock at all.
+
+import threading
+from math import ceil
+
+from a6_include import (DynamicArray, LinkedList, SLNode, hash_function_1,
+                        hash_function_2)
+from capacity import grow_capacity, next_prime
+from views import ItemsView, KeysView, ValuesView
+
+
+class _Segment:
+    """
+    One lock stripe of a ConcurrentHashMap. Writers hold the lock. The
+    bucket array and its capacity are published together as one tuple, so
+    a reader that loads the table once always sees a matching pair, and
+    resizing builds a fresh array of new nodes instead of relinking the
+    nodes readers may be walking.
+    """
+
+    def __init__(self, capacity: int, stripes: int) -> None:
+        """
+        Initialize an empty segment with a prime capacity. stripes is the
+        number of segments of the map, which the hash of a key is divided
+        by to pick its bucket within the segment.
+        """
+        capacity = next_prime(capacity)
+        self.table = (_buckets(capacity), capacity)
+        self.stripes = stripes
+        self.lock = threading.Lock()
+        self.size = 0
+
+    def find(self, key: str, hash: int, spread: int) -> SLNode:
+        """
+        Return the node holding the key, or None, without locking. A new
+        node is linked in front of a chain with a single assignment of the
+        head, and a removed node keeps its next pointer, so walking a chain
+        while it changes never skips the rest of it.
+        """
+        buckets, capacity = self.table
+        return buckets.get_at_index(spread%capacity).contains(key, hash)
+
+    def put(self, key: str, value: object, hash: int, spread: int,
+            max_load: float, growth_factor: float) -> None:
+        """Add or update a key/value pair, growing the segment first if needed."""
+        with self.lock:
+            buckets, capacity = self.table
+            link = buckets.get_at_index(spread%capacity)
+            node = link.contains(key, hash)
+            if node is not None:
+                node.value = value
+                return
+            if self.size/capacity >= max_load:
+                self.resize(grow_capacity(capacity, growth_factor))
+                buckets, capacity = self.table
+                link = buckets.get_at_index(spread%capacity)
+            link.insert(key, value, hash)
+            self.size += 1
+
+    def remove(self, key: str, hash: int, spread: int) -> bool:
+        """Remove the key and return True if it was in the segment."""
+        with self.lock:
+            buckets, capacity = self.table
+            link = buckets.get_at_index(spread%capacity)
+            if link.contains(key, hash) is None:
+                return False
+            link.remove(key)
+            self.size -= 1
+            return True
+
+    def resize(self, new_capacity: int) -> None:
+        """
+        Copy every node into a new bucket array and publish it. Must be
+        called with the lock held; only this segment is blocked meanwhile.
+        """
+        buckets, capacity = self.table
+        new_capacity = next_prime(new_capacity)
+        new_buckets = _buckets(new_capacity)
+        for ind in range(capacity):
+            for node in buckets.get_at_index(ind):
+                bucket = (node.hash//self.stripes)%new_capacity
+                new_buckets.get_at_index(bucket).insert(node.key, node.value, node.hash)
+        self.table = (new_buckets, new_capacity)
+
+    def clear(self, capacity: int) -> None:
+        """Publish an empty bucket array of the given capacity."""
+        with self.lock:
+            self.table = (_buckets(capacity), capacity)
+            self.size = 0
+
+    def nodes(self):
+        """Generate the nodes of a snapshot of the bucket array, without locking."""
+        buckets, capacity = self.table
+        for ind in range(capacity):
+            yield from buckets.get_at_index(ind)
+
+
+def _buckets(capacity: int) -> DynamicArray:
+    """Return a new bucket array of empty linked lists."""
+    return DynamicArray([LinkedList() for _ in range(capacity)])
+
+
+class ConcurrentHashMap:
+    def __init__(self, capacity: int = 11, function=hash_function_1,
+                 stripes: int = 16, max_load: float = 1.0,
+                 growth_factor: float = 2) -> None:
+        """
+        Initialize new ConcurrentHashMap that uses separate chaining for
+        collision resolution, with its buckets split into the given number
+        of lock stripes. The key's hash modulo the number of stripes picks
+        the stripe and the rest of the hash picks the bucket, so both use
+        different bits of it. Each stripe grows on its own by growth_factor
+        once its load reaches max_load.
+        """
+        if stripes < 1:
+            raise ValueError("stripes must be at least 1")
+        if max_load <= 0 or growth_factor <= 1:
+            raise ValueError("max_load must be positive and growth_factor above 1")
+        self._hash_function = function
+        self._stripes = stripes
+        self._max_load = max_load
+        self._growth_factor = growth_factor
+        self._segment_capacity = next_prime(ceil(capacity/stripes))
+        self._segments = tuple(_Segment(self._segment_capacity, stripes)
+                               for _ in range(stripes))
+
+    def __str__(self) -> str:
+        """
+        Override string method to provide more readable output
+        """
+        out = ''
+        for ind, segment in enumerate(self._segments):
+            buckets, capacity = segment.table
+            for i in range(capacity):
+                out += str(ind) + '.' + str(i) + ': ' + str(buckets[i]) + '\n'
+        return out
+
+    def get_size(self) -> int:
+        """
+        Return size of map, summed over the per-stripe counters
+        """
+        return sum(segment.size for segment in self._segments)
+
+    def get_capacity(self) -> int:
+        """
+        Return capacity of map, summed over the stripes
+        """
+        return sum(segment.table[1] for segment in self._segments)
+
+    # ------------------------------------------------------------------ #
+
+    def _locate(self, key: str) -> tuple:
+        """
+        Hashes a key outside of any lock and splits the hash into the stripe
+        it belongs to and the part that picks its bucket within the stripe.
+
+        :param key: key to locate
+
+        :return:    tuple of the segment, the full hash and the bucket hash
+        """
+        hash = self._hash_function(key)
+        return self._segments[hash%self._stripes], hash, hash//self._stripes
+
+    def put(self, key: str, value: object) -> None:
+        """
+        Adds a key/value pair to the hash map. If the key already exists,
+        it updates the keys value to the new value. Only the stripe of the
+        key is locked, and if it has reached max_load only that stripe
+        is resized.
+
+        :param key:   string to assign to key of key/value pair
+        :param value: object to assign to value of key/value pair
+
+        :return:      None
+        """
+        segment, hash, spread = self._locate(key)
+        segment.put(key, value, hash, spread, self._max_load, self._growth_factor)
+
+    def get(self, key: str):
+        """
+        Returns the value associated with the given key, without locking.
+
+        :param key: key to find value of
+
+        :return:    value if the key exists in the hash map
+                    None otherwise
+        """
+        segment, hash, spread = self._locate(key)
+        node = segment.find(key, hash, spread)
+        if node is not None:
+            return node.value
+        return None
+
+    def contains_key(self, key: str) -> bool:
+        """
+        Determines if the given key is in the hash map, without locking.
+
+        :param key: key to analyze if it exists in the hash map
+
+        :return:    True if the key exists in the hash map
+                    False otherwise
+        """
+        segment, hash, spread = self._locate(key)
+        return segment.find(key, hash, spread) is not None
+
+    def remove(self, key: str) -> None:
+        """
+        Removes the given key and its value from the hash map, locking only
+        the stripe of the key. Does nothing if the key does not exist.
+
+        :param key: key to remove from the hash map
+
+        :return:    None
+        """
+        segment, hash, spread = self._locate(key)
+        segment.remove(key, hash, spread)
+
+    def table_load(self) -> float:
+        """
+        Returns the current load factor of the hash table.
+
+        :return: float indicating load factor
+        """
+        return self.get_size()/self.get_capacity()
+
+    def empty_buckets(self) -> int:
+        """
+        Returns the number of empty buckets in the hash table.
+
+        :return: number of empty buckets
+        """
+        empty = 0
+        for segment in self._segments:
+            buckets, capacity = segment.table
+            for ind in range(capacity):
+                if buckets.get_at_index(ind).length() == 0:
+                    empty += 1
+        return empty
+
+    def resize_table(self, new_capacity: int) -> None:
+        """
+        Resizes the hash table so that its stripes together have at least
+        new_capacity buckets. The stripes are resized one at a time, each
+        holding only its own lock, so the rest of the map stays available.
+
+        :param new_capacity: new desired capacity for the hash table
+
+        :return:             None
+        """
+        if new_capacity < 1:
+            return
+        for segment in self._segments:
+            with segment.lock:
+                segment.resize(ceil(new_capacity/self._stripes))
+
+    def clear(self) -> None:
+        """
+        Clears the hash map, one stripe at a time, without changing the
+        initial capacity of the stripes.
+
+        :return: None
+        """
+        for segment in self._segments:
+            segment.clear(self._segment_capacity)
+
+    def get_keys_and_values(self) -> DynamicArray:
+        """
+        Returns a DynamicArray of all the key/value pairs in the hash map
+        in the form of tuples.
+
+        :return: DynamicArray of key/value tuples of every key/value pair
+                 in the hash map
+        """
+        new_array = DynamicArray()
+        for item in self.items():
+            new_array.append(item)
+        return new_array
+
+    def __iter__(self):
+        """
+        Returns a weakly consistent iterator over the nodes of the hash
+        map. It never raises because of concurrent changes: each stripe is
+        walked from the bucket array it had when the iterator reached it,
+        so keys added or removed meanwhile may or may not be seen.
+
+        :return: generator of SLNode
+        """
+        for segment in self._segments:
+            yield from segment.nodes()
+
+    def keys(self) -> KeysView:
+        """
+        Returns a lazy view of the keys in the hash map.
+
+        :return: KeysView of the hash map
+        """
+        return KeysView(self)
+
+    def values(self) -> ValuesView:
+        """
+        Returns a lazy view of the values in the hash map.
+
+        :return: ValuesView of the hash map
+        """
+        return ValuesView(self)
+
+    def items(self) -> ItemsView:
+        """
+        Returns a lazy view of the key/value pairs in the hash map, as
+        tuples.
+
+        :return: ItemsView of the hash map
+        """
+        return ItemsView(self)
+
+# ------------------- BASIC TESTING ---------------------------------------- #
+
+
+if __name__ == "__main__":
+
+    print("\nput / get / remove example 1")
+    print("----------------------------")
+    m = ConcurrentHashMap(53, hash_function_1, stripes=4)
+    for i in range(150):
+        m.put('str' + str(i), i * 100)
+        if i % 25 == 24:
+            print(m.empty_buckets(), round(m.table_load(), 2), m.get_size(), m.get_capacity())
+    print(m.get('str7'), m.contains_key('str149'), m.contains_key('str150'))
+    for i in range(0, 150, 2):
+        m.remove('str' + str(i))
+    print(m.get_size(), m.get('str6'), m.get('str7'))
+
+    print("\nmulti-threaded stress test")
+    print("--------------------------")
+    m = ConcurrentHashMap(11, hash_function_2, stripes=8)
+    threads = 8
+    per_thread = 5000
+    errors = []
+
+    def writer(worker: int) -> None:
+        """Put, update and remove keys of its own, reading shared keys."""
+        for i in range(per_thread):
+            key = 'w' + str(worker) + '-' + str(i)
+            m.put(key, i)
+            m.put('shared' + str(i % 100), worker)
+            if m.get(key) != i:
+                errors.append(key)
+            if i % 3 == 0:
+                m.remove(key)
+                if m.contains_key(key):
+                    errors.append(key)
+
+    def reader() -> None:
+        """Read and iterate while the writers grow the stripes."""
+        for _ in range(20):
+            for node in m:
+                if node.key is None:
+                    errors.append('iterator')
+            for i in range(100):
+                value = m.get('shared' + str(i))
+                if value is not None and not 0 <= value < threads:
+                    errors.append('shared' + str(i))
+
+    workers = [threading.Thread(target=writer, args=(w,)) for w in range(threads)]
+    workers += [threading.Thread(target=reader) for _ in range(2)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+    expected = threads*(per_thread-ceil(per_thread/3))+100
+    print(m.get_size() == expected, len(list(m.keys())) == expected, errors == [])
+    result = True
+    for w in range(threads):
+        for i in range(per_thread):
+            result &= m.contains_key('w' + str(w) + '-' + str(i)) == (i % 3 != 0)
+    print(result, m.get_capacity() >= m.get_size())
@@ -2,75 +2,178 @@
 # Email: blakej94@gmail.com
 # Description: A hash map that uses open addressing and its various methods.
 
-from a6_include import (DynamicArray, DynamicArrayException, HashEntry,
-                        hash_function_1, hash_function_2)
+import heapq
+import time
+from itertools import count, islice
+from math import ceil
+
+from a6_include import (ConcurrentModificationException, DynamicArray,
+                        HashEntry, hash_function_1, hash_function_2)
+from batch import as_list, hash_keys
+from capacity import grow_capacity, next_prime
+from mapped_hash_map import MappedHashMap, save_packed
+from views import ItemsView, KeysView, ValuesView
+
+
+# Probing strategies
+QUADRATIC = 'quadratic'
+LINEAR = 'linear'
+DOUBLE = 'double'
+ROBIN_HOOD = 'robin_hood'
+PROBING = (QUADRATIC, LINEAR, DOUBLE, ROBIN_HOOD)
+
+# Left behind in the buckets of the old table that an incremental resize
+# has already moved, so probe paths through them stay unbroken
+_MOVED = HashEntry(None, None)
+_MOVED.is_tombstone = True
+
+
+class HashMapIterator:
+    """
+    Separate iterator class for the open addressing HashMap
+    """
+
+    def __init__(self, hash_map: "HashMap") -> None:
+        """
+        Initialize the iterator at the first bucket of the map, finishing
+        any incremental rehash first so there is a single table to scan.
+        Entries that have expired by now are skipped but left in place.
+        """
+        hash_map._finish_rehash()
+        self._map = hash_map
+        self._buckets = hash_map._buckets
+        self._capacity = hash_map._capacity
+        self._mod_count = hash_map._mod_count
+        self._now = hash_map._clock() if hash_map._expiry else None
+        self._index = 0
+
+    def __iter__(self) -> "HashMapIterator":
+        """Return the iterator."""
+        return self
+
+    def __next__(self) -> HashEntry:
+        """
+        Obtain the next live entry and advance the iterator.
+        Raise ConcurrentModificationException if the map gained, lost or
+        moved entries since the iterator was created.
+        """
+        if self._map._mod_count != self._mod_count:
+            raise ConcurrentModificationException
+        while self._index < self._capacity:
+            entry = self._buckets.get_at_index(self._index)
+            self._index += 1
+            if entry is not None and entry.is_tombstone is False and \
+                    (entry.expires is None or self._now is None or entry.expires > self._now):
+                return entry
+        raise StopIteration
 
 
 class HashMap:
-    def __init__(self, capacity: int, function) -> None:
+    def __init__(self, capacity: int, function,
+                 compact_load: float = None,
+                 probing: str = QUADRATIC,
+                 max_load: float = 0.5,
+                 min_load: float = 0.125,
+                 growth_factor: float = 2,
+                 shrink: bool = False,
+                 incremental: bool = False,
+                 rehash_batch: int = 8,
+                 clock: callable = time.monotonic,
+                 sweep_batch: int = 4) -> None:
         """
-        Initialize new HashMap that uses
-        quadratic probing for collision resolution
-        DO NOT CHANGE THIS METHOD IN ANY WAY
+        Initialize new HashMap that uses open addressing for collision
+        resolution. probing selects quadratic (the default), linear, double
+        hashing or Robin Hood probing. The table grows by growth_factor once
+        its load reaches max_load. If shrink is True, it shrinks once
+        removals bring its load below min_load, but never below the initial
+        capacity, and clear() goes back to the initial capacity.
+        compact_load is the combined load of live entries and tombstones
+        at which the table is rebuilt to drop its tombstones, max_load by
+        default; Robin Hood probing deletes with backward shifts and never
+        leaves tombstones. Both loads must be below 1, and at most 0.5 with
+        quadratic probing.
+        If incremental is True, automatic resizes and compactions keep the
+        old table next to the new one and every put, get, contains_key and
+        remove moves rehash_batch of its buckets into the new table, instead
+        of rebuilding the whole table at once.
+        Entries put with a ttl expire once clock() has advanced by ttl. An
+        expired entry is removed when a lookup finds it, and every put also
+        sweeps up to sweep_batch entries from the front of a min-heap of
+        expiry times.
         """
+        if probing not in PROBING:
+            raise ValueError(f"probing must be one of {', '.join(PROBING)}")
+        if growth_factor <= 1:
+            raise ValueError("growth_factor must be above 1")
+        loads = [max_load] if compact_load is None else [max_load, compact_load]
+        if not all(0 < load < 1 for load in loads):
+            raise ValueError("max_load and compact_load must be between 0 and 1")
+        # quadratic probing only reaches half the buckets of a prime table,
+        # so above a load of 0.5 an insert could probe without end
+        if probing == QUADRATIC and max(loads) > 0.5:
+            raise ValueError("max_load and compact_load must be at most 0.5 "
+                             "with quadratic probing")
+        if not 0 <= min_load < max_load/growth_factor:
+            raise ValueError("min_load must be below max_load / growth_factor")
+        self._probing = probing
         self._buckets = DynamicArray()
 
         # capacity must be a prime number
-        self._capacity = self._next_prime(capacity)
+        self._capacity = next_prime(capacity)
         for _ in range(self._capacity):
             self._buckets.append(None)
 
         self._hash_function = function
         self._size = 0
+        self._tombstones = 0
+        self._compact_load = max_load if compact_load is None else compact_load
+        self._max_load = max_load
+        self._min_load = min_load
+        self._growth_factor = growth_factor
+        self._shrink = shrink
+        self._initial_capacity = self._capacity
+
+        # bumped by every change that adds, removes or moves entries, so
+        # iterators can detect that the map changed under them
+        self._mod_count = 0
+
+        # old table while an incremental resize is in progress; its buckets
+        # below _rehash_index have been moved already
+        self._incremental = incremental
+        self._rehash_batch = rehash_batch
+        self._old_buckets = None
+        self._old_capacity = 0
+        self._rehash_index = 0
+
+        # min-heap of (expiry time, sequence number, key, hash) for every
+        # put with a ttl; items whose entry has since been updated or
+        # removed are dropped when they reach the front
+        self._clock = clock
+        self._sweep_batch = sweep_batch
+        self._expiry = []
+        self._sequence = count()
+
+        # MapStats of stats.enable_stats, which the probe loops report their
+        # lengths to; None while stats are off
+        self._stats = None
 
     def __str__(self) -> str:
         """
         Override string method to provide more readable output
-        DO NOT CHANGE THIS METHOD IN ANY WAY
         """
+        self._finish_rehash()
         out = ''
         for i in range(self._buckets.length()):
             out += str(i) + ': ' + str(self._buckets[i]) + '\n'
         return out
 
-    def _next_prime(self, capacity: int) -> int:
-        """
-        Increment from given number to find the closest prime number
-        DO NOT CHANGE THIS METHOD IN ANY WAY
-        """
-        if capacity % 2 == 0:
-            capacity += 1
-
-        while not self._is_prime(capacity):
-            capacity += 2
-
-        return capacity
-
-    @staticmethod
-    def _is_prime(capacity: int) -> bool:
-        """
-        Determine if given integer is a prime number and return boolean
-        DO NOT CHANGE THIS METHOD IN ANY WAY
-        """
-        if capacity == 2 or capacity == 3:
-            return True
-
-        if capacity == 1 or capacity % 2 == 0:
-            return False
-
-        factor = 3
-        while factor ** 2 <= capacity:
-            if capacity % factor == 0:
-                return False
-            factor += 2
-
-        return True
-
     def get_size(self) -> int:
         """
-        Return size of map
-        DO NOT CHANGE THIS METHOD IN ANY WAY
+        Return size of map, sweeping expired entries first so they are
+        not counted
         """
+        if self._expiry:
+            self.sweep()
         return self._size
 
     def get_capacity(self) -> int:
@@ -82,38 +185,488 @@ class HashMap:
 
     # ------------------------------------------------------------------ #
 
-    def put(self, key: str, value: object) -> None:
+    def put(self, key: str, value: object, ttl: float = None) -> None:
         """
         Adds a key/value pair to the HashMap. If the key already exists,
-        it updates the keys value to the new value. If the current load_factor
-        is 0.5 or greater, it calls resize to increase the HashMap capacity. If
-        the intended index is already occupied, it uses quadratic probing to
-        find the next available index.
+        it updates the keys value to the new value. If ttl is given, the
+        pair expires ttl clock units (seconds by default) from now;
+        otherwise it never expires, even if the key had a ttl before.
+        If the current load_factor
+        is max_load (0.5 by default) or greater, it calls resize to increase
+        the HashMap capacity by the growth factor.
+        If live entries and tombstones together reach the compaction load,
+        the table is compacted first. If the intended index is already
+        occupied, it follows the probe sequence of the map to find the next
+        available index, reusing the first tombstone found on the probe path.
 
         :param key:   string to assign to key of key/value pair
         :param value: object to assign to value of key/value pair
+        :param ttl:   time to live of the pair, None if it never expires
 
         :return:      None
         """
-        if self.table_load() >= 0.5:
-            self.resize_table(self._capacity*2)
-        step = 1
+        if self._expiry:
+            self.sweep(self._sweep_batch)
+        if self._old_buckets is not None:
+            self._migrate()
+        if self.table_load() >= self._max_load:
+            self._resize(grow_capacity(self._capacity, self._growth_factor))
+        elif (self._size+self._tombstones)/self._capacity >= self._compact_load:
+            self._compact()
         hash = self._hash_function(key)
-        ind = hash%self._capacity
-        first_ind = ind
-        new = HashEntry(key, value)
-        while self._buckets.get_at_index(ind) is not None:
-            if self._buckets.get_at_index(ind).key == new.key:
-                if self._buckets.get_at_index(ind).is_tombstone is True:
-                    self._buckets.get_at_index(ind).is_tombstone = False
-                    self._size += 1
-                self._buckets.get_at_index(ind).value = new.value
+        self._insert(key, value, hash, self._expires(key, hash, ttl))
+
+    def put_many(self, items, ttl: float = None) -> None:
+        """
+        Adds every key/value pair of an iterable to the HashMap, all with
+        the same ttl if one is given. Later pairs overwrite earlier ones
+        with the same key, just as with put. When the number of pairs is
+        known, the table is resized once up front to a capacity that keeps
+        all of them below the load limit, growing by at least growth_factor;
+        otherwise it grows geometrically between batches that fit in the
+        current capacity. Pairs are inserted without checking the load of
+        the table one by one.
+
+        :param items: iterable of key/value tuples
+        :param ttl:   time to live of the pairs, None if they never expire
+
+        :return:      None
+        """
+        if ttl is not None:
+            # every pair gets its own expiry entry, so insert them one by one
+            for key, value in items:
+                self.put(key, value, ttl)
+            return
+        hash_function = self._hash_function
+        # live entries and tombstones together must stay below this load
+        limit = min(self._max_load, self._compact_load)
+        try:
+            count = len(items)
+        except TypeError:
+            count = None
+        if count is not None:
+            if self._size+self._tombstones+count >= limit*self._capacity:
+                target = int((self._size+count)/limit)+1
+                if target > self._capacity:
+                    # as in the chaining map's _reserve, never grow by less
+                    # than growth_factor, or every batch pays for a resize
+                    target = max(target, grow_capacity(self._capacity, self._growth_factor))
+                self.resize_table(target)
+            for key, value in items:
+                self._insert(key, value, hash_function(key))
+            return
+
+        items = iter(items)
+        while True:
+            room = int(limit*self._capacity)-self._size-self._tombstones
+            if room <= 0:
+                self.resize_table(grow_capacity(self._capacity, self._growth_factor))
+                continue
+            taken = 0
+            for key, value in islice(items, room):
+                self._insert(key, value, hash_function(key))
+                taken += 1
+            if taken < room:
+                return
+
+    @classmethod
+    def from_items(cls, items, function, capacity: int = 11,
+                   **options) -> "HashMap":
+        """
+        Builds a new HashMap from an iterable of key/value pairs with a
+        single put_many call.
+
+        :param items:    iterable of key/value tuples
+        :param function: hash function for the new map
+        :param capacity: initial capacity for the new map
+        :param options:  any other HashMap arguments, such as probing
+
+        :return:         the new HashMap
+        """
+        new_map = cls(capacity, function, **options)
+        new_map.put_many(items)
+        return new_map
+
+    def _stride(self, hash: int, capacity: int) -> tuple:
+        """
+        Returns how the probe sequence of a hash moves through the table:
+        each probe advances the index by the stride, and the stride itself
+        grows by the acceleration. Quadratic probing reaches first+step**2
+        by adding the odd numbers 1, 3, 5, ... one at a time.
+
+        :param hash:     full hash of the key being probed for
+        :param capacity: capacity of the table being probed
+
+        :return:         tuple of the first stride and the acceleration
+        """
+        if self._probing == QUADRATIC:
+            return 1, 2
+        if self._probing == DOUBLE and capacity > 2:
+            return 1+(hash//capacity)%(capacity-1), 0
+        return 1, 0
+
+    def _insert(self, key: str, value: object, hash: int,
+                expires: float = None) -> None:
+        """
+        Places a key/value pair with an already computed hash without
+        checking the load of the table. Entries whose cached hash differs
+        are passed over without comparing their keys. With stats enabled,
+        the number of buckets examined is recorded.
+
+        :param key:     string to assign to key of key/value pair
+        :param value:   object to assign to value of key/value pair
+        :param hash:    full hash of the key
+        :param expires: clock reading at which the pair expires, None if
+                        it never does
+
+        :return:        None
+        """
+        if self._old_buckets is not None:
+            entry = self._find_old(key, hash)
+            if entry is not None:
+                entry.value = value
+                entry.expires = expires
+                return
+        if self._probing == ROBIN_HOOD:
+            if self._insert_robin_hood(HashEntry(key, value, hash, expires), True):
+                self._size += 1
+                self._mod_count += 1
+            return
+        capacity = self._capacity
+        ind = hash%capacity
+        stride, accel = self._stride(hash, capacity)
+        reuse = None
+        entry = self._buckets.get_at_index(ind)
+        for probes in range(1, capacity+1):
+            if entry is None:
+                break
+            if entry.is_tombstone is True:
+                if reuse is None:
+                    reuse = ind
+            elif entry.hash == hash and entry.key == key:
+                entry.value = value
+                entry.expires = expires
+                if self._stats is not None:
+                    self._stats.insert(probes)
                 return
-            else:
-                ind = (first_ind+step**2)%self._capacity
-                step += 1
-        self._buckets.set_at_index(ind, new)
+            ind = (ind+stride)%capacity
+            stride += accel
+            entry = self._buckets.get_at_index(ind)
+        if reuse is not None:
+            ind = reuse
+            self._tombstones -= 1
+        elif entry is not None:
+            # probe path is full of live entries, so grow and try again
+            self.resize_table(grow_capacity(capacity, self._growth_factor))
+            self._insert(key, value, hash, expires)
+            return
+        if self._stats is not None:
+            self._stats.insert(probes)
+        self._buckets.set_at_index(ind, HashEntry(key, value, hash, expires))
         self._size += 1
+        self._mod_count += 1
+
+    def _insert_robin_hood(self, entry: HashEntry, update: bool) -> bool:
+        """
+        Places an entry with linear Robin Hood probing: whenever the entry
+        being carried is further from its home bucket than the entry in the
+        current bucket, the two swap places and the displaced entry is
+        carried on. This keeps probe lengths close to each other. With stats
+        enabled, a put records the buckets examined until its entry settles.
+
+        :param entry:  entry to place, with its cached hash
+        :param update: True if an entry with the same key may already be in
+                       the table and should have its value updated instead
+
+        :return:       True if the table holds one more entry,
+                       False if an existing value was updated
+        """
+        capacity = self._capacity
+        ind = entry.hash%capacity
+        dist = 0
+        # only a put records its probes, not entries moved by a resize
+        stats = self._stats if update else None
+        for probes in range(1, capacity+1):
+            current = self._buckets.get_at_index(ind)
+            if current is None:
+                self._buckets.set_at_index(ind, entry)
+                if stats is not None:
+                    stats.insert(probes)
+                return True
+            if update and current.hash == entry.hash and current.key == entry.key:
+                current.value = entry.value
+                current.expires = entry.expires
+                if stats is not None:
+                    stats.insert(probes)
+                return False
+            current_dist = (ind-current.hash)%capacity
+            if current_dist < dist:
+                # the key cannot be further along, so nothing is left to update
+                self._buckets.set_at_index(ind, entry)
+                entry, dist, update = current, current_dist, False
+                if stats is not None:
+                    stats.insert(probes)
+                    stats = None
+            ind = (ind+1)%capacity
+            dist += 1
+        # every bucket is taken, so grow and place the carried entry
+        self.resize_table(grow_capacity(capacity, self._growth_factor))
+        return self._insert_robin_hood(entry, False)
+
+    def _place(self, entry: HashEntry) -> None:
+        """
+        Moves an existing live entry into the first empty bucket on its
+        probe path. Only used while rebuilding or migrating the table, when
+        the entry's key is known not to be present yet. The size of the map
+        does not change.
+
+        :param entry: entry to place, with its cached hash
+
+        :return:      None
+        """
+        if self._probing == ROBIN_HOOD:
+            self._insert_robin_hood(entry, False)
+            return
+        ind = entry.hash%self._capacity
+        stride, accel = self._stride(entry.hash, self._capacity)
+        while self._buckets.get_at_index(ind) is not None:
+            ind = (ind+stride)%self._capacity
+            stride += accel
+        self._buckets.set_at_index(ind, entry)
+
+    def _find_old(self, key: str, hash: int) -> HashEntry:
+        """
+        Searches the old table of an incremental resize for the given key.
+        Moved buckets hold tombstones, so with Robin Hood probing the old
+        table is searched like plain linear probing, without stopping early.
+
+        :param key:  key to search for
+        :param hash: full hash of the key
+
+        :return:     live entry holding the key, None if there is none
+        """
+        capacity = self._old_capacity
+        ind = hash%capacity
+        stride, accel = self._stride(hash, capacity)
+        for _ in range(capacity):
+            entry = self._old_buckets.get_at_index(ind)
+            if entry is None:
+                return None
+            if entry.is_tombstone is False and entry.hash == hash and entry.key == key:
+                return entry
+            ind = (ind+stride)%capacity
+            stride += accel
+        return None
+
+    def _entry(self, key: str, hash: int) -> HashEntry:
+        """
+        Returns the live entry holding the given key in either table.
+
+        :param key:  key to search for
+        :param hash: full hash of the key
+
+        :return:     live entry holding the key, None if there is none
+        """
+        ind = self._find(key, hash)
+        if ind != -1:
+            return self._buckets.get_at_index(ind)
+        if self._old_buckets is not None:
+            return self._find_old(key, hash)
+        return None
+
+    def _expires(self, key: str, hash: int, ttl: float) -> float:
+        """
+        Returns the clock reading at which a pair put now with the given
+        ttl expires and adds it to the expiry heap. Once most of the heap
+        is made of items whose entries were updated or removed since, it
+        is swept and rebuilt from the live entries.
+
+        :param key:  key of the pair
+        :param hash: full hash of the key
+        :param ttl:  time to live of the pair, None if it never expires
+
+        :return:     expiry time, None if the pair never expires
+        """
+        if ttl is None:
+            return None
+        expires = self._clock()+ttl
+        if len(self._expiry) > 2*self._size+64:
+            # expired entries are not iterated, so sweep them before their
+            # items are dropped from the heap
+            self.sweep()
+            self._expiry = [(entry.expires, next(self._sequence), entry.key, entry.hash)
+                            for entry in self if entry.expires is not None]
+            heapq.heapify(self._expiry)
+        heapq.heappush(self._expiry, (expires, next(self._sequence), key, hash))
+        return expires
+
+    def _expired(self, entry: HashEntry) -> bool:
+        """
+        Determines if a live entry has expired, removing it if it has.
+
+        :param entry: live entry found by a lookup
+
+        :return:      True if the entry expired and was removed
+                      False otherwise
+        """
+        if entry.expires is None or entry.expires > self._clock():
+            return False
+        self._delete(entry.key, entry.hash)
+        return True
+
+    def sweep(self, limit: int = None) -> int:
+        """
+        Removes expired entries in order of their expiry times, looking at
+        no more than limit items of the expiry heap, so that each call does
+        a bounded amount of work however large the table is. Items whose
+        entry has been updated or removed since are skipped.
+
+        :param limit: most heap items to look at, all of them if None
+
+        :return:      number of entries removed
+        """
+        now = self._clock()
+        removed = 0
+        examined = 0
+        while self._expiry and self._expiry[0][0] <= now and \
+                (limit is None or examined < limit):
+            expires, _, key, hash = heapq.heappop(self._expiry)
+            examined += 1
+            entry = self._entry(key, hash)
+            if entry is not None and entry.expires is not None and entry.expires <= now:
+                self._delete(key, hash)
+                removed += 1
+        return removed
+
+    def _resize(self, new_capacity: int) -> None:
+        """
+        Carries out an automatic resize, either at once with resize_table
+        or, for incremental maps, by starting an incremental rehash into an
+        empty table. Tombstones are left behind in the old table either way.
+
+        :param new_capacity: new desired capacity for the hash table
+
+        :return:             None
+        """
+        if not self._incremental:
+            self.resize_table(new_capacity)
+            return
+        self._finish_rehash()
+        new_capacity = next_prime(new_capacity)
+        while self._size > 0 and (self._size-1)/new_capacity >= self._max_load:
+            new_capacity = grow_capacity(new_capacity, self._growth_factor)
+        self._mod_count += 1
+        self._old_buckets = self._buckets
+        self._old_capacity = self._capacity
+        self._rehash_index = 0
+        self._capacity = new_capacity
+        # the entries move over in _migrate; this step only allocates the
+        # empty table, which still costs time linear in its capacity
+        self._buckets = DynamicArray([None]*new_capacity)
+        self._tombstones = 0
+
+    def _migrate(self) -> None:
+        """
+        Moves the live entries of the next rehash_batch buckets of the old
+        table into the new one and drops the old table once every bucket
+        has been moved.
+
+        :return: None
+        """
+        end = min(self._rehash_index+self._rehash_batch, self._old_capacity)
+        for ind in range(self._rehash_index, end):
+            entry = self._old_buckets.get_at_index(ind)
+            if entry is not None:
+                if entry.is_tombstone is False:
+                    self._place(entry)
+                self._old_buckets.set_at_index(ind, _MOVED)
+        self._rehash_index = end
+        if end == self._old_capacity:
+            self._old_buckets = None
+
+    def _finish_rehash(self) -> None:
+        """
+        Moves every bucket left in the old table, if an incremental rehash
+        is in progress.
+
+        :return: None
+        """
+        while self._old_buckets is not None:
+            self._migrate()
+
+    def _find(self, key: str, hash: int) -> int:
+        """
+        Follows the probe sequence of the given key, skipping over
+        tombstones, until it reaches the live entry holding the key or an
+        empty bucket. With Robin Hood probing the search also ends at the
+        first entry that is closer to its home bucket than the key would
+        be. Keys are only compared once the cached hash of an entry matches.
+        With stats enabled, the number of buckets examined is recorded.
+
+        :param key:  key to search for
+        :param hash: full hash of the key
+
+        :return:     index of the live entry holding the key, -1 if there is none
+        """
+        capacity = self._capacity
+        ind = hash%capacity
+        found = -1
+        if self._probing == ROBIN_HOOD:
+            for probes in range(1, capacity+1):
+                entry = self._buckets.get_at_index(ind)
+                if entry is None or (ind-entry.hash)%capacity < probes-1:
+                    break
+                if entry.hash == hash and entry.key == key:
+                    found = ind
+                    break
+                ind = (ind+1)%capacity
+        else:
+            stride, accel = self._stride(hash, capacity)
+            for probes in range(1, capacity+1):
+                entry = self._buckets.get_at_index(ind)
+                if entry is None:
+                    break
+                if entry.is_tombstone is False and entry.hash == hash and entry.key == key:
+                    found = ind
+                    break
+                ind = (ind+stride)%capacity
+                stride += accel
+        if self._stats is not None:
+            self._stats.lookup(probes)
+        return found
+
+    def _shift_back(self, ind: int) -> None:
+        """
+        Empties the bucket at the given index for Robin Hood probing and
+        moves every following entry that is not in its home bucket back by
+        one, so no tombstone is needed.
+
+        :param ind: index of the bucket to empty
+
+        :return:    None
+        """
+        capacity = self._capacity
+        following = (ind+1)%capacity
+        entry = self._buckets.get_at_index(following)
+        while entry is not None and (following-entry.hash)%capacity > 0:
+            self._buckets.set_at_index(ind, entry)
+            ind = following
+            following = (ind+1)%capacity
+            entry = self._buckets.get_at_index(following)
+        self._buckets.set_at_index(ind, None)
+
+    def _compact(self) -> None:
+        """
+        Rebuilds the hash table to drop its tombstones. The capacity stays
+        the same unless the live entries alone reach half of the compaction
+        load, in which case it also grows so compactions stay infrequent.
+
+        :return: None
+        """
+        if self.table_load() >= self._compact_load/2:
+            self._resize(grow_capacity(self._capacity, self._growth_factor))
+        else:
+            self._resize(self._capacity)
 
     def table_load(self) -> float:
         """
@@ -133,10 +686,14 @@ class HashMap:
 
     def resize_table(self, new_capacity: int) -> None:
         """
-        Resizes the capacity of the hash table and rehashes the current
-        key/value pairs in the table. If new_capacity is 1 or more,
-        makes sure it is a prime number and changes it to the next highest
-        prime number if it is not.
+        Resizes the capacity of the hash table and moves the current entries
+        into the new table using their cached hashes, so the hash function is
+        not called again. If new_capacity is 1 or more, makes sure it is a
+        prime number and changes it to the next highest prime number if it
+        is not. The capacity keeps moving up the prime ladder while the
+        entries would reach max_load, as it would if they were put back
+        one by one. Entries still waiting in the old table of an
+        incremental resize are moved as well.
 
         :param new_capacity: new desired capacity for the hash table
 
@@ -144,16 +701,24 @@ class HashMap:
         """
         if new_capacity < self._size:
             return
-        items = self.get_keys_and_values()
-        if self._is_prime(new_capacity) is False:
-            new_capacity = self._next_prime(new_capacity)
+        new_capacity = next_prime(new_capacity)
+        while self._size > 0 and (self._size-1)/new_capacity >= self._max_load:
+            new_capacity = grow_capacity(new_capacity, self._growth_factor)
+        self._mod_count += 1
+        tables = [self._buckets]
+        if self._old_buckets is not None:
+            tables.append(self._old_buckets)
+            self._old_buckets = None
         self._capacity = new_capacity
         self._buckets = DynamicArray()
-        self._size = 0
+        self._tombstones = 0
         for ind in range(new_capacity):
             self._buckets.append(None)
-        for item in range(items.length()):
-            self.put(items.get_at_index(item)[0], items.get_at_index(item)[1])
+        for old_buckets in tables:
+            for ind in range(old_buckets.length()):
+                entry = old_buckets.get_at_index(ind)
+                if entry is not None and entry.is_tombstone is False:
+                    self._place(entry)
 
     def get(self, key: str) -> object:
         """
@@ -164,18 +729,12 @@ class HashMap:
         :return:    value if the key exists in the hash map
                     None otherwise
         """
-        step = 1
-        hash = self._hash_function(key)
-        ind = hash%self._capacity
-        new_ind = ind
-        while self._buckets.get_at_index(ind) is not None and self._buckets.get_at_index(ind).key != key:
-            ind = (new_ind+step**2) % self._capacity
-            step += 1
-        if self._buckets.get_at_index(ind) is None:
+        if self._old_buckets is not None:
+            self._migrate()
+        entry = self._entry(key, self._hash_function(key))
+        if entry is None or self._expired(entry):
             return None
-        if self._buckets.get_at_index(ind).is_tombstone is True:
-            return None
-        return self._buckets.get_at_index(ind).value
+        return entry.value
 
     def contains_key(self, key: str) -> bool:
         """
@@ -186,52 +745,129 @@ class HashMap:
         :return:    True if the key exists in the hash map
                     False otherwise
         """
-        step = 1
-        hash = self._hash_function(key)
-        ind = hash%self._capacity
-        new_ind = ind
-        while self._buckets.get_at_index(ind) is not None and self._buckets.get_at_index(ind).key != key:
-            ind = (new_ind+step**2)%self._capacity
-            step += 1
-        if self._buckets.get_at_index(ind) is None:
-            return False
-        if self._buckets.get_at_index(ind).is_tombstone is False:
-            return True
-        return False
+        if self._old_buckets is not None:
+            self._migrate()
+        entry = self._entry(key, self._hash_function(key))
+        return entry is not None and not self._expired(entry)
+
+    def get_many(self, keys) -> DynamicArray:
+        """
+        Returns the values associated with a batch of keys. The whole batch
+        is hashed at once (with NumPy when it is available) before each key
+        is probed for.
+
+        :param keys: DynamicArray or iterable of keys to find values of
+
+        :return:     DynamicArray of the values in the order of the keys,
+                     None for every key that is not in the hash map
+        """
+        keys = as_list(keys)
+        values = DynamicArray()
+        for key, hash in zip(keys, hash_keys(keys, self._hash_function)):
+            entry = self._entry(key, hash)
+            values.append(None if entry is None or self._expired(entry) else entry.value)
+        return values
+
+    def contains_many(self, keys) -> DynamicArray:
+        """
+        Determines which keys of a batch are in the hash map, hashing the
+        whole batch at once like get_many.
+
+        :param keys: DynamicArray or iterable of keys to look for
+
+        :return:     DynamicArray of booleans in the order of the keys
+        """
+        keys = as_list(keys)
+        found = DynamicArray()
+        for key, hash in zip(keys, hash_keys(keys, self._hash_function)):
+            entry = self._entry(key, hash)
+            found.append(entry is not None and not self._expired(entry))
+        return found
 
     def remove(self, key: str) -> None:
         """
         Removes the given key and its value from the hash table by turning the objects
-        tombstone to true. Does nothing if the key does not exist.
+        tombstone to true, or with Robin Hood probing by shifting the entries
+        after it back by one. Does nothing if the key does not exist.
 
         :param key: key to remove from the hash map
 
         :return:    None
         """
-        step = 1
-        hash = self._hash_function(key)
-        ind = hash%self._capacity
-        new_ind = ind
-        while self._buckets.get_at_index(ind) is not None and self._buckets.get_at_index(ind).key != key:
-            ind = (new_ind+step**2)%self._capacity
-            step += 1
-        if self._buckets.get_at_index(ind) is None:
-            return
-        if self._buckets.get_at_index(ind).is_tombstone is False:
+        if self._old_buckets is not None:
+            self._migrate()
+        self._delete(key, self._hash_function(key))
+
+    def _delete(self, key: str, hash: int) -> None:
+        """
+        Removes the given key with an already computed hash from whichever
+        table holds it and shrinks the table if the map shrinks.
+
+        :param key:  key to remove from the hash map
+        :param hash: full hash of the key
+
+        :return:     None
+        """
+        ind = self._find(key, hash)
+        if ind == -1:
+            if self._old_buckets is None:
+                return
+            # moved buckets hold tombstones, so the old table keeps them too
+            entry = self._find_old(key, hash)
+            if entry is None:
+                return
+            entry.is_tombstone = True
+        elif self._probing == ROBIN_HOOD:
+            self._shift_back(ind)
+        else:
             self._buckets.get_at_index(ind).is_tombstone = True
-            self._size -= 1
+            self._tombstones += 1
+        self._size -= 1
+        self._mod_count += 1
+        if self._shrink and self.table_load() < self._min_load:
+            self._shrink_table()
+
+    def _shrink_table(self) -> None:
+        """
+        Shrinks the hash table so its load comes back halfway between
+        min_load and max_load, which leaves room for many puts and removes
+        before the table has to grow or shrink again. The table never
+        shrinks below its initial capacity.
+
+        :return: None
+        """
+        target = ceil(self._size/((self._min_load+self._max_load)/2))
+        target = max(target, self._initial_capacity)
+        if target < self._capacity:
+            self._resize(target)
+
+    def shrink_to_fit(self) -> None:
+        """
+        Resizes the hash table to the smallest prime capacity that keeps
+        its load below max_load, dropping any tombstones.
+
+        :return: None
+        """
+        self.resize_table(int(self._size/self._max_load)+1)
 
     def clear(self) -> None:
         """
-        Clears the hash table without changing its capacity.
+        Clears the hash table without changing its capacity, unless the map
+        shrinks, in which case it goes back to its initial capacity.
 
         :return: None
         """
+        if self._shrink:
+            self._capacity = self._initial_capacity
+        self._old_buckets = None
         new = self._capacity
         self._buckets = DynamicArray()
         for ind in range(new):
             self._buckets.append(None)
         self._size = 0
+        self._tombstones = 0
+        self._expiry = []
+        self._mod_count += 1
 
     def get_keys_and_values(self) -> DynamicArray:
         """
@@ -242,41 +878,80 @@ class HashMap:
                  in the hash map
         """
         new_array = DynamicArray()
-        for ind in range(self._capacity):
-            pair = self._buckets.get_at_index(ind)
-            if pair is not None:
-                if pair.is_tombstone is False:
-                    new_array.append((pair.key, pair.value))
+        for item in self.items():
+            new_array.append(item)
         return new_array
 
-    def __iter__(self):
+    def keys(self) -> KeysView:
         """
-        Enables self-iteration of the hash map.
+        Returns a lazy view of the keys in the hash map, which walks the
+        buckets each time it is iterated instead of copying them.
 
-        :return: the hash map
+        :return: KeysView of the hash map
         """
-        self._index = 0
+        return KeysView(self)
 
-        return self
+    def values(self) -> ValuesView:
+        """
+        Returns a lazy view of the values in the hash map.
 
-    def __next__(self):
+        :return: ValuesView of the hash map
         """
-        Returns the next item in the hash map, based on the current
-        location of the iterator.
+        return ValuesView(self)
 
-        :return: next item in the hash map
+    def items(self) -> ItemsView:
         """
-        try:
-            while self._buckets.get_at_index(self._index) is None or self._buckets.get_at_index(self._index).is_tombstone is True:
-                self._index = self._index+1
-        except DynamicArrayException:
-            raise StopIteration
-        try:
-            value = self._buckets.get_at_index(self._index)
-        except DynamicArrayException:
-            raise StopIteration
-        self._index = self._index+1
-        return value
+        Returns a lazy view of the key/value pairs in the hash map, as
+        tuples.
+
+        :return: ItemsView of the hash map
+        """
+        return ItemsView(self)
+
+    def save(self, path: str) -> None:
+        """
+        Writes the key/value pairs of the hash map to a file in the packed
+        table format described in packed_table.py: a header with the
+        capacity, size, hash function id and seed, a slot array of full
+        hashes and record offsets, and a region of packed keys and values.
+        Values must be bytes, str, int, float, bool or None, and the hash
+        function must be hash_function_1, hash_function_2, fnv1a, xx_hash
+        or a seeded_hash function. The format has no expiry times, so
+        expired entries are swept first and a map that still holds entries
+        with a ttl is refused.
+
+        :param path: path of the file to write
+
+        :return:     None
+        """
+        if self._expiry:
+            self.sweep()
+            for entry in self:
+                if entry.expires is not None:
+                    raise ValueError("entries with a ttl cannot be saved")
+        save_packed(self.items(), self._hash_function, path)
+
+    @classmethod
+    def open(cls, path: str) -> MappedHashMap:
+        """
+        Opens a file written by save without loading it. The file is memory
+        mapped and get and contains_key read it in place, so opening takes
+        constant time however large the file is.
+
+        :param path: path of the file to open
+
+        :return:     read-only MappedHashMap over the file
+        """
+        return MappedHashMap(path)
+
+    def __iter__(self) -> "HashMapIterator":
+        """
+        Returns a new iterator over the live entries of the hash map, so
+        nested loops and parallel readers each keep their own position.
+
+        :return: HashMapIterator of the hash map
+        """
+        return HashMapIterator(self)
 
 # ------------------- BASIC TESTING ---------------------------------------- #
 
@@ -479,3 +1154,174 @@ if __name__ == "__main__":
     print(m)
     for item in m:
         print('K:', item.key, 'V:', item.value)
+
+    print("\nmax_load / growth_factor example 1")
+    print("----------------------------------")
+    m = HashMap(53, hash_function_1, probing=LINEAR, max_load=0.75, min_load=0.1,
+                growth_factor=1.25)
+    for i in range(300):
+        m.put('str' + str(i), i * 100)
+        if i % 50 == 49:
+            print(round(m.table_load(), 2), m.get_size(), m.get_capacity())
+
+    print("\nshrink example 1")
+    print("----------------")
+    m = HashMap(53, hash_function_1, shrink=True)
+    for i in range(500):
+        m.put('str' + str(i), i * 100)
+    print(m.get_size(), m.get_capacity())
+    for i in range(450):
+        m.remove('str' + str(i))
+    print(m.get_size(), m.get_capacity(), round(m.table_load(), 2), m.get('str499'))
+    for i in range(450, 500):
+        m.remove('str' + str(i))
+    print(m.get_size(), m.get_capacity())
+    for i in range(500):
+        m.put('str' + str(i), i * 100)
+    m.clear()
+    print(m.get_size(), m.get_capacity())
+
+    print("\nshrink_to_fit example 1")
+    print("-----------------------")
+    m = HashMap(53, hash_function_1)
+    for i in range(500):
+        m.put('str' + str(i), i * 100)
+    for i in range(400):
+        m.remove('str' + str(i))
+    print(m.get_size(), m.get_capacity())
+    m.shrink_to_fit()
+    print(m.get_size(), m.get_capacity(), round(m.table_load(), 2),
+          all(m.get('str' + str(i)) == i * 100 for i in range(400, 500)))
+
+    print("\nincremental rehash example 1")
+    print("----------------------------")
+    m = HashMap(53, hash_function_1, incremental=True, rehash_batch=4)
+    for i in range(60):
+        m.put('str' + str(i), i * 100)
+    # a resize is under way, so lookups search the old table as well
+    print(m.get_size(), m.get_capacity(), m._old_buckets is not None)
+    print(all(m.get('str' + str(i)) == i * 100 for i in range(60)), m.contains_key('str60'))
+    m.remove('str0')
+    print(m.get_size(), m.get('str0'), m.get('str59'), m._old_buckets is not None)
+
+    print("\nconcurrent modification example 1")
+    print("---------------------------------")
+    m = HashMap(11, hash_function_1)
+    for i in range(5):
+        m.put(str(i), i * 10)
+    # every loop gets its own iterator, so nested loops do not interfere
+    print(sum(1 for _ in m for _ in m))
+    iterator = iter(m)
+    next(iterator)
+    m.put('0', 'updated')
+    print(next(iterator) is not None)
+    m.put('5', 50)
+    try:
+        next(iterator)
+    except ConcurrentModificationException:
+        print('ConcurrentModificationException')
+
+    print("\nexpiry example 1")
+    print("----------------")
+    now = [0.0]
+    m = HashMap(53, hash_function_1, clock=lambda: now[0])
+    m.put('key1', 10, ttl=10)
+    m.put('key2', 20, ttl=20)
+    m.put('key3', 30)
+    now[0] = 15
+    print(m.get('key1'), m.get('key2'), m.contains_key('key3'), m.get_size())
+    m.put('key2', 21)
+    now[0] = 30
+    print(m.get('key2'), m.get_size())
+
+    print("\nsweep example 1")
+    print("---------------")
+    m.put_many([('str' + str(i), i) for i in range(100)], ttl=5)
+    print(m.get_size())
+    now[0] = 40
+    # expired entries keep their buckets until a lookup or a sweep reclaims
+    # them, but iteration skips them and get_size sweeps them first
+    print(m._size, len(list(m)), m.sweep(10), m._size, m.get('str99'), m._size, m.get_size())
+
+    print("\ntombstone example 1")
+    print("-------------------")
+    m = HashMap(53, hash_function_1)
+    for i in range(20):
+        m.put('str' + str(i), i * 100)
+    for i in range(10):
+        m.remove('str' + str(i))
+    print(m.get_size(), m._tombstones, m.get_capacity())
+    # putting the removed keys back reuses the tombstones on their probe paths
+    for i in range(10):
+        m.put('str' + str(i), i)
+    print(m.get_size(), m._tombstones, m.get_capacity())
+    # constant churn is compacted away instead of filling the table
+    for i in range(1000):
+        m.put('tmp' + str(i), i)
+        m.remove('tmp' + str(i))
+    print(m.get_size(), m.get_capacity(), m._tombstones < m.get_capacity() // 2,
+          all(m.get('str' + str(i)) == (i if i < 10 else i * 100) for i in range(20)))
+
+    print("\nput_many / from_items example 1")
+    print("-------------------------------")
+    # a generator has no length, so the table grows between batches
+    m = HashMap.from_items((('str' + str(i), i * 100) for i in range(1000)), hash_function_1)
+    print(m.get_size(), m.get_capacity(), round(m.table_load(), 2))
+    # a list is sized once up front; later pairs overwrite earlier ones
+    m.put_many([('str' + str(i), -i) for i in range(500, 1500)] + [('str1499', 'last')])
+    print(m.get_size(), m.get_capacity(), m.get('str1'), m.get('str700'), m.get('str1499'))
+
+    print("\nget_many / contains_many example 1")
+    print("----------------------------------")
+    m = HashMap(53, hash_function_2)
+    for i in range(100):
+        m.put('str' + str(i), i * 100)
+    keys = DynamicArray(['str1', 'missing', 'str99', 'str1'])
+    print(m.get_many(keys))
+    print(m.contains_many(['str0', 'str100', 'str50']))
+
+    print("\nprobing example 1")
+    print("-----------------")
+    for probing in PROBING:
+        m = HashMap(53, hash_function_1, probing=probing)
+        for i in range(200):
+            m.put('str' + str(i), i * 100)
+        for i in range(0, 200, 3):
+            m.remove('str' + str(i))
+        result = all(m.get('str' + str(i)) == (None if i % 3 == 0 else i * 100)
+                     for i in range(200))
+        print(probing, m.get_size(), m.get_capacity(), m._tombstones, result)
+
+    print("\nkeys / values / items example 1")
+    print("-------------------------------")
+    m = HashMap(11, hash_function_2)
+    for i in range(1, 6):
+        m.put(str(i), str(i * 10))
+    keys, values, items = m.keys(), m.values(), m.items()
+    print(len(keys), sorted(keys), sorted(values), sorted(items))
+    # the views are lazy, so they follow later changes to the map
+    m.put('6', '60')
+    m.remove('1')
+    print(len(keys), '6' in keys, '1' in keys, '60' in values, ('2', '20') in items,
+          ('2', '30') in items)
+
+    print("\nsave / open example 1")
+    print("---------------------")
+    import os
+    import tempfile
+    m = HashMap(53, hash_function_2)
+    for i in range(100):
+        m.put('str' + str(i), i * 100)
+    m.put('name', 'mapped')
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'table.bin')
+        m.save(path)
+        with HashMap.open(path) as mapped:
+            print(mapped.get_size(), mapped.get('str42'), mapped.get('name'),
+                  mapped.contains_key('str100'))
+        # the file has no expiry times, so entries with a ttl are refused
+        m.put('session', 'token', ttl=60)
+        try:
+            m.save(path)
+        except ValueError as error:
+            print(error)
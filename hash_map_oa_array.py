@@ -0,0 +1,436 @@
+# Name: Blake Jennings
+# Email: blakej94@gmail.com
+# Description: An open addressing hash map that stores its slots in parallel
+#              flat arrays instead of one HashEntry object per slot. It is a
+#              standalone experiment in memory layout, separate from
+#              hash_map_oa.HashMap: it only probes quadratically and has no
+#              TTLs, incremental rehash or views.
+
+from array import array
+from itertools import islice
+
+from a6_include import DynamicArray, hash_function_1, hash_function_2
+from batch import as_list, hash_keys
+from capacity import grow_capacity, next_prime
+from hashing import MASK64
+
+# Slot states kept in the byte-per-slot state array
+EMPTY = 0
+LIVE = 1
+TOMBSTONE = 2
+
+
+class HashMap:
+    def __init__(self, capacity: int, function,
+                 compact_load: float = None,
+                 max_load: float = 0.5) -> None:
+        """
+        Initialize new HashMap that uses quadratic probing for collision
+        resolution and keeps keys, values, full hashes and slot states in
+        parallel arrays. Hashes are kept as unsigned 64-bit integers, so
+        hash functions returning wider or negative values are reduced to
+        their low 64 bits. The table grows once its load reaches max_load.
+        compact_load is the combined load of live entries and tombstones at
+        which the table is rebuilt to drop its tombstones, max_load by
+        default. Quadratic probing only reaches half the buckets of a prime
+        table, so both loads must be above 0 and at most 0.5.
+        """
+        loads = [max_load] if compact_load is None else [max_load, compact_load]
+        if not all(0 < load <= 0.5 for load in loads):
+            raise ValueError("max_load and compact_load must be above 0 and at most 0.5")
+        self._capacity = next_prime(capacity)
+        self._keys = [None]*self._capacity
+        self._values = [None]*self._capacity
+        self._hashes = array('Q', bytes(8*self._capacity))
+        self._states = array('b', bytes(self._capacity))
+
+        self._hash_function = function
+        self._size = 0
+        self._tombstones = 0
+        self._compact_load = max_load if compact_load is None else compact_load
+        self._max_load = max_load
+
+    def __str__(self) -> str:
+        """
+        Override string method to provide more readable output
+        """
+        out = ''
+        for i in range(self._capacity):
+            if self._states[i] == EMPTY:
+                slot = 'None'
+            else:
+                slot = f"K: {self._keys[i]} V: {self._values[i]} " \
+                       f"TS: {self._states[i] == TOMBSTONE}"
+            out += str(i) + ': ' + slot + '\n'
+        return out
+
+    def get_size(self) -> int:
+        """
+        Return size of map
+        """
+        return self._size
+
+    def get_capacity(self) -> int:
+        """
+        Return capacity of map
+        """
+        return self._capacity
+
+    # ------------------------------------------------------------------ #
+
+    def put(self, key: str, value: object) -> None:
+        """
+        Adds a key/value pair to the HashMap. If the key already exists,
+        it updates the keys value to the new value. If the current load_factor
+        is max_load (0.5 by default) or greater, it calls resize to increase
+        the HashMap capacity.
+        If live entries and tombstones together reach the compaction load,
+        the table is compacted first. Probing compares the cached full hash
+        of a slot before its key and reuses the first tombstone it passes.
+
+        :param key:   string to assign to key of key/value pair
+        :param value: object to assign to value of key/value pair
+
+        :return:      None
+        """
+        if self._size/self._capacity >= self._max_load:
+            self.resize_table(grow_capacity(self._capacity))
+        elif (self._size+self._tombstones)/self._capacity >= self._compact_load:
+            self._compact()
+        self._insert(key, value, self._hash_function(key))
+
+    def put_many(self, items) -> None:
+        """
+        Adds every key/value pair of an iterable to the HashMap. Later pairs
+        overwrite earlier ones with the same key, just as with put. When the
+        number of pairs is known, the table is resized once up front to a
+        capacity that keeps all of them below the load limit; otherwise it
+        grows geometrically between batches that fit in the current capacity.
+        Pairs are inserted without checking the load of the table one by one.
+
+        :param items: iterable of key/value tuples
+
+        :return:      None
+        """
+        hash_function = self._hash_function
+        # live entries and tombstones together must stay below this load
+        limit = min(self._max_load, self._compact_load)
+        try:
+            count = len(items)
+        except TypeError:
+            count = None
+        if count is not None:
+            if self._size+self._tombstones+count >= limit*self._capacity:
+                self.resize_table(int((self._size+count)/limit)+1)
+            for key, value in items:
+                self._insert(key, value, hash_function(key))
+            return
+
+        items = iter(items)
+        while True:
+            room = int(limit*self._capacity)-self._size-self._tombstones
+            if room <= 0:
+                self.resize_table(grow_capacity(self._capacity))
+                continue
+            taken = 0
+            for key, value in islice(items, room):
+                self._insert(key, value, hash_function(key))
+                taken += 1
+            if taken < room:
+                return
+
+    @classmethod
+    def from_items(cls, items, function, capacity: int = 11,
+                   **options) -> "HashMap":
+        """
+        Builds a new HashMap from an iterable of key/value pairs with a
+        single put_many call.
+
+        :param items:    iterable of key/value tuples
+        :param function: hash function for the new map
+        :param capacity: initial capacity for the new map
+        :param options:  any other HashMap arguments, such as max_load
+
+        :return:         the new HashMap
+        """
+        new_map = cls(capacity, function, **options)
+        new_map.put_many(items)
+        return new_map
+
+    def _insert(self, key: str, value: object, hash: int) -> None:
+        """
+        Places a key/value pair with an already computed hash without
+        checking the load of the table.
+
+        :param key:   string to assign to key of key/value pair
+        :param value: object to assign to value of key/value pair
+        :param hash:  full hash of the key
+
+        :return:      None
+        """
+        capacity = self._capacity
+        states, hashes, keys = self._states, self._hashes, self._keys
+        hash &= MASK64
+        step = 1
+        first_ind = hash%capacity
+        ind = first_ind
+        reuse = -1
+        while states[ind] != EMPTY and step <= capacity:
+            if states[ind] == TOMBSTONE:
+                if reuse == -1:
+                    reuse = ind
+            elif hashes[ind] == hash and keys[ind] == key:
+                self._values[ind] = value
+                return
+            ind = (first_ind+step*step)%capacity
+            step += 1
+        if reuse != -1:
+            ind = reuse
+            self._tombstones -= 1
+        elif states[ind] != EMPTY:
+            # probe path is full of live entries, so grow and try again
+            self.resize_table(grow_capacity(capacity))
+            self._insert(key, value, hash)
+            return
+        keys[ind] = key
+        self._values[ind] = value
+        hashes[ind] = hash
+        states[ind] = LIVE
+        self._size += 1
+
+    def _find(self, key: str, hash: int) -> int:
+        """
+        Follows the quadratic probe path of the given key until it reaches
+        the live slot holding the key or an empty slot. Keys are only
+        compared once the cached hash of the slot matches.
+
+        :param key:  key to search for
+        :param hash: full hash of the key
+
+        :return:     index of the live slot holding the key, -1 if there is none
+        """
+        capacity = self._capacity
+        states, hashes, keys = self._states, self._hashes, self._keys
+        hash &= MASK64
+        step = 1
+        first_ind = hash%capacity
+        ind = first_ind
+        while states[ind] != EMPTY and step <= capacity:
+            if states[ind] == LIVE and hashes[ind] == hash and keys[ind] == key:
+                return ind
+            ind = (first_ind+step*step)%capacity
+            step += 1
+        return -1
+
+    def _compact(self) -> None:
+        """
+        Rebuilds the hash table to drop its tombstones. The capacity stays
+        the same unless the live entries alone reach half of the compaction
+        load, in which case it also grows so compactions stay infrequent.
+
+        :return: None
+        """
+        if self.table_load() >= self._compact_load/2:
+            self.resize_table(grow_capacity(self._capacity))
+        else:
+            self.resize_table(self._capacity)
+
+    def table_load(self) -> float:
+        """
+        Returns the current load factor of the hash table.
+
+        :return: float indicating load factor
+        """
+        return self._size/self._capacity
+
+    def empty_buckets(self) -> int:
+        """
+        Returns the number of empty buckets in the hash table.
+
+        :return: number of empty buckets
+        """
+        return self._capacity-self._size
+
+    def resize_table(self, new_capacity: int) -> None:
+        """
+        Resizes the capacity of the hash table and moves the current
+        key/value pairs into it using their cached hashes. If new_capacity
+        is 1 or more, makes sure it is a prime number and changes it to the
+        next highest prime number if it is not. The capacity keeps moving
+        up the prime ladder while the pairs would reach max_load.
+
+        :param new_capacity: new desired capacity for the hash table
+
+        :return:             None
+        """
+        if new_capacity < self._size:
+            return
+        new_capacity = next_prime(new_capacity)
+        while self._size > 0 and (self._size-1)/new_capacity >= self._max_load:
+            new_capacity = grow_capacity(new_capacity)
+        keys, values = self._keys, self._values
+        hashes, states = self._hashes, self._states
+        self._capacity = new_capacity
+        self._keys = [None]*new_capacity
+        self._values = [None]*new_capacity
+        self._hashes = array('Q', bytes(8*new_capacity))
+        self._states = array('b', bytes(new_capacity))
+        self._size = 0
+        self._tombstones = 0
+        for ind in range(len(states)):
+            if states[ind] == LIVE:
+                self._insert(keys[ind], values[ind], hashes[ind])
+
+    def get(self, key: str) -> object:
+        """
+        Returns the value associated with the given key.
+
+        :param key: key to find value of
+
+        :return:    value if the key exists in the hash map
+                    None otherwise
+        """
+        ind = self._find(key, self._hash_function(key))
+        if ind == -1:
+            return None
+        return self._values[ind]
+
+    def contains_key(self, key: str) -> bool:
+        """
+        Determines if the given key is in the hash map.
+
+        :param key: key to analyze if it exists in the hash map
+
+        :return:    True if the key exists in the hash map
+                    False otherwise
+        """
+        return self._find(key, self._hash_function(key)) != -1
+
+    def get_many(self, keys) -> DynamicArray:
+        """
+        Returns the values associated with a batch of keys. The whole batch
+        is hashed at once (with NumPy when it is available) before each key
+        is probed for.
+
+        :param keys: DynamicArray or iterable of keys to find values of
+
+        :return:     DynamicArray of the values in the order of the keys,
+                     None for every key that is not in the hash map
+        """
+        keys = as_list(keys)
+        values = DynamicArray()
+        for key, hash in zip(keys, hash_keys(keys, self._hash_function)):
+            ind = self._find(key, hash)
+            values.append(None if ind == -1 else self._values[ind])
+        return values
+
+    def contains_many(self, keys) -> DynamicArray:
+        """
+        Determines which keys of a batch are in the hash map, hashing the
+        whole batch at once like get_many.
+
+        :param keys: DynamicArray or iterable of keys to look for
+
+        :return:     DynamicArray of booleans in the order of the keys
+        """
+        keys = as_list(keys)
+        found = DynamicArray()
+        for key, hash in zip(keys, hash_keys(keys, self._hash_function)):
+            found.append(self._find(key, hash) != -1)
+        return found
+
+    def remove(self, key: str) -> None:
+        """
+        Removes the given key and its value from the hash table by marking
+        its slot as a tombstone. Does nothing if the key does not exist.
+
+        :param key: key to remove from the hash map
+
+        :return:    None
+        """
+        ind = self._find(key, self._hash_function(key))
+        if ind == -1:
+            return
+        self._states[ind] = TOMBSTONE
+        self._keys[ind] = None
+        self._values[ind] = None
+        self._size -= 1
+        self._tombstones += 1
+
+    def clear(self) -> None:
+        """
+        Clears the hash table without changing its capacity.
+
+        :return: None
+        """
+        self._keys = [None]*self._capacity
+        self._values = [None]*self._capacity
+        self._hashes = array('Q', bytes(8*self._capacity))
+        self._states = array('b', bytes(self._capacity))
+        self._size = 0
+        self._tombstones = 0
+
+    def get_keys_and_values(self) -> DynamicArray:
+        """
+        Returns a DynamicArray of all the key/value pairs in the hash map
+        in the form of tuples.
+
+        :return: DynamicArray of key/value tuples of every key/value pair
+                 in the hash map
+        """
+        new_array = DynamicArray()
+        states = self._states
+        for ind in range(self._capacity):
+            if states[ind] == LIVE:
+                new_array.append((self._keys[ind], self._values[ind]))
+        return new_array
+
+# ------------------- BASIC TESTING ---------------------------------------- #
+
+
+if __name__ == "__main__":
+
+    print("\nPDF - put example 1")
+    print("-------------------")
+    m = HashMap(53, hash_function_1)
+    for i in range(150):
+        m.put('str' + str(i), i * 100)
+        if i % 25 == 24:
+            print(m.empty_buckets(), round(m.table_load(), 2), m.get_size(), m.get_capacity())
+
+    print("\nPDF - resize example 2")
+    print("----------------------")
+    m = HashMap(75, hash_function_2)
+    keys = [i for i in range(25, 1000, 13)]
+    for key in keys:
+        m.put(str(key), key * 42)
+    print(m.get_size(), m.get_capacity())
+
+    for capacity in range(111, 1000, 117):
+        m.resize_table(capacity)
+
+        m.put('some key', 'some value')
+        result = m.contains_key('some key')
+        m.remove('some key')
+
+        for key in keys:
+            # all inserted keys must be present
+            result &= m.contains_key(str(key))
+            # NOT inserted keys must be absent
+            result &= not m.contains_key(str(key + 1))
+        print(capacity, result, m.get_size(), m.get_capacity(), round(m.table_load(), 2))
+
+    print("\nPDF - get_keys_and_values example 1")
+    print("------------------------")
+    m = HashMap(11, hash_function_2)
+    for i in range(1, 6):
+        m.put(str(i), str(i * 10))
+    print(m.get_keys_and_values())
+
+    m.resize_table(2)
+    print(m.get_keys_and_values())
+
+    m.put('20', '200')
+    m.remove('1')
+    m.resize_table(12)
+    print(m.get_keys_and_values())
@@ -2,72 +2,142 @@
 # Email: blakej94@gmail.com
 # Description: A hash map that uses chaining and its various methods.
 
-from a6_include import (DynamicArray, LinkedList,
-                        hash_function_1, hash_function_2)
+import heapq
+import pickle
+import zlib
+from itertools import islice
+from math import ceil
+from operator import itemgetter
+from struct import Struct
+
+from a6_include import (ConcurrentModificationException, DynamicArray,
+                        LinkedList, SLNode, hash_function_1, hash_function_2)
+from batch import as_list, bucket_indices, hash_keys
+from capacity import grow_capacity, next_prime
+from hashing import fnv1a
+from hybrid_bucket import HybridBucket
+from views import ItemsView, KeysView, ValuesView
+
+# Snapshot header: magic, size, capacity, compressed flag. Every chunk that
+# follows starts with its length.
+SNAPSHOT_MAGIC = b'HMSNAP01'
+_SNAPSHOT_HEADER = Struct('<8sQQ?')
+_CHUNK_LENGTH = Struct('<I')
+
+
+class HashMapIterator:
+    """
+    Separate iterator class for the separate chaining HashMap
+    """
+
+    def __init__(self, hash_map: "HashMap") -> None:
+        """
+        Initialize the iterator at the first bucket of the map, finishing
+        any incremental rehash first so there is a single table to scan.
+        """
+        hash_map._finish_rehash()
+        self._map = hash_map
+        self._buckets = hash_map._buckets
+        self._capacity = hash_map._capacity
+        self._mod_count = hash_map._mod_count
+        self._index = 0
+        self._node = None
+
+    def __iter__(self) -> "HashMapIterator":
+        """Return the iterator."""
+        return self
+
+    def __next__(self) -> SLNode:
+        """
+        Obtain the next node and advance the iterator.
+        Raise ConcurrentModificationException if the map gained, lost or
+        moved nodes since the iterator was created.
+        """
+        if self._map._mod_count != self._mod_count:
+            raise ConcurrentModificationException
+        while self._node is None:
+            if self._index == self._capacity:
+                raise StopIteration
+            link = self._buckets.get_at_index(self._index)
+            if link is not None:
+                self._node = link._head
+            self._index += 1
+        node = self._node
+        self._node = node.next
+        return node
 
 
 class HashMap:
     def __init__(self,
                  capacity: int = 11,
-                 function: callable = hash_function_1) -> None:
+                 function: callable = hash_function_1,
+                 max_load: float = 1.0,
+                 min_load: float = 0.25,
+                 growth_factor: float = 2,
+                 shrink: bool = False,
+                 incremental: bool = False,
+                 rehash_batch: int = 8,
+                 hybrid: bool = False) -> None:
         """
         Initialize new HashMap that uses
-        separate chaining for collision resolution
-        DO NOT CHANGE THIS METHOD IN ANY WAY
+        separate chaining for collision resolution.
+        The table grows by growth_factor once its load reaches max_load.
+        If shrink is True, it shrinks once removals bring its load below
+        min_load, but never below the initial capacity, and clear() goes
+        back to the initial capacity.
+        If incremental is True, automatic resizes keep the old and the new
+        bucket arrays side by side and every put, get, contains_key and
+        remove moves rehash_batch old buckets into the new array, instead
+        of rehashing the whole table at once.
+        If hybrid is True, buckets are HybridBuckets, which switch to binary
+        search once more than HybridBucket.PROMOTE keys collide in them.
         """
-        self._buckets = DynamicArray()
-
-        # capacity must be a prime number
-        self._capacity = self._next_prime(capacity)
-        for _ in range(self._capacity):
-            self._buckets.append(LinkedList())
+        if max_load <= 0 or growth_factor <= 1:
+            raise ValueError("max_load must be positive and growth_factor above 1")
+        if not 0 <= min_load < max_load/growth_factor:
+            raise ValueError("min_load must be below max_load / growth_factor")
+        # capacity must be a prime number; empty buckets are None until a
+        # key is put into them
+        self._capacity = next_prime(capacity)
+        self._buckets = DynamicArray([None]*self._capacity)
 
         self._hash_function = function
         self._size = 0
+        self._max_load = max_load
+        self._min_load = min_load
+        self._growth_factor = growth_factor
+        self._shrink = shrink
+        self._initial_capacity = self._capacity
+
+        # bumped by every change that adds, removes or moves nodes, so
+        # iterators can detect that the map changed under them
+        self._mod_count = 0
+
+        # old bucket array while an incremental resize is in progress;
+        # its buckets below _rehash_index have been moved already
+        self._incremental = incremental
+        self._rehash_batch = rehash_batch
+
+        # type of the buckets, created when a key is first put into them
+        self._bucket_type = HybridBucket if hybrid else LinkedList
+        self._old_buckets = None
+        self._old_capacity = 0
+        self._rehash_index = 0
+
+        # MapStats of stats.enable_stats, which lookups and inserts report
+        # the nodes they examine to; None while stats are off
+        self._stats = None
 
     def __str__(self) -> str:
         """
         Override string method to provide more readable output
-        DO NOT CHANGE THIS METHOD IN ANY WAY
         """
+        self._finish_rehash()
         out = ''
         for i in range(self._buckets.length()):
-            out += str(i) + ': ' + str(self._buckets[i]) + '\n'
+            out += str(i) + ': ' + str(self._buckets[i] or LinkedList()) + '\n'
         return out
 
-    def _next_prime(self, capacity: int) -> int:
-        """
-        Increment from given number and the find the closest prime number
-        DO NOT CHANGE THIS METHOD IN ANY WAY
-        """
-        if capacity % 2 == 0:
-            capacity += 1
-
-        while not self._is_prime(capacity):
-            capacity += 2
-
-        return capacity
-
-    @staticmethod
-    def _is_prime(capacity: int) -> bool:
-        """
-        Determine if given integer is a prime number and return boolean
-        DO NOT CHANGE THIS METHOD IN ANY WAY
-        """
-        if capacity == 2 or capacity == 3:
-            return True
-
-        if capacity == 1 or capacity % 2 == 0:
-            return False
-
-        factor = 3
-        while factor ** 2 <= capacity:
-            if capacity % factor == 0:
-                return False
-            factor += 2
-
-        return True
-
     def get_size(self) -> int:
         """
         Return size of map
@@ -88,42 +158,274 @@ class HashMap:
         """
         Adds a key/value pair to the HashMap. If the key already exists,
         it updates the keys value to the new value. If the current load_factor
-        is 1.0 or greater, it calls resize to increase the HashMap capacity.
+        is max_load (1.0 by default) or greater, it calls resize to increase
+        the HashMap capacity by the growth factor.
 
         :param key:   string to assign to key of key/value pair
         :param value: object to assign to value of key/value pair
 
         :return:      None
         """
-        if self.table_load() >= 1.0:
-            self.resize_table(self._capacity*2)
-        hash = self._hash_function(key)
-        ind = hash%self._capacity
-        final = self._buckets.get_at_index(ind)
-        check = final.contains(key)
+        self._put(key, value, self._hash_function(key))
+
+    def _put(self, key: str, value: object, hash: int) -> None:
+        """
+        Adds a key/value pair whose key is already hashed, resizing first
+        if the load has reached max_load.
+
+        :param key:   string to assign to key of key/value pair
+        :param value: object to assign to value of key/value pair
+        :param hash:  hash of the key
+
+        :return:      None
+        """
+        if self._old_buckets is not None:
+            self._migrate()
+        if self.table_load() >= self._max_load:
+            self._resize(grow_capacity(self._capacity, self._growth_factor))
+        self._insert(key, value, hash)
+
+    def _resize(self, new_capacity: int) -> None:
+        """
+        Carries out an automatic resize, either at once with resize_table
+        or, for incremental maps, by starting an incremental rehash.
+
+        :param new_capacity: new desired capacity for the hash table
+
+        :return:             None
+        """
+        if not self._incremental:
+            self.resize_table(new_capacity)
+            return
+        self._finish_rehash()
+        self._mod_count += 1
+        self._old_buckets = self._buckets
+        self._old_capacity = self._capacity
+        self._rehash_index = 0
+        self._capacity = next_prime(new_capacity)
+        # the entries move over in _migrate; this step only allocates the
+        # empty table, which still costs time linear in its capacity
+        self._buckets = DynamicArray([None]*self._capacity)
+
+    def _migrate(self) -> None:
+        """
+        Moves the next rehash_batch buckets of the old bucket array into the
+        new one and drops the old array once every bucket has been moved.
+
+        :return: None
+        """
+        end = min(self._rehash_index+self._rehash_batch, self._old_capacity)
+        for ind in range(self._rehash_index, end):
+            link = self._old_buckets.get_at_index(ind)
+            if link is not None:
+                for node in link:
+                    _relink(self._buckets, node.hash%self._capacity, node,
+                            self._bucket_type)
+        self._rehash_index = end
+        if end == self._old_capacity:
+            self._old_buckets = None
+
+    def _finish_rehash(self) -> None:
+        """
+        Moves every bucket left in the old bucket array, if an incremental
+        rehash is in progress.
+
+        :return: None
+        """
+        while self._old_buckets is not None:
+            self._migrate()
+
+    def _locate(self, hash: int) -> tuple:
+        """
+        Returns where the bucket that holds, or would hold, a key with the
+        given hash is. While an incremental rehash is in progress, that is
+        the old bucket if it has not been moved yet.
+
+        :param hash: full hash of the key
+
+        :return:     tuple of the bucket array and the index in it
+        """
+        if self._old_buckets is not None:
+            ind = hash%self._old_capacity
+            if ind >= self._rehash_index:
+                return self._old_buckets, ind
+        return self._buckets, hash%self._capacity
+
+    def _bucket_for(self, hash: int) -> LinkedList:
+        """
+        Returns the bucket that holds, or would hold, a key with the given
+        hash.
+
+        :param hash: full hash of the key
+
+        :return:     the LinkedList bucket of the key, None if it is empty
+        """
+        buckets, ind = self._locate(hash)
+        return buckets.get_at_index(ind)
+
+    def _chain_for(self, hash: int) -> LinkedList:
+        """
+        Returns the bucket that holds, or would hold, a key with the given
+        hash, creating it if it is empty.
+
+        :param hash: full hash of the key
+
+        :return:     the LinkedList bucket of the key
+        """
+        buckets, ind = self._locate(hash)
+        link = buckets.get_at_index(ind)
+        if link is None:
+            link = self._bucket_type()
+            buckets.set_at_index(ind, link)
+        return link
+
+    def _search(self, link: LinkedList, key: str, hash: int) -> SLNode:
+        """
+        Searches a bucket for the given key on behalf of a lookup while
+        stats are enabled, recording the number of nodes examined.
+
+        :param link: bucket of the key, None if it is empty
+        :param key:  key to search for
+        :param hash: full hash of the key
+
+        :return:     node holding the key, None if there is none
+        """
+        node, probes = (None, 0) if link is None else link.find(key, hash)
+        self._stats.lookup(probes)
+        return node
+
+    def _insert(self, key: str, value: object, hash: int) -> None:
+        """
+        Adds or updates a key/value pair with an already computed hash
+        without checking the load of the table.
+
+        :param key:   string to assign to key of key/value pair
+        :param value: object to assign to value of key/value pair
+        :param hash:  full hash of the key
+
+        :return:      None
+        """
+        final = self._chain_for(hash)
+        if self._stats is None:
+            check = final.contains(key, hash)
+        else:
+            check, probes = final.find(key, hash)
+            self._stats.insert(probes)
         if check is not None:
             check.value = value
         else:
-            final.insert(key, value)
+            final.insert(key, value, hash)
             self._size += 1
+            self._mod_count += 1
 
-    def new_put(self, key: str, value: object) -> None:
+    def put_many(self, items) -> None:
         """
-        Helper method for find_mode that acts the same as put without
-        replacing nodes if they have the same key.
+        Adds every key/value pair of an iterable to the HashMap. Later pairs
+        overwrite earlier ones with the same key, just as with put. When the
+        number of pairs is known, the table is resized once up front to a
+        capacity that holds all of them, growing by at least growth_factor;
+        otherwise it grows geometrically
+        between batches that fit in the current capacity. Pairs are inserted
+        without checking the load of the table one by one.
 
-        :param key:   string to assign to key of key/value pair
-        :param value: object to assign to value of key/value pair
+        :param items: iterable of key/value tuples
+
+        :return:      None
+        """
+        hash_function = self._hash_function
+        try:
+            count = len(items)
+        except TypeError:
+            count = None
+        if count is not None:
+            self._reserve(count)
+            for key, value in items:
+                self._insert(key, value, hash_function(key))
+            return
+
+        items = iter(items)
+        while True:
+            room = int(self._max_load*self._capacity)-self._size
+            if room <= 0:
+                self.resize_table(grow_capacity(self._capacity, self._growth_factor))
+                continue
+            taken = 0
+            for key, value in islice(items, room):
+                self._insert(key, value, hash_function(key))
+                taken += 1
+            if taken < room:
+                return
+
+    def _reserve(self, count: int) -> None:
+        """
+        Resizes the table once so that count more keys fit without
+        reaching max_load, growing by at least growth_factor even when a
+        smaller table would do, so that a run of small put_many batches
+        grows the table geometrically instead of resizing for each one.
+
+        :param count: number of keys about to be inserted
 
         :return:      None
         """
-        if self.table_load() >= 1.0:
-            self.resize_table(self._capacity*2)
+        if self._size+count > self._max_load*self._capacity:
+            self.resize_table(max(ceil((self._size+count)/self._max_load),
+                                  grow_capacity(self._capacity, self._growth_factor)))
+
+    @classmethod
+    def from_items(cls, items, function: callable = hash_function_1,
+                   capacity: int = 11, **options) -> "HashMap":
+        """
+        Builds a new HashMap from an iterable of key/value pairs with a
+        single put_many call. The map is constructed with keyword
+        arguments, so subclasses whose constructors take other arguments
+        first, such as BoundedCache, can be built the same way.
+
+        :param items:    iterable of key/value tuples
+        :param function: hash function for the new map
+        :param capacity: initial capacity for the new map
+        :param options:  any other arguments of the class, such as max_load
+
+        :return:         the new HashMap
+        """
+        new_map = cls(capacity=capacity, function=function, **options)
+        new_map.put_many(items)
+        return new_map
+
+    def _increment(self, key: str) -> int:
+        """
+        Adds one to the counter stored as the value of the given key,
+        starting a new counter at 1 if the key is not in the hash map yet.
+
+        :param key: key whose counter to increment
+
+        :return:    the new value of the counter
+        """
         hash = self._hash_function(key)
-        ind = hash%self._capacity
-        final = self._buckets.get_at_index(ind)
-        final.insert(key, value)
+        link = self._bucket_for(hash)
+        node = None if link is None else link.contains(key, hash)
+        if node is not None:
+            node.value += 1
+            return node.value
+        if self.table_load() >= self._max_load:
+            self._resize(grow_capacity(self._capacity, self._growth_factor))
+        self._chain_for(hash).insert(key, 1, hash)
         self._size += 1
+        self._mod_count += 1
+        return 1
+
+    def _entries(self):
+        """
+        Generator over every node in the hash map, bucket by bucket,
+        including the buckets of an incremental rehash that have not been
+        moved yet.
+
+        :return: generator of SLNode
+        """
+        if self._old_buckets is not None:
+            for ind in range(self._rehash_index, self._old_capacity):
+                yield from self._old_buckets.get_at_index(ind) or ()
+        for ind in range(self._buckets.length()):
+            yield from self._buckets.get_at_index(ind) or ()
 
     def empty_buckets(self) -> int:
         """
@@ -131,9 +433,11 @@ class HashMap:
 
         :return: number of empty buckets
         """
+        self._finish_rehash()
         used = 0
         for bucket in range(self._capacity):
-            if self._buckets.get_at_index(bucket).length() > 0:
+            link = self._buckets.get_at_index(bucket)
+            if link is not None and link.length() > 0:
                 used += 1
         return self._capacity-used
 
@@ -147,22 +451,25 @@ class HashMap:
 
     def clear(self) -> None:
         """
-        Clears the hash table without changing its capacity.
+        Clears the hash table without changing its capacity, unless the map
+        shrinks, in which case it goes back to its initial capacity.
 
         :return: None
         """
-        new = self._capacity
-        self._buckets = DynamicArray()
-        for ind in range(new):
-            self._buckets.append(LinkedList())
+        if self._shrink:
+            self._capacity = self._initial_capacity
+        self._old_buckets = None
+        self._buckets = DynamicArray([None]*self._capacity)
         self._size = 0
+        self._mod_count += 1
 
     def resize_table(self, new_capacity: int) -> None:
         """
-        Resizes the capacity of the hash table and rehashes the current
-        key/value pairs in the table. If new_capacity is 1 or more,
-        makes sure it is a prime number and changes it to the next highest
-        prime number if it is not.
+        Resizes the capacity of the hash table and moves the current nodes
+        into the new buckets using their cached hashes, so the hash function
+        is not called again. If new_capacity is 1 or more, makes sure it is a
+        prime number and changes it to the next highest prime number if it
+        is not.
 
         :param new_capacity: new desired capacity for the hash table
 
@@ -170,16 +477,25 @@ class HashMap:
         """
         if new_capacity < 1:
             return
-        items = self.get_keys_and_values()
-        if self._is_prime(new_capacity) is False:
-            new_capacity = self._next_prime(new_capacity)
+        new_capacity = next_prime(new_capacity)
+        self._mod_count += 1
+        # buckets of an incremental rehash that have not been moved yet
+        # come along with the current ones
+        old_buckets = self._buckets
+        links = [old_buckets.get_at_index(ind) for ind in range(old_buckets.length())]
+        if self._old_buckets is not None:
+            links += [self._old_buckets.get_at_index(ind)
+                      for ind in range(self._rehash_index, self._old_capacity)]
+            self._old_buckets = None
         self._capacity = new_capacity
-        self._buckets = DynamicArray()
-        self._size = 0
-        for ind in range(new_capacity):
-            self._buckets.append(LinkedList())
-        for item in range(items.length()):
-            self.put(items.get_at_index(item)[0], items.get_at_index(item)[1])
+        self._buckets = DynamicArray([None]*new_capacity)
+        for link in links:
+            if link is None:
+                continue
+            # the iterator has already moved past a node when it is handed
+            # out, so relinking it into its new bucket is safe
+            for node in link:
+                _relink(self._buckets, node.hash%new_capacity, node, self._bucket_type)
 
     def get(self, key: str):
         """
@@ -190,12 +506,17 @@ class HashMap:
         :return:    value if the key exists in the hash map
                     None otherwise
         """
+        if self._old_buckets is not None:
+            self._migrate()
         hash = self._hash_function(key)
-        ind = hash%self._capacity
-        node = self._buckets.get_at_index(ind).contains(key)
-        if node is not None:
-            return node.value
-        return None
+        link = self._bucket_for(hash)
+        if self._stats is not None:
+            node = self._search(link, key, hash)
+        elif link is not None:
+            node = link.contains(key, hash)
+        else:
+            return None
+        return None if node is None else node.value
 
     def contains_key(self, key: str) -> bool:
         """
@@ -206,13 +527,66 @@ class HashMap:
         :return:    True if the key exists in the hash map
                     False otherwise
         """
+        if self._old_buckets is not None:
+            self._migrate()
         hash = self._hash_function(key)
-        ind = hash%self._capacity
-        node = self._buckets.get_at_index(ind).contains(key)
-        if node is not None:
+        link = self._bucket_for(hash)
+        if self._stats is not None:
+            return self._search(link, key, hash) is not None
+        if link is not None and link.contains(key, hash) is not None:
             return True
         return False
 
+    def get_many(self, keys) -> DynamicArray:
+        """
+        Returns the values associated with a batch of keys. The whole batch
+        is hashed and reduced to bucket indices at once (with NumPy when it
+        is available) before each bucket is searched.
+
+        :param keys: DynamicArray or iterable of keys to find values of
+
+        :return:     DynamicArray of the values in the order of the keys,
+                     None for every key that is not in the hash map
+        """
+        keys = as_list(keys)
+        hashes, indices = bucket_indices(keys, self._hash_function, self._capacity)
+        values = DynamicArray()
+        for key, hash, ind in zip(keys, hashes, indices):
+            if self._old_buckets is None:
+                link = self._buckets.get_at_index(ind)
+            else:
+                link = self._bucket_for(hash)
+            if self._stats is not None:
+                node = self._search(link, key, hash)
+            else:
+                node = None if link is None else link.contains(key, hash)
+            values.append(None if node is None else node.value)
+        return values
+
+    def contains_many(self, keys) -> DynamicArray:
+        """
+        Determines which keys of a batch are in the hash map, hashing the
+        whole batch at once like get_many.
+
+        :param keys: DynamicArray or iterable of keys to look for
+
+        :return:     DynamicArray of booleans in the order of the keys
+        """
+        keys = as_list(keys)
+        hashes, indices = bucket_indices(keys, self._hash_function, self._capacity)
+        found = DynamicArray()
+        for key, hash, ind in zip(keys, hashes, indices):
+            if self._old_buckets is None:
+                link = self._buckets.get_at_index(ind)
+            else:
+                link = self._bucket_for(hash)
+            if self._stats is not None:
+                node = self._search(link, key, hash)
+            else:
+                node = None if link is None else link.contains(key, hash)
+            found.append(node is not None)
+        return found
+
     def remove(self, key: str) -> None:
         """
         Removes the given key and its value from the hash map.
@@ -222,12 +596,56 @@ class HashMap:
 
         :return:    None
         """
-        hash = self._hash_function(key)
-        ind = hash%self._capacity
-        link = self._buckets.get_at_index(ind)
-        if link.contains(key):
-            link.remove(key)
-            self._size -= 1
+        self._remove(key, self._hash_function(key))
+
+    def _remove(self, key: str, hash: int) -> bool:
+        """
+        Removes a key whose hash is already known, with a single search of
+        its bucket.
+
+        :param key:  key to remove from the hash map
+        :param hash: hash of the key
+
+        :return:     True if the key was removed, False if it was not there
+        """
+        if self._old_buckets is not None:
+            self._migrate()
+        buckets, ind = self._locate(hash)
+        link = buckets.get_at_index(ind)
+        if self._stats is not None:
+            self._search(link, key, hash)
+        if link is None or not link.remove(key, hash):
+            return False
+        if link.length() == 0:
+            buckets.set_at_index(ind, None)
+        self._size -= 1
+        self._mod_count += 1
+        if self._shrink and self.table_load() < self._min_load:
+            self._shrink_table()
+        return True
+
+    def _shrink_table(self) -> None:
+        """
+        Shrinks the hash table so its load comes back halfway between
+        min_load and max_load, which leaves room for many puts and removes
+        before the table has to grow or shrink again. The table never
+        shrinks below its initial capacity.
+
+        :return: None
+        """
+        target = ceil(self._size/((self._min_load+self._max_load)/2))
+        target = max(target, self._initial_capacity)
+        if target < self._capacity:
+            self._resize(target)
+
+    def shrink_to_fit(self) -> None:
+        """
+        Resizes the hash table to the smallest prime capacity that keeps
+        its load at or below max_load.
+
+        :return: None
+        """
+        self.resize_table(max(1, ceil(self._size/self._max_load)))
 
     def get_keys_and_values(self) -> DynamicArray:
         """
@@ -238,61 +656,273 @@ class HashMap:
                  in the hash map
         """
         new_array = DynamicArray()
-        for ind in range(self._buckets.length()):
-            link = self._buckets.get_at_index(ind)
-            if link.length() > 0:
-                for node in link:
-                    new_array.append((node.key, node.value))
+        for item in self.items():
+            new_array.append(item)
         return new_array
 
+    def __iter__(self) -> HashMapIterator:
+        """
+        Returns a new iterator over the nodes of the hash map, so nested
+        loops and parallel readers each keep their own position.
+
+        :return: HashMapIterator of the hash map
+        """
+        return HashMapIterator(self)
+
+    def keys(self) -> KeysView:
+        """
+        Returns a lazy view of the keys in the hash map, which walks the
+        buckets each time it is iterated instead of copying them.
+
+        :return: KeysView of the hash map
+        """
+        return KeysView(self)
+
+    def values(self) -> ValuesView:
+        """
+        Returns a lazy view of the values in the hash map.
+
+        :return: ValuesView of the hash map
+        """
+        return ValuesView(self)
+
+    def items(self) -> ItemsView:
+        """
+        Returns a lazy view of the key/value pairs in the hash map, as
+        tuples.
+
+        :return: ItemsView of the hash map
+        """
+        return ItemsView(self)
+
+    def dump(self, fileobj, compress: bool = False,
+             chunk_entries: int = 4096) -> None:
+        """
+        Writes a snapshot of the hash map to a binary file object, streaming
+        it bucket by bucket. After a header with the size and capacity of
+        the map, the key/value pairs of consecutive buckets are pickled in
+        chunks of about chunk_entries pairs, each written with its length
+        in front and, if compress is True, compressed with zlib. A chunk of
+        length zero ends the snapshot. Only one chunk is held in memory at
+        a time.
+
+        :param fileobj:       binary file object to write to
+        :param compress:      True to compress every chunk
+        :param chunk_entries: number of pairs after which a chunk is written
+
+        :return:              None
+        """
+        fileobj.write(_SNAPSHOT_HEADER.pack(SNAPSHOT_MAGIC, self._size,
+                                            self._capacity, compress))
+        chunk = []
+        for node in self:
+            chunk.append((node.key, node.value))
+            if len(chunk) >= chunk_entries:
+                _write_chunk(fileobj, chunk, compress)
+                chunk = []
+        if chunk:
+            _write_chunk(fileobj, chunk, compress)
+        fileobj.write(_CHUNK_LENGTH.pack(0))
+
+    @classmethod
+    def load(cls, fileobj, function: callable = hash_function_1,
+             **options) -> "HashMap":
+        """
+        Reads a snapshot written by dump. The new map is sized from the
+        header up front, so the pairs are inserted chunk by chunk without
+        any resize, hashing every chunk at once like get_many.
+
+        :param fileobj:  binary file object to read from
+        :param function: hash function for the new map
+        :param options:  any other arguments of the class, such as max_load;
+                         the map is constructed with keyword arguments, as
+                         in from_items
+
+        :return:         the new HashMap
+        """
+        magic, size, capacity, compress = _SNAPSHOT_HEADER.unpack(
+            _read_exactly(fileobj, _SNAPSHOT_HEADER.size))
+        if magic != SNAPSHOT_MAGIC:
+            raise ValueError("file object does not hold a hash map snapshot")
+        new_map = cls(capacity=capacity, function=function, **options)
+        if size > new_map._max_load*new_map._capacity:
+            new_map.resize_table(ceil(size/new_map._max_load))
+        while True:
+            length = _CHUNK_LENGTH.unpack(_read_exactly(fileobj, _CHUNK_LENGTH.size))[0]
+            if length == 0:
+                return new_map
+            data = _read_exactly(fileobj, length)
+            if compress:
+                data = zlib.decompress(data)
+            chunk = pickle.loads(data)
+            keys = [key for key, _ in chunk]
+            for (key, value), hash in zip(chunk, hash_keys(keys, function)):
+                new_map._insert(key, value, hash)
+
+
+def _relink(buckets: DynamicArray, ind: int, node: SLNode,
+            bucket_type: type = LinkedList) -> None:
+    """
+    Moves an existing node into the bucket at the given index of a bucket
+    array, creating the bucket if it is empty.
+
+    :param buckets:     bucket array to move the node into
+    :param ind:         index of the bucket
+    :param node:        node to move
+    :param bucket_type: LinkedList or HybridBucket, for a new bucket
+
+    :return:            None
+    """
+    link = buckets.get_at_index(ind)
+    if link is None:
+        link = bucket_type()
+        buckets.set_at_index(ind, link)
+    link.insert_node(node)
+
+
+def _write_chunk(fileobj, chunk: list, compress: bool) -> None:
+    """
+    Writes one chunk of a snapshot: the pickled pairs, compressed if asked,
+    preceded by their length.
+
+    :param fileobj:  binary file object to write to
+    :param chunk:    list of key/value tuples
+    :param compress: True to compress the chunk with zlib
+
+    :return:         None
+    """
+    data = pickle.dumps(chunk, pickle.HIGHEST_PROTOCOL)
+    if compress:
+        data = zlib.compress(data, 1)
+    fileobj.write(_CHUNK_LENGTH.pack(len(data)))
+    fileobj.write(data)
+
+
+def _read_exactly(fileobj, length: int) -> bytes:
+    """
+    Reads exactly length bytes from a file object.
+
+    :param fileobj: binary file object to read from
+    :param length:  number of bytes to read
+
+    :return:        the bytes read
+    """
+    data = fileobj.read(length)
+    if len(data) != length:
+        raise EOFError("hash map snapshot ends early")
+    return data
+
+
+def _elements(source):
+    """
+    Generator over the values of a DynamicArray or any other iterable, so
+    that streams can be counted without materializing them first.
+
+    :param source: DynamicArray or iterable of values
 
-def find_mode(da: DynamicArray) -> tuple[DynamicArray, int]:
+    :return:       generator of the values
     """
-    Finds the most often occurring value of a given DynamicArray.
+    if isinstance(source, DynamicArray):
+        for ind in range(source.length()):
+            yield source.get_at_index(ind)
+    else:
+        yield from source
 
-    :param da: DynamicArray to determine mode of
+
+def _count(source) -> HashMap:
+    """
+    Counts how often each distinct value of the source occurs, keeping a
+    single counter node per distinct value.
+
+    :param source: DynamicArray or iterable of string values
+
+    :return:       HashMap of value to number of occurrences
+    """
+    counts = HashMap(11, fnv1a)
+    for value in _elements(source):
+        counts._increment(value)
+    return counts
+
+
+def find_mode(da) -> tuple[DynamicArray, int]:
+    """
+    Finds the most often occurring value of a given DynamicArray or any
+    other iterable of strings, counting the values in a single pass.
+
+    :param da: DynamicArray or iterable to determine mode of
 
     :return: a tuple of a DynamicArray of the most occurring value(s) and
              an integer declaring the frequency of the value(s)
     """
-    # if you'd like to use a hash map,
-    # use this instance of your Separate Chaining HashMap
-    map = HashMap(da.length(), hash_function_1)
-    val = 0
-    for ind in range(da.length()):
-        key = da.get_at_index(ind)
-        value = str(val)
-        map.new_put(key, value)
-        val += 1
-    new_da = map.get_keys_and_values()
-    # Initializes value count to 1
-    count = 1
-    # Count of most frequent value
-    final_count = 0
-    # Initializes first value of array as most frequent until another value
-    # becomes more frequent
-    final_object = new_da.get_at_index(0)[0]
-    new_array = DynamicArray()
-    new_array.append(final_object)
-    for ind in range(0, new_da.length()):
-        if ind+1 >= new_da.length() or new_da.get_at_index(ind)[0] != new_da.get_at_index(ind+1)[0]:
-            if count > final_count:
-                final_count = count
-                final_object = new_da.get_at_index(ind)[0]
-                new_array = DynamicArray()
-                new_array.append(final_object)
-            elif count == final_count:
-                final_object = new_da.get_at_index(ind)[0]
-                new_array.append(final_object)
-            count = 1
-        elif new_da.get_at_index(ind)[0] == new_da.get_at_index(ind+1)[0]:
-            count += 1
-    return (new_array, final_count)
+    modes = DynamicArray()
+    frequency = 0
+    for value, count in _count(da).items():
+        if count > frequency:
+            modes = DynamicArray()
+            frequency = count
+        if count == frequency:
+            modes.append(value)
+    return (modes, frequency)
+
+
+def top_k(source, k: int) -> DynamicArray:
+    """
+    Finds the k most often occurring values of a DynamicArray or any other
+    iterable of strings.
+
+    :param source: DynamicArray or iterable to count
+    :param k:      number of values to return
+
+    :return:       DynamicArray of (value, frequency) tuples, most frequent
+                   first; ties are broken arbitrarily
+    """
+    counts = _count(source)
+    top = DynamicArray()
+    for item in heapq.nlargest(k, counts.items(), key=itemgetter(1)):
+        top.append(item)
+    return top
+
+
+def heavy_hitters(source, k: int) -> DynamicArray:
+    """
+    Finds the values of a stream that may occur more than n / (k + 1)
+    times, where n is the length of the stream, using the Misra-Gries
+    algorithm. At most k counters are kept at any time, so memory does not
+    grow with the length of the stream or the number of distinct values.
+    Every value that does occur more than n / (k + 1) times is returned,
+    possibly with some values that do not.
+
+    :param source: DynamicArray or iterable of string values
+    :param k:      number of counters to keep
+
+    :return:       DynamicArray of (value, estimated frequency) tuples, most
+                   frequent first; each estimate is at most n / (k + 1)
+                   below the true frequency
+    """
+    counters = HashMap(k, fnv1a)
+    for value in _elements(source):
+        if counters.get_size() < k or counters.contains_key(value):
+            counters._increment(value)
+            continue
+        # no free counter, so decrement all of them and drop those at zero
+        exhausted = DynamicArray()
+        for node in counters._entries():
+            node.value -= 1
+            if node.value == 0:
+                exhausted.append(node.key)
+        for ind in range(exhausted.length()):
+            counters.remove(exhausted.get_at_index(ind))
+    hitters = DynamicArray()
+    for item in sorted(counters.items(), key=itemgetter(1), reverse=True):
+        hitters.append(item)
+    return hitters
 
 # ------------------- BASIC TESTING ---------------------------------------- #
 
 
 if __name__ == "__main__":
+    import io
+    from itertools import permutations
 
     print("\nPDF - put example 1")
     print("-------------------")
@@ -490,3 +1120,142 @@ if __name__ == "__main__":
         da = DynamicArray(case)
         mode, frequency = find_mode(da)
         print(f"Input: {da}\nMode : {mode}, Frequency: {frequency}\n")
+
+    print("\nmax_load / growth_factor example 1")
+    print("----------------------------------")
+    m = HashMap(53, hash_function_1, max_load=0.75, min_load=0.1, growth_factor=1.25)
+    for i in range(300):
+        m.put('str' + str(i), i * 100)
+        if i % 50 == 49:
+            print(round(m.table_load(), 2), m.get_size(), m.get_capacity())
+
+    print("\nshrink example 1")
+    print("----------------")
+    m = HashMap(53, hash_function_1, shrink=True)
+    for i in range(500):
+        m.put('str' + str(i), i * 100)
+    print(m.get_size(), m.get_capacity())
+    for i in range(450):
+        m.remove('str' + str(i))
+    print(m.get_size(), m.get_capacity(), round(m.table_load(), 2), m.get('str499'))
+    for i in range(450, 500):
+        m.remove('str' + str(i))
+    print(m.get_size(), m.get_capacity())
+    for i in range(500):
+        m.put('str' + str(i), i * 100)
+    m.clear()
+    print(m.get_size(), m.get_capacity())
+
+    print("\nshrink_to_fit example 1")
+    print("-----------------------")
+    m = HashMap(53, hash_function_1)
+    for i in range(500):
+        m.put('str' + str(i), i * 100)
+    for i in range(400):
+        m.remove('str' + str(i))
+    print(m.get_size(), m.get_capacity())
+    m.shrink_to_fit()
+    print(m.get_size(), m.get_capacity(), round(m.table_load(), 2),
+          all(m.get('str' + str(i)) == i * 100 for i in range(400, 500)))
+
+    print("\nincremental rehash example 1")
+    print("----------------------------")
+    m = HashMap(53, hash_function_1, incremental=True, rehash_batch=4)
+    for i in range(60):
+        m.put('str' + str(i), i * 100)
+    # a resize is under way, so lookups search the old table as well
+    print(m.get_size(), m.get_capacity(), m._old_buckets is not None)
+    print(all(m.get('str' + str(i)) == i * 100 for i in range(60)), m.contains_key('str60'))
+    m.remove('str0')
+    print(m.get_size(), m.get('str0'), m.get('str59'), m._old_buckets is not None)
+
+    print("\nconcurrent modification example 1")
+    print("---------------------------------")
+    m = HashMap(11, hash_function_1)
+    for i in range(5):
+        m.put(str(i), i * 10)
+    # every loop gets its own iterator, so nested loops do not interfere
+    print(sum(1 for _ in m for _ in m))
+    iterator = iter(m)
+    next(iterator)
+    m.put('0', 'updated')
+    print(next(iterator) is not None)
+    m.put('5', 50)
+    try:
+        next(iterator)
+    except ConcurrentModificationException:
+        print('ConcurrentModificationException')
+
+    print("\ndump / load example 1")
+    print("---------------------")
+    m = HashMap(53, hash_function_1)
+    for i in range(1000):
+        m.put('str' + str(i), 'value' * (i % 10))
+    for compress in (False, True):
+        snapshot = io.BytesIO()
+        m.dump(snapshot, compress=compress, chunk_entries=128)
+        snapshot.seek(0)
+        loaded = HashMap.load(snapshot, hash_function_2)
+        print(compress, len(snapshot.getvalue()), loaded.get_size(), loaded.get_capacity(),
+              all(loaded.get('str' + str(i)) == 'value' * (i % 10) for i in range(1000)))
+
+    print("\nhybrid bucket example 1")
+    print("-----------------------")
+    # anagrams all have the same hash_function_1 hash, so they share a bucket
+    keys = [''.join(letters) for letters in islice(permutations('abcdefg'), 20)]
+    m = HashMap(11, hash_function_1, hybrid=True)
+    for i, key in enumerate(keys):
+        m.put(key, i)
+    bucket = m._bucket_for(hash_function_1(keys[0]))
+    print(m.get_size(), bucket.length(), bucket._order is not None,
+          all(m.get(key) == i for i, key in enumerate(keys)))
+    # the bucket stays sorted until it drops below HybridBucket.DEMOTE keys
+    for key in keys[:13]:
+        m.remove(key)
+    print(m.get_size(), bucket.length(), bucket._order is not None)
+    for key in keys[13:15]:
+        m.remove(key)
+    print(m.get_size(), bucket.length(), bucket._order is not None,
+          all(m.get(key) == i for i, key in enumerate(keys[15:], 15)), m.get(keys[0]))
+
+    print("\nput_many / from_items example 1")
+    print("-------------------------------")
+    # a generator has no length, so the table grows between batches
+    m = HashMap.from_items((('str' + str(i), i * 100) for i in range(1000)), hash_function_1)
+    print(m.get_size(), m.get_capacity(), round(m.table_load(), 2))
+    # a list is sized once up front; later pairs overwrite earlier ones
+    m.put_many([('str' + str(i), -i) for i in range(500, 1500)] + [('str1499', 'last')])
+    print(m.get_size(), m.get_capacity(), m.get('str1'), m.get('str700'), m.get('str1499'))
+
+    print("\nget_many / contains_many example 1")
+    print("----------------------------------")
+    m = HashMap(53, hash_function_2)
+    for i in range(100):
+        m.put('str' + str(i), i * 100)
+    keys = DynamicArray(['str1', 'missing', 'str99', 'str1'])
+    print(m.get_many(keys))
+    print(m.contains_many(['str0', 'str100', 'str50']))
+
+    print("\ntop_k / heavy_hitters example 1")
+    print("-------------------------------")
+    da = DynamicArray(["Mint", "Arch", "Mint", "Ubuntu", "Mint", "Ubuntu", "Arch", "Ubuntu",
+                       "Mint", "Manjaro"])
+    print(top_k(da, 2))
+    # 'a' makes up 1000 and 'b' 400 of the 3000 values, both more than
+    # n / (k + 1) = 300, so both are found with 9 counters
+    stream = ('a' if i % 3 == 0 else 'b' if i % 5 == 0 else 'str' + str(i) for i in range(3000))
+    hitters = heavy_hitters(stream, 9)
+    print(hitters.length() <= 9, hitters.get_at_index(0)[0], hitters.get_at_index(1)[0])
+
+    print("\nkeys / values / items example 1")
+    print("-------------------------------")
+    m = HashMap(11, hash_function_2)
+    for i in range(1, 6):
+        m.put(str(i), str(i * 10))
+    keys, values, items = m.keys(), m.values(), m.items()
+    print(len(keys), sorted(keys), sorted(values), sorted(items))
+    # the views are lazy, so they follow later changes to the map
+    m.put('6', '60')
+    m.remove('1')
+    print(len(keys), '6' in keys, '1' in keys, '60' in values, ('2', '20') in items,
+          ('2', '30') in items)
@@ -0,0 +1,110 @@
+# Name: Blake Jennings
+# Email: blakej94@gmail.com
+# Description: 64-bit string hash functions that can be passed as the
+#              function argument of the hash maps. Keys are encoded to UTF-8
+#              and consumed eight bytes at a time instead of one character
+#              at a time.
+
+from struct import unpack_from
+
+MASK64 = (1 << 64)-1
+
+FNV_OFFSET = 0xcbf29ce484222325
+FNV_PRIME = 0x100000001b3
+
+# xxHash64 primes
+PRIME64_1 = 0x9e3779b185ebca87
+PRIME64_2 = 0xc2b2ae3d27d4eb4f
+PRIME64_3 = 0x165667b19e3779f9
+
+
+def _words(key: str) -> tuple:
+    """
+    Encodes a key to UTF-8, pads it with zero bytes to a multiple of eight
+    and unpacks it as little-endian 64-bit words in a single call.
+
+    :param key: string to split into words
+
+    :return:    tuple of the words and the length of the encoded key
+    """
+    data = key.encode()
+    length = len(data)
+    data += bytes(-length % 8)
+    return unpack_from('<%dQ' % (len(data) >> 3), data), length
+
+
+def mix64(hash: int) -> int:
+    """
+    Avalanches a 64-bit value with the xxHash64 finalizer, so that every
+    input bit affects every output bit.
+
+    :param hash: 64-bit value to mix
+
+    :return:     mixed 64-bit value
+    """
+    hash ^= hash >> 33
+    hash = (hash*PRIME64_2) & MASK64
+    hash ^= hash >> 29
+    hash = (hash*PRIME64_3) & MASK64
+    hash ^= hash >> 32
+    return hash
+
+
+def fnv1a(key: str) -> int:
+    """
+    64-bit FNV-1a over the 64-bit words of the UTF-8 encoded key. The key
+    length is folded in last, so keys that only differ by trailing zero
+    bytes do not collide, and the high half is folded into the low half
+    because the table index only looks at the hash modulo the capacity.
+
+    :param key: string to hash
+
+    :return:    64-bit hash of the key
+    """
+    words, length = _words(key)
+    hash = FNV_OFFSET
+    for word in words:
+        hash = ((hash ^ word)*FNV_PRIME) & MASK64
+    hash = ((hash ^ length)*FNV_PRIME) & MASK64
+    return hash ^ (hash >> 32)
+
+
+def xx_hash(key: str, seed: int = 0) -> int:
+    """
+    xxHash64 style hash: every 64-bit word of the UTF-8 encoded key is
+    multiplied, rotated and accumulated, then the result goes through the
+    xxHash64 avalanche.
+
+    :param key:  string to hash
+    :param seed: 64-bit seed mixed into the starting state
+
+    :return:     64-bit hash of the key
+    """
+    words, length = _words(key)
+    hash = (seed+PRIME64_3+length) & MASK64
+    for word in words:
+        lane = (word*PRIME64_2) & MASK64
+        lane = ((lane << 31) | (lane >> 33)) & MASK64
+        hash ^= (lane*PRIME64_1) & MASK64
+        hash = (((hash << 27) | (hash >> 37))*PRIME64_1+PRIME64_3) & MASK64
+    return mix64(hash)
+
+
+def seeded_hash(seed: int):
+    """
+    Returns a variant of xx_hash bound to the given seed, for use as the
+    function argument of a hash map. Maps built with different seeds place
+    the same keys in unrelated buckets.
+
+    :param seed: 64-bit seed
+
+    :return:     hash function taking only a key
+    """
+    seed &= MASK64
+
+    def hash_function(key: str) -> int:
+        """Hash the key with xx_hash and the bound seed."""
+        return xx_hash(key, seed)
+
+    hash_function.seed = seed
+    return hash_function
@@ -0,0 +1,137 @@
+# Name: Blake Jennings
+# Email: blakej94@gmail.com
+# Description: An adaptive bucket for the separate chaining HashMap that can
+#              stand in for a LinkedList. Short chains are a small unsorted
+#              array of nodes that is searched in order. Once a bucket holds
+#              more than PROMOTE nodes, the array is sorted by hash and key
+#              and searched with binary search, so lookups in a long chain
+#              take O(log k) instead of O(k) comparisons; it goes back to an
+#              unsorted array when removals bring it below DEMOTE nodes. The
+#              gap between the two thresholds keeps a bucket from flipping
+#              back and forth. The next links of the nodes are kept in array
+#              order, so code that walks a chain from _head still works.
+
+from bisect import bisect_left
+
+from a6_include import SLNode
+
+
+class HybridBucket:
+    """
+    Bucket holding SLNodes in an array, sorted by (hash, key) once it is
+    long. Supported methods are the ones the HashMap uses on a LinkedList:
+    insert, insert_node, remove, contains, length, iterator
+    """
+
+    __slots__ = ('_nodes', '_order')
+
+    PROMOTE = 8
+    DEMOTE = 6
+
+    def __init__(self) -> None:
+        """
+        Initialize new empty bucket. _order is None while the bucket is
+        unsorted, and otherwise holds the (hash, key) of every node in the
+        same sorted order as the nodes.
+        """
+        self._nodes = []
+        self._order = None
+
+    def __str__(self) -> str:
+        """Override string method to provide more readable output."""
+        return 'HB [' + ' -> '.join(str(node) for node in self._nodes) + ']'
+
+    def __iter__(self):
+        """Return an iterator over the nodes of the bucket."""
+        return iter(self._nodes)
+
+    @property
+    def _head(self) -> SLNode:
+        """Return the first node of the chain, or None if it is empty."""
+        return self._nodes[0] if self._nodes else None
+
+    def _link(self, ind: int) -> None:
+        """Point the node before the given index at the node at it."""
+        if ind > 0:
+            nodes = self._nodes
+            nodes[ind-1].next = nodes[ind] if ind < len(nodes) else None
+
+    def insert(self, key: str, value: object, hash: int) -> None:
+        """Insert a new node with the full hash of its key."""
+        self.insert_node(SLNode(key, value, None, hash))
+
+    def insert_node(self, node: SLNode) -> None:
+        """
+        Insert an existing node, which must carry the full hash of its key.
+        The bucket is sorted once it holds more than PROMOTE nodes.
+        """
+        nodes = self._nodes
+        if self._order is not None:
+            ind = bisect_left(self._order, (node.hash, node.key))
+            self._order.insert(ind, (node.hash, node.key))
+        else:
+            ind = len(nodes)
+        nodes.insert(ind, node)
+        node.next = nodes[ind+1] if ind+1 < len(nodes) else None
+        self._link(ind)
+        if self._order is None and len(nodes) > self.PROMOTE:
+            nodes.sort(key=lambda item: (item.hash, item.key))
+            self._order = [(item.hash, item.key) for item in nodes]
+            for ind in range(1, len(nodes)):
+                nodes[ind-1].next = nodes[ind]
+            nodes[-1].next = None
+
+    def _index(self, key: str, hash: int) -> int:
+        """
+        Return the index of the node with matching key, or -1 if no match.
+        A sorted bucket is searched with binary search when the hash is
+        given; otherwise the nodes are compared one by one.
+        """
+        nodes = self._nodes
+        if self._order is not None and hash is not None:
+            ind = bisect_left(self._order, (hash, key))
+            if ind < len(nodes) and self._order[ind] == (hash, key):
+                return ind
+            return -1
+        for ind, node in enumerate(nodes):
+            if (hash is None or node.hash == hash) and node.key == key:
+                return ind
+        return -1
+
+    def contains(self, key: str, hash: int = None) -> SLNode:
+        """Return node with matching key, or None if no match."""
+        ind = self._index(key, hash)
+        return None if ind == -1 else self._nodes[ind]
+
+    def remove(self, key: str, hash: int = None) -> bool:
+        """
+        Remove the node with matching key.
+        Return True if removal was successful, False otherwise.
+        The bucket stops being sorted once it holds fewer than DEMOTE nodes.
+        """
+        ind = self._index(key, hash)
+        if ind == -1:
+            return False
+        del self._nodes[ind]
+        self._link(ind)
+        if self._order is not None:
+            del self._order[ind]
+            if len(self._nodes) < self.DEMOTE:
+                self._order = None
+        return True
+
+    def length(self) -> int:
+        """Return the number of nodes in the bucket."""
+        return len(self._nodes)
+
+    def find(self, key: str, hash: int = None) -> tuple:
+        """
+        Return the node with matching key, or None if no match, along with
+        the number of nodes examined: the steps of the binary search in a
+        sorted bucket, otherwise the nodes up to and including the match.
+        """
+        ind = self._index(key, hash)
+        node = None if ind == -1 else self._nodes[ind]
+        if self._order is not None and hash is not None:
+            return node, len(self._nodes).bit_length()
+        return node, len(self._nodes) if ind == -1 else ind+1
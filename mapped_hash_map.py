@@ -0,0 +1,76 @@
+# Name: Blake Jennings
+# Email: blakej94@gmail.com
+# Description: A read-only hash map served straight from a file written by
+#              hash_map_oa.HashMap.save. The file is memory mapped rather
+#              than read, so opening it takes constant time and its pages
+#              are only loaded as lookups touch them.
+
+import mmap
+import os
+
+from packed_table import PackedBuilder, PackedHashMap
+
+
+def save_packed(items, function, path: str) -> None:
+    """
+    Writes key/value pairs to a file in the packed table format. The table
+    is written into a memory mapping of a temporary file next to the
+    destination, which then replaces the destination in one step, so a
+    crash never leaves a half-written file behind.
+
+    :param items:    iterable of key/value tuples
+    :param function: hash function of the table
+    :param path:     path of the file to write
+
+    :return:         None
+    """
+    builder = PackedBuilder(items, function)
+    temporary = path + '.tmp'
+    with open(temporary, 'wb+') as file:
+        # a new file is zero-filled, as the builder expects
+        file.truncate(builder.size)
+        with mmap.mmap(file.fileno(), builder.size) as mapping:
+            builder.write(mapping)
+            mapping.flush()
+        os.fsync(file.fileno())
+    os.replace(temporary, path)
+
+
+class MappedHashMap(PackedHashMap):
+    def __init__(self, path: str) -> None:
+        """
+        Initialize a MappedHashMap by memory mapping a file in the packed
+        table format. Nothing but the header is read until keys are looked
+        up.
+        """
+        self._file = open(path, 'rb')
+        try:
+            self._mapping = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            self._file.close()
+            raise ValueError(f"{path} is empty") from None
+        try:
+            super().__init__(self._mapping)
+        except ValueError:
+            self._mapping.close()
+            self._file.close()
+            raise
+
+    def __enter__(self) -> "MappedHashMap":
+        """Return the map for use in a with statement."""
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        """Close the map at the end of a with statement."""
+        self.close()
+
+    def close(self) -> None:
+        """
+        Unmaps the file. bytes values returned by get are views of the
+        mapping and must be released first.
+
+        :return: None
+        """
+        super().close()
+        self._mapping.close()
+        self._file.close()
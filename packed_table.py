@@ -0,0 +1,395 @@
+# Name: Blake Jennings
+# Email: blakej94@gmail.com
+# Description: A packed, read-only open addressing table laid out in one
+#              flat buffer, so it can live in shared memory or a memory
+#              mapped file and be searched in place without deserializing
+#              anything. The buffer holds a header, one state byte per slot,
+#              fixed-width slots of (full hash, record offset) and an arena
+#              of packed key/value records.
+#
+#              offset 0         header, HEADER_SIZE bytes
+#              offset 64        states, capacity bytes (EMPTY or LIVE)
+#              slots_offset     slots, capacity * 16 bytes, 8 byte aligned
+#              arena_offset     records: key length, value length, value
+#                               kind, UTF-8 key bytes, value bytes
+
+from struct import Struct
+
+from a6_include import (DynamicArray, HashEntry, hash_function_1,
+                        hash_function_2)
+from capacity import next_prime
+from hashing import MASK64, fnv1a, seeded_hash, xx_hash
+from views import ItemsView, KeysView, ValuesView
+
+MAGIC = b'HMPACK01'
+
+# magic, capacity, size, hash function id, seed, slots offset, arena offset
+HEADER = Struct('<8sQQQQQQ')
+HEADER_SIZE = 64
+
+# full hash of the key (masked to 64 bits) and offset of its record
+SLOT = Struct('<QQ')
+
+# key length, value length, value kind
+RECORD = Struct('<IIB')
+
+# Slot states
+EMPTY = 0
+LIVE = 1
+
+# Value kinds. bytes values are returned as memoryviews of the buffer
+BYTES = 0
+STR = 1
+INT = 2
+FLOAT = 3
+NONE = 4
+BOOL = 5
+
+_INT = Struct('<q')
+_FLOAT = Struct('<d')
+
+# Hash functions a packed table can be built with, by id. Every process
+# resolves the id to the same function, which is not true of built-in hash.
+FUNCTIONS = {
+    1: hash_function_1,
+    2: hash_function_2,
+    3: fnv1a,
+    4: xx_hash,
+}
+
+
+def function_id(function) -> tuple:
+    """
+    Returns the id and seed under which a hash function is stored in the
+    header of a packed table.
+
+    :param function: hash function of the table
+
+    :return:         tuple of the function id and its seed, 0 if unseeded
+    """
+    for ind, known in FUNCTIONS.items():
+        if function is known:
+            return ind, 0
+    seed = getattr(function, 'seed', None)
+    if seed is not None:
+        return 4, seed
+    raise ValueError("packed tables need hash_function_1, hash_function_2, "
+                     "fnv1a, xx_hash or a seeded_hash function")
+
+
+def function_for(ind: int, seed: int):
+    """
+    Returns the hash function stored in the header of a packed table.
+
+    :param ind:  function id
+    :param seed: seed of the function, 0 if unseeded
+
+    :return:     hash function
+    """
+    if ind not in FUNCTIONS:
+        raise ValueError(f"unknown hash function id {ind}")
+    if ind == 4 and seed:
+        return seeded_hash(seed)
+    return FUNCTIONS[ind]
+
+
+def encode_value(value: object) -> tuple:
+    """
+    Returns the kind and the bytes a value is stored as.
+
+    :param value: bytes, str, int, float, bool or None
+
+    :return:      tuple of the value kind and the encoded bytes
+    """
+    if value is None:
+        return NONE, b''
+    if isinstance(value, bool):
+        return BOOL, bytes((value,))
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return BYTES, bytes(value)
+    if isinstance(value, str):
+        return STR, value.encode()
+    if isinstance(value, int):
+        return INT, _INT.pack(value)
+    if isinstance(value, float):
+        return FLOAT, _FLOAT.pack(value)
+    raise TypeError(f"cannot store a value of type {type(value).__name__} "
+                    "in a packed table")
+
+
+def packed_layout(capacity: int, arena_size: int) -> tuple:
+    """
+    Returns where the slots and the arena of a packed table start and how
+    large the whole buffer is.
+
+    :param capacity:   number of slots
+    :param arena_size: total size of the records
+
+    :return:           tuple of the slots offset, arena offset and buffer size
+    """
+    slots_offset = HEADER_SIZE+capacity
+    slots_offset += -slots_offset % 8
+    arena_offset = slots_offset+capacity*SLOT.size
+    return slots_offset, arena_offset, arena_offset+arena_size
+
+
+class PackedBuilder:
+    """
+    Encodes key/value pairs for a packed table and writes them into a
+    buffer. Later pairs overwrite earlier ones with the same key.
+    """
+
+    def __init__(self, items, function=fnv1a) -> None:
+        """
+        Encode every pair of an iterable and work out the layout of a table
+        that keeps its load below 0.5, so quadratic probing always finds an
+        empty slot.
+        """
+        self.function_id, self.seed = function_id(function)
+        self._function = function
+        records = {}
+        for key, value in items:
+            kind, data = encode_value(value)
+            encoded = key.encode()
+            records[key] = RECORD.pack(len(encoded), len(data), kind)+encoded+data
+        self._records = records
+        self.capacity = next_prime(2*len(records)+1)
+        self.arena_size = sum(len(record) for record in records.values())
+        self.slots_offset, self.arena_offset, self.size = \
+            packed_layout(self.capacity, self.arena_size)
+
+    def write(self, buffer) -> None:
+        """
+        Write the table into a writable buffer of at least self.size bytes,
+        which must be zero-filled.
+        """
+        buffer = memoryview(buffer)
+        capacity = self.capacity
+        HEADER.pack_into(buffer, 0, MAGIC, capacity, len(self._records),
+                         self.function_id, self.seed, self.slots_offset,
+                         self.arena_offset)
+        offset = self.arena_offset
+        for key, record in self._records.items():
+            hash = self._function(key) & MASK64
+            ind = hash%capacity
+            step = 1
+            while buffer[HEADER_SIZE+ind] != EMPTY:
+                ind = (ind+step)%capacity
+                step += 2
+            buffer[HEADER_SIZE+ind] = LIVE
+            SLOT.pack_into(buffer, self.slots_offset+ind*SLOT.size, hash, offset)
+            buffer[offset:offset+len(record)] = record
+            offset += len(record)
+        buffer.release()
+
+
+class PackedTable:
+    """
+    Read-only view of a packed table in a buffer. Lookups read the header,
+    state bytes, slots and records in place.
+    """
+
+    def __init__(self, buffer) -> None:
+        """Check the header of the buffer and load the table's parameters."""
+        self._buffer = memoryview(buffer)
+        magic, self._capacity, self._size, ind, seed, self._slots_offset, \
+            self._arena_offset = HEADER.unpack_from(self._buffer, 0)
+        if magic != MAGIC:
+            self._buffer.release()
+            raise ValueError("buffer does not hold a packed hash table")
+        self._hash_function = function_for(ind, seed)
+
+    def release(self) -> None:
+        """Release the view of the buffer, after which lookups fail."""
+        self._buffer.release()
+
+    def get_size(self) -> int:
+        """Return the number of key/value pairs."""
+        return self._size
+
+    def get_capacity(self) -> int:
+        """Return the number of slots."""
+        return self._capacity
+
+    def _find(self, key: str) -> int:
+        """
+        Follows the quadratic probe path of a key, comparing the full hash
+        of each live slot before the key bytes of its record.
+
+        :param key: key to search for
+
+        :return:    arena offset of the record, -1 if the key is not there
+        """
+        buffer = self._buffer
+        capacity = self._capacity
+        hash = self._hash_function(key) & MASK64
+        encoded = None
+        ind = hash%capacity
+        step = 1
+        while buffer[HEADER_SIZE+ind] != EMPTY:
+            slot_hash, offset = SLOT.unpack_from(buffer, self._slots_offset+ind*SLOT.size)
+            if slot_hash == hash:
+                if encoded is None:
+                    encoded = key.encode()
+                key_length = RECORD.unpack_from(buffer, offset)[0]
+                start = offset+RECORD.size
+                if key_length == len(encoded) and buffer[start:start+key_length] == encoded:
+                    return offset
+            ind = (ind+step)%capacity
+            step += 2
+        return -1
+
+    def _value(self, offset: int) -> object:
+        """
+        Decodes the value of the record at the given offset. bytes values
+        are returned as a memoryview of the buffer, without copying.
+        """
+        buffer = self._buffer
+        key_length, value_length, kind = RECORD.unpack_from(buffer, offset)
+        start = offset+RECORD.size+key_length
+        if kind == BYTES:
+            return buffer[start:start+value_length]
+        if kind == STR:
+            return str(buffer[start:start+value_length], 'utf-8')
+        if kind == INT:
+            return _INT.unpack_from(buffer, start)[0]
+        if kind == FLOAT:
+            return _FLOAT.unpack_from(buffer, start)[0]
+        if kind == BOOL:
+            return buffer[start] == 1
+        return None
+
+    def get(self, key: str) -> object:
+        """Return the value of the key, or None if it is not in the table."""
+        offset = self._find(key)
+        if offset == -1:
+            return None
+        return self._value(offset)
+
+    def contains_key(self, key: str) -> bool:
+        """Determine if the key is in the table."""
+        return self._find(key) != -1
+
+    def __iter__(self):
+        """Generate a HashEntry with the decoded key and value of every record."""
+        buffer = self._buffer
+        for ind in range(self._capacity):
+            if buffer[HEADER_SIZE+ind] == LIVE:
+                hash, offset = SLOT.unpack_from(buffer, self._slots_offset+ind*SLOT.size)
+                key_length = RECORD.unpack_from(buffer, offset)[0]
+                start = offset+RECORD.size
+                key = str(buffer[start:start+key_length], 'utf-8')
+                yield HashEntry(key, self._value(offset), hash)
+
+
+class PackedHashMap:
+    """
+    Read-only hash map over a buffer that holds a packed table, with the
+    lookup methods of the other hash maps. Subclasses own the buffer.
+    """
+
+    def __init__(self, buffer) -> None:
+        """Initialize the map over a buffer that holds a packed table."""
+        self._table = PackedTable(buffer)
+
+    def close(self) -> None:
+        """
+        Releases the view of the buffer. bytes values returned by get are
+        views of the buffer and must be released first.
+
+        :return: None
+        """
+        self._table.release()
+
+    def get_size(self) -> int:
+        """
+        Return size of map
+        """
+        return self._table.get_size()
+
+    def get_capacity(self) -> int:
+        """
+        Return capacity of map
+        """
+        return self._table.get_capacity()
+
+    # ------------------------------------------------------------------ #
+
+    def table_load(self) -> float:
+        """
+        Returns the current load factor of the hash table.
+
+        :return: float indicating load factor
+        """
+        return self._table.get_size()/self._table.get_capacity()
+
+    def get(self, key: str) -> object:
+        """
+        Returns the value associated with the given key, read in place from
+        the buffer. bytes values are returned as memoryviews of the buffer,
+        without copying.
+
+        :param key: key to find value of
+
+        :return:    value if the key exists in the hash map
+                    None otherwise
+        """
+        return self._table.get(key)
+
+    def contains_key(self, key: str) -> bool:
+        """
+        Determines if the given key is in the hash map.
+
+        :param key: key to analyze if it exists in the hash map
+
+        :return:    True if the key exists in the hash map
+                    False otherwise
+        """
+        return self._table.contains_key(key)
+
+    def get_keys_and_values(self) -> DynamicArray:
+        """
+        Returns a DynamicArray of all the key/value pairs in the hash map
+        in the form of tuples.
+
+        :return: DynamicArray of key/value tuples of every key/value pair
+                 in the hash map
+        """
+        new_array = DynamicArray()
+        for item in self.items():
+            new_array.append(item)
+        return new_array
+
+    def __iter__(self):
+        """
+        Returns an iterator over the entries of the table, decoded into
+        HashEntry objects.
+
+        :return: generator of HashEntry
+        """
+        return iter(self._table)
+
+    def keys(self) -> KeysView:
+        """
+        Returns a lazy view of the keys in the hash map.
+
+        :return: KeysView of the hash map
+        """
+        return KeysView(self)
+
+    def values(self) -> ValuesView:
+        """
+        Returns a lazy view of the values in the hash map.
+
+        :return: ValuesView of the hash map
+        """
+        return ValuesView(self)
+
+    def items(self) -> ItemsView:
+        """
+        Returns a lazy view of the key/value pairs in the hash map, as
+        tuples.
+
+        :return: ItemsView of the hash map
+        """
+        return ItemsView(self)
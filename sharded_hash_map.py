@@ -0,0 +1,457 @@
+# Name: Blake Jennings
+# Email: blakej94@gmail.com
+# Description: A hash map that partitions its keys across worker processes,
+#              each owning an ordinary separate chaining or open addressing
+#              HashMap, so hashing and probing can use more than one core.
+#              Requests travel over pipes in per-shard batches, so the cost
+#              of each message is shared by many keys.
+
+import multiprocessing
+from itertools import islice
+
+import hash_map_oa
+import hash_map_sc
+from a6_include import DynamicArray, hash_function_1
+from batch import as_list, hash_keys
+from hashing import fnv1a
+
+_MAP_TYPES = {'sc': hash_map_sc, 'oa': hash_map_oa}
+
+
+def _serve(conn, map_type: str, capacity: int, function) -> None:
+    """
+    Main loop of a shard process. Receives (operation, argument) requests
+    and answers each one with ('ok', result) or ('error', exception) until
+    it receives 'close'.
+
+    :param conn:     end of the pipe owned by the shard
+    :param map_type: 'sc' or 'oa', the kind of HashMap the shard owns
+    :param capacity: initial capacity of the shard's HashMap
+    :param function: hash function of the shard's HashMap
+
+    :return:         None
+    """
+    module = _MAP_TYPES[map_type]
+    m = module.HashMap(capacity, function)
+    counts = hash_map_sc.HashMap(11, fnv1a)
+    while True:
+        operation, argument = conn.recv()
+        try:
+            if operation == 'close':
+                conn.send(('ok', None))
+                return
+            if operation == 'put_many':
+                m.put_many(argument)
+                result = None
+            elif operation == 'get_many':
+                result = m.get_many(argument)
+            elif operation == 'contains_many':
+                result = m.contains_many(argument)
+            elif operation == 'remove_many':
+                for key in argument:
+                    m.remove(key)
+                result = None
+            elif operation == 'count':
+                for value in argument:
+                    counts._increment(value)
+                result = None
+            elif operation == 'mode':
+                # each distinct value is counted by one shard only, so the
+                # local mode is a candidate for the global one
+                modes, frequency = [], 0
+                for value, count in counts.items():
+                    if count > frequency:
+                        modes, frequency = [], count
+                    if count == frequency:
+                        modes.append(value)
+                counts = hash_map_sc.HashMap(11, fnv1a)
+                result = (modes, frequency)
+            elif operation == 'size':
+                result = m.get_size()
+            elif operation == 'items':
+                result = list(m.items())
+            elif operation == 'clear':
+                m.clear()
+                result = None
+            else:
+                raise ValueError(f"unknown operation {operation}")
+        except Exception as error:
+            conn.send(('error', error))
+        else:
+            conn.send(('ok', result))
+
+
+class ShardedHashMap:
+    def __init__(self, shards: int = None, function=hash_function_1,
+                 map_type: str = 'sc', capacity: int = 11,
+                 batch_size: int = 50_000) -> None:
+        """
+        Initialize new ShardedHashMap that starts one worker process per
+        shard, one per CPU by default. Every worker owns a HashMap of the
+        given map_type ('sc' for separate chaining, 'oa' for open
+        addressing) built with the given capacity and hash function. Keys
+        are assigned to shards by the top bits of their 64-bit fnv1a hash,
+        independently of the map's own hash function, so the same key
+        always goes to the same shard. put_many, remove_many and find_mode
+        send at most batch_size keys per round trip.
+        """
+        if map_type not in _MAP_TYPES:
+            raise ValueError(f"map_type must be one of {', '.join(_MAP_TYPES)}")
+        self._shards = shards or multiprocessing.cpu_count()
+        self._batch_size = batch_size
+        self._connections = []
+        self._processes = []
+        for _ in range(self._shards):
+            parent, child = multiprocessing.Pipe()
+            process = multiprocessing.Process(
+                target=_serve, args=(child, map_type, capacity, function),
+                daemon=True)
+            process.start()
+            child.close()
+            self._connections.append(parent)
+            self._processes.append(process)
+
+    def __enter__(self) -> "ShardedHashMap":
+        """Return the map for use in a with statement."""
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        """Stop the shard processes at the end of a with statement."""
+        self.close()
+
+    def close(self) -> None:
+        """
+        Stops every shard process. The map cannot be used afterwards.
+
+        :return: None
+        """
+        if not self._connections:
+            return
+        self._broadcast('close')
+        for process in self._processes:
+            process.join()
+        for conn in self._connections:
+            conn.close()
+        self._connections = []
+        self._processes = []
+
+    # ------------------------------------------------------------------ #
+
+    def _partition(self, keys: list) -> list:
+        """
+        Returns the shard of every key: the top bits of the key's 64-bit
+        fnv1a hash, scaled to the number of shards. The whole list is
+        hashed at once, with NumPy when it is available.
+
+        :param keys: list of keys
+
+        :return:     list of shard numbers in the order of the keys
+        """
+        shards = self._shards
+        return [(hash*shards) >> 64 for hash in hash_keys(keys, fnv1a)]
+
+    def _split(self, keys: list, payload: list = None) -> list:
+        """
+        Splits a batch into one list per shard.
+
+        :param keys:    list of keys that decide the shard
+        :param payload: list of what to send for every key, the keys
+                        themselves by default
+
+        :return:        list of the per-shard lists
+        """
+        parts = [[] for _ in range(self._shards)]
+        payload = keys if payload is None else payload
+        for shard, item in zip(self._partition(keys), payload):
+            parts[shard].append(item)
+        return parts
+
+    def _call(self, operation: str, parts: list) -> list:
+        """
+        Sends one request to every shard with a non-empty part, so the
+        shards work on them in parallel, then collects the answers.
+
+        :param operation: name of the operation
+        :param parts:     list of the per-shard arguments
+
+        :return:          list of the per-shard results, None for shards
+                          that were not called
+        """
+        called = []
+        for shard, part in enumerate(parts):
+            if part:
+                self._connections[shard].send((operation, part))
+                called.append(shard)
+        return self._collect(called)
+
+    def _broadcast(self, operation: str) -> list:
+        """
+        Sends an operation without an argument to every shard and collects
+        the answers.
+
+        :param operation: name of the operation
+
+        :return:          list of the per-shard results
+        """
+        for conn in self._connections:
+            conn.send((operation, None))
+        return self._collect(range(self._shards))
+
+    def _collect(self, called) -> list:
+        """
+        Receives the answer of every shard that was sent a request. If any
+        of them reports an exception, the first one is raised, but only
+        once every answer has been read, so none is left in a pipe to be
+        taken for the answer to a later request.
+
+        :param called: numbers of the shards that were sent a request
+
+        :return:       list of the per-shard results, None for shards that
+                       were not called
+        """
+        results = [None]*self._shards
+        error = None
+        for shard in called:
+            status, result = self._connections[shard].recv()
+            if status == 'ok':
+                results[shard] = result
+            elif error is None:
+                error = result
+        if error is not None:
+            raise error
+        return results
+
+    def _batches(self, iterable):
+        """
+        Generator over lists of at most batch_size elements of an iterable.
+
+        :param iterable: iterable to split
+
+        :return:         generator of lists
+        """
+        iterator = iter(iterable)
+        while True:
+            batch = list(islice(iterator, self._batch_size))
+            if not batch:
+                return
+            yield batch
+
+    def put_many(self, items) -> None:
+        """
+        Adds every key/value pair of an iterable to the hash map, sending
+        one batch to each shard at a time. Later pairs overwrite earlier
+        ones with the same key, just as with put.
+
+        :param items: iterable of key/value tuples
+
+        :return:      None
+        """
+        for batch in self._batches(items):
+            self._call('put_many', self._split([key for key, _ in batch], batch))
+
+    def get_many(self, keys) -> DynamicArray:
+        """
+        Returns the values associated with a batch of keys.
+
+        :param keys: DynamicArray or iterable of keys to find values of
+
+        :return:     DynamicArray of the values in the order of the keys,
+                     None for every key that is not in the hash map
+        """
+        return self._gather('get_many', as_list(keys))
+
+    def contains_many(self, keys) -> DynamicArray:
+        """
+        Determines which keys of a batch are in the hash map.
+
+        :param keys: DynamicArray or iterable of keys to look for
+
+        :return:     DynamicArray of booleans in the order of the keys
+        """
+        return self._gather('contains_many', as_list(keys))
+
+    def _gather(self, operation: str, keys: list) -> DynamicArray:
+        """
+        Sends the keys of a batch to their shards and puts the per-shard
+        answers back in the order of the keys.
+
+        :param operation: 'get_many' or 'contains_many'
+        :param keys:      list of keys
+
+        :return:          DynamicArray of the answers in the order of the keys
+        """
+        shards = self._partition(keys)
+        parts = [[] for _ in range(self._shards)]
+        for shard, key in zip(shards, keys):
+            parts[shard].append(key)
+        # each shard answers with a DynamicArray from its own batched lookup
+        results = self._call(operation, parts)
+        positions = [0]*self._shards
+        answers = DynamicArray()
+        for shard in shards:
+            answers.append(results[shard].get_at_index(positions[shard]))
+            positions[shard] += 1
+        return answers
+
+    def remove_many(self, keys) -> None:
+        """
+        Removes every key of a batch from the hash map. Keys that do not
+        exist are ignored.
+
+        :param keys: DynamicArray or iterable of keys to remove
+
+        :return:     None
+        """
+        for batch in self._batches(as_list(keys)):
+            self._call('remove_many', self._split(batch))
+
+    def put(self, key: str, value: object) -> None:
+        """
+        Adds a key/value pair to the hash map. If the key already exists,
+        it updates the keys value to the new value. Every call is a round
+        trip to a shard, so put_many should be preferred for bulk loads.
+
+        :param key:   string to assign to key of key/value pair
+        :param value: object to assign to value of key/value pair
+
+        :return:      None
+        """
+        self.put_many([(key, value)])
+
+    def get(self, key: str) -> object:
+        """
+        Returns the value associated with the given key.
+
+        :param key: key to find value of
+
+        :return:    value if the key exists in the hash map
+                    None otherwise
+        """
+        return self.get_many([key]).get_at_index(0)
+
+    def contains_key(self, key: str) -> bool:
+        """
+        Determines if the given key is in the hash map.
+
+        :param key: key to analyze if it exists in the hash map
+
+        :return:    True if the key exists in the hash map
+                    False otherwise
+        """
+        return self.contains_many([key]).get_at_index(0)
+
+    def remove(self, key: str) -> None:
+        """
+        Removes the given key and its value from the hash map. Does nothing
+        if the key does not exist.
+
+        :param key: key to remove from the hash map
+
+        :return:    None
+        """
+        self.remove_many([key])
+
+    def get_size(self) -> int:
+        """
+        Return size of map, summed over the shards
+        """
+        return sum(self._broadcast('size'))
+
+    def clear(self) -> None:
+        """
+        Clears the HashMap of every shard.
+
+        :return: None
+        """
+        self._broadcast('clear')
+
+    def get_keys_and_values(self) -> DynamicArray:
+        """
+        Returns a DynamicArray of all the key/value pairs in the hash map
+        in the form of tuples, shard by shard.
+
+        :return: DynamicArray of key/value tuples of every key/value pair
+                 in the hash map
+        """
+        new_array = DynamicArray()
+        for items in self._broadcast('items'):
+            for item in items:
+                new_array.append(item)
+        return new_array
+
+    def find_mode(self, source) -> tuple[DynamicArray, int]:
+        """
+        Finds the most often occurring value of a DynamicArray or any other
+        iterable of strings. The values are partitioned like keys, so every
+        distinct value is counted by exactly one shard; each shard reports
+        its own most frequent values and the highest of those win.
+
+        :param source: DynamicArray or iterable to determine mode of
+
+        :return:       a tuple of a DynamicArray of the most occurring value(s)
+                       and an integer declaring the frequency of the value(s)
+        """
+        if isinstance(source, DynamicArray):
+            source = as_list(source)
+        for batch in self._batches(source):
+            self._call('count', self._split(batch))
+        modes = DynamicArray()
+        frequency = 0
+        for values, count in self._broadcast('mode'):
+            if count > frequency:
+                modes = DynamicArray()
+                frequency = count
+            if count == frequency and count > 0:
+                for value in values:
+                    modes.append(value)
+        return (modes, frequency)
+
+# ------------------- BASIC TESTING ---------------------------------------- #
+
+
+if __name__ == "__main__":
+
+    def rejecting_hash(key: str) -> int:
+        """fnv1a for every key except 'bad', which it rejects."""
+        if key == 'bad':
+            raise ValueError("rejected key 'bad'")
+        return fnv1a(key)
+
+    print("\nput_many / get_many example 1")
+    print("-----------------------------")
+    with ShardedHashMap(4, fnv1a) as m:
+        m.put_many(('str' + str(i), i * 100) for i in range(1000))
+        print(m.get_size(), m.get('str7'), m.contains_key('str999'), m.contains_key('str1000'))
+        values = m.get_many(['str1', 'missing', 'str2'])
+        print(values.get_at_index(0), values.get_at_index(1), values.get_at_index(2))
+        m.remove_many('str' + str(i) for i in range(0, 1000, 2))
+        m.put('str1', 'one')
+        print(m.get_size(), m.get('str2'), m.get('str1'))
+
+    print("\nfind_mode example 1")
+    print("-------------------")
+    with ShardedHashMap(3, map_type='oa') as m:
+        test_cases = (
+            ["Arch", "Manjaro", "Manjaro", "Mint", "Mint", "Mint", "Ubuntu", "Ubuntu", "Ubuntu"],
+            ["one", "two", "three", "four", "five"],
+            ["2", "4", "2", "6", "8", "4", "1", "3", "4", "5", "7", "3", "3", "2"]
+        )
+        for case in test_cases:
+            mode, frequency = m.find_mode(case)
+            print(f"Input: {case}\nMode : {sorted(mode.get_at_index(i) for i in range(mode.length()))}, Frequency: {frequency}\n")
+
+    print("\nfailing batch example 1")
+    print("-----------------------")
+    # the shard that owns 'bad' fails the batch while the others succeed;
+    # their answers must not be taken for the answers to the next request
+    with ShardedHashMap(4, rejecting_hash) as m:
+        try:
+            m.put_many([('bad', -1)] + [('str' + str(i), i) for i in range(100)])
+        except ValueError as error:
+            print(error)
+        values = [m.get_many(['str' + str(i) for i in range(100)]).get_at_index(i)
+                  for i in range(100)]
+        print(all(value in (i, None) for i, value in enumerate(values)),
+              m.get_size() == sum(value is not None for value in values))
+        m.put_many(('str' + str(i), i) for i in range(100))
+        print(m.get_size(), m.get('str42'))
@@ -0,0 +1,154 @@
+# Name: Blake Jennings
+# Email: blakej94@gmail.com
+# Description: A read-only open addressing hash map that lives in a
+#              multiprocessing.shared_memory block. One process builds it,
+#              and any number of processes attach to it by name and look
+#              keys up in place, so the table is stored once instead of once
+#              per worker.
+
+import multiprocessing
+from multiprocessing import resource_tracker, shared_memory
+
+from hashing import fnv1a
+from packed_table import PackedBuilder, PackedHashMap
+
+
+def _attach(name: str) -> shared_memory.SharedMemory:
+    """
+    Opens an existing shared memory block without making this process
+    responsible for unlinking it; only the builder unlinks the table.
+
+    :param name: name of the block
+
+    :return:     the SharedMemory object
+    """
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        pass
+    # Python before 3.13 always registers the block with the resource
+    # tracker. Children started by multiprocessing share the builder's
+    # tracker, where the block is registered already, but any other process
+    # has its own tracker, which would unlink the block when it exits.
+    block = shared_memory.SharedMemory(name=name)
+    if multiprocessing.parent_process() is None:
+        resource_tracker.unregister(block._name, 'shared_memory')
+    return block
+
+
+class SharedHashMap(PackedHashMap):
+    def __init__(self, block: shared_memory.SharedMemory, owner: bool) -> None:
+        """
+        Initialize a SharedHashMap over a shared memory block that holds a
+        packed table. Use build to create one and attach to open it in
+        another process.
+        """
+        super().__init__(block.buf)
+        self._block = block
+        self._owner = owner
+
+    @classmethod
+    def build(cls, items, function=fnv1a, name: str = None) -> "SharedHashMap":
+        """
+        Builds a new shared table from an iterable of key/value pairs. Later
+        pairs overwrite earlier ones with the same key. Values can be bytes,
+        str, int, float, bool or None. The function has to be one every
+        process resolves the same way: hash_function_1, hash_function_2,
+        fnv1a, xx_hash or a seeded_hash function.
+
+        :param items:    iterable of key/value tuples
+        :param function: hash function of the table
+        :param name:     name of the shared memory block, chosen by the
+                         system if None
+
+        :return:         the new SharedHashMap, which owns the block
+        """
+        builder = PackedBuilder(items, function)
+        block = shared_memory.SharedMemory(name=name, create=True, size=builder.size)
+        builder.write(block.buf)
+        return cls(block, True)
+
+    @classmethod
+    def attach(cls, name: str) -> "SharedHashMap":
+        """
+        Opens a shared table built by another process.
+
+        :param name: name of the shared memory block
+
+        :return:     the SharedHashMap, which does not own the block
+        """
+        return cls(_attach(name), False)
+
+    @property
+    def name(self) -> str:
+        """Name to attach to the table from other processes."""
+        return self._block.name
+
+    def __enter__(self) -> "SharedHashMap":
+        """Return the map for use in a with statement."""
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        """Close the map, and unlink it if this process built it."""
+        self.close()
+        if self._owner:
+            self.unlink()
+
+    def close(self) -> None:
+        """
+        Detaches this process from the table. bytes values returned by get
+        are views of the shared memory and must be released first.
+
+        :return: None
+        """
+        super().close()
+        self._block.close()
+
+    def unlink(self) -> None:
+        """
+        Frees the shared memory once every process has closed it. Only the
+        process that built the table should call it.
+
+        :return: None
+        """
+        self._block.unlink()
+
+
+def _worker(name: str, keys: list, queue) -> None:
+    """Attach to a shared table in a child process and report lookups."""
+    m = SharedHashMap.attach(name)
+    found = [m.get(key) for key in keys]
+    queue.put([bytes(value) if isinstance(value, memoryview) else value
+               for value in found])
+    del found
+    m.close()
+
+# ------------------- BASIC TESTING ---------------------------------------- #
+
+
+if __name__ == "__main__":
+
+    print("\nbuild / get example 1")
+    print("---------------------")
+    items = [('str' + str(i), i * 100) for i in range(150)]
+    items += [('name', 'shared'), ('blob', b'\x00\x01\x02'), ('pi', 3.25),
+              ('flag', True), ('nothing', None), ('str7', 'updated')]
+    with SharedHashMap.build(items) as m:
+        print(m.get_size(), m.get_capacity(), round(m.table_load(), 2))
+        print(m.get('str8'), m.get('str7'), m.get('name'), m.get('pi'), m.get('flag'))
+        blob = m.get('blob')
+        print(type(blob).__name__, bytes(blob), m.contains_key('nothing'), m.contains_key('str150'))
+        blob.release()
+
+        print("\nattach from other processes")
+        print("---------------------------")
+        queue = multiprocessing.Queue()
+        keys = ['str0', 'str149', 'name', 'blob', 'missing']
+        workers = [multiprocessing.Process(target=_worker, args=(m.name, keys, queue))
+                   for _ in range(3)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            print(queue.get())
+        for worker in workers:
+            worker.join()
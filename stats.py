@@ -0,0 +1,337 @@
+# Name: Blake Jennings
+# Email: blakej94@gmail.com
+# Description: Opt-in telemetry for either hash map. enable_stats hands one
+#              map instance a MapStats, which its probe loops report to as
+#              they run, and replaces its hash function and resize methods
+#              with measuring wrappers; maps without stats only pay a None
+#              check per lookup or insert. It records how many buckets or
+#              chain nodes each lookup and insert examines, how often the
+#              table is resized, how long that takes and how much it moves,
+#              and how long the hash function takes per call. Snapshots can
+#              be read as a dict, exported in the Prometheus text format or
+#              handed to a callback.
+
+import sys
+import time
+from bisect import bisect_left
+
+import hash_map_oa
+from a6_include import HashEntry, SLNode
+
+# upper bounds of the histogram buckets, the last one being unbounded
+BOUNDS = (0, 1, 2, 3, 4, 6, 8, 12, 16, 24, 32, 48, 64)
+
+# methods replaced on the instance while stats are enabled
+_WRAPPED = ('resize_table', '_resize')
+
+
+class Histogram:
+    """
+    Counts of observed values by bucket, along with their sum and count
+    """
+
+    def __init__(self, bounds: tuple = BOUNDS) -> None:
+        """Initialize an empty histogram with the given bucket upper bounds."""
+        self.bounds = bounds
+        self.counts = [0]*(len(bounds)+1)
+        self.sum = 0
+        self.count = 0
+
+    def observe(self, value: int) -> None:
+        """Count a value in the first bucket whose upper bound is not below it."""
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def mean(self) -> float:
+        """Return the mean of the observed values."""
+        return self.sum/self.count if self.count else 0.0
+
+    def to_dict(self) -> dict:
+        """Return the counts by upper bound, 'inf' for the last bucket."""
+        counts = dict(zip(self.bounds, self.counts))
+        counts['inf'] = self.counts[-1]
+        return {'buckets': counts, 'sum': self.sum, 'count': self.count,
+                'mean': self.mean()}
+
+
+class MapStats:
+    """
+    Measurements of one hash map, recorded by its probe loops and by the
+    wrappers of enable_stats
+    """
+
+    def __init__(self, hash_map, function, callback, every: int) -> None:
+        """Initialize empty measurements of the given map."""
+        self._map = hash_map
+        self._function = function
+        self._callback = callback
+        self._every = every
+        self._open_addressing = isinstance(hash_map, hash_map_oa.HashMap)
+        # entries and nodes have __slots__, so getsizeof covers all of them
+        self._entry_bytes = sys.getsizeof(HashEntry(None, None) if self._open_addressing
+                                          else SLNode(None, None))
+        self._resizing = False
+
+        self.lookups = Histogram()
+        self.inserts = Histogram()
+        self.resizes = 0
+        self.resize_seconds = 0.0
+        self.resize_entries = 0
+        self.resize_bytes = 0
+        self.hash_calls = 0
+        self.hash_seconds = 0.0
+
+    def lookup(self, probes: int) -> None:
+        """
+        Records the buckets or chain nodes examined by a lookup, which
+        includes the search of a remove, and hands a snapshot to the
+        callback every `every` lookups.
+
+        :param probes: number of buckets or chain nodes examined
+
+        :return:       None
+        """
+        self.lookups.observe(probes)
+        if self._callback is not None and self.lookups.count % self._every == 0:
+            self._callback(self.snapshot())
+
+    def insert(self, probes: int) -> None:
+        """
+        Records the buckets or chain nodes examined by a put.
+
+        :param probes: number of buckets or chain nodes examined
+
+        :return:       None
+        """
+        self.inserts.observe(probes)
+
+    def _chains(self) -> Histogram:
+        """Return a histogram of the chain lengths of a separate chaining map."""
+        chains = Histogram()
+        m = self._map
+        tables = [(m._buckets, 0, m._buckets.length())]
+        if m._old_buckets is not None:
+            tables.append((m._old_buckets, m._rehash_index, m._old_capacity))
+        for buckets, start, end in tables:
+            for ind in range(start, end):
+                link = buckets.get_at_index(ind)
+                chains.observe(0 if link is None else link.length())
+        return chains
+
+    def snapshot(self) -> dict:
+        """
+        Returns the current measurements: the size, capacity and load of the
+        map, the probe length histograms of lookups and puts, resize count,
+        time, entries and approximate bytes moved, and hash function calls
+        and time. Open addressing maps add their tombstone ratio; separate
+        chaining maps add a histogram of their chain lengths, which takes a
+        pass over the buckets.
+
+        :return: dict of the measurements
+        """
+        m = self._map
+        snapshot = {
+            'size': m.get_size(),
+            'capacity': m.get_capacity(),
+            'load': m.table_load(),
+            'lookup_probes': self.lookups.to_dict(),
+            'insert_probes': self.inserts.to_dict(),
+            'resizes': self.resizes,
+            'resize_seconds': self.resize_seconds,
+            'resize_entries': self.resize_entries,
+            'resize_bytes': self.resize_bytes,
+            'hash_calls': self.hash_calls,
+            'hash_seconds': self.hash_seconds,
+            'hash_seconds_per_call':
+                self.hash_seconds/self.hash_calls if self.hash_calls else 0.0,
+        }
+        if self._open_addressing:
+            snapshot['tombstone_ratio'] = m._tombstones/m.get_capacity()
+        else:
+            snapshot['chain_lengths'] = self._chains().to_dict()
+        return snapshot
+
+    def prometheus(self, prefix: str = 'hashmap', labels: dict = None) -> str:
+        """
+        Returns the measurements in the Prometheus text exposition format.
+
+        :param prefix: prefix of every metric name
+        :param labels: labels to attach to every sample, such as the name
+                       of the map
+
+        :return:       exposition text, ending with a newline
+        """
+        pairs = [f'{name}="{value}"' for name, value in (labels or {}).items()]
+        snapshot = self.snapshot()
+        lines = []
+
+        def sample(name: str, value: object, extra: str = None) -> None:
+            label = ','.join(pairs+([extra] if extra else []))
+            lines.append(f'{prefix}_{name}{{{label}}} {value}' if label
+                         else f'{prefix}_{name} {value}')
+
+        def metric(name: str, kind: str, description: str, value: object) -> None:
+            lines.append(f'# HELP {prefix}_{name} {description}')
+            lines.append(f'# TYPE {prefix}_{name} {kind}')
+            sample(name, value)
+
+        def histogram(name: str, description: str, values: Histogram) -> None:
+            lines.append(f'# HELP {prefix}_{name} {description}')
+            lines.append(f'# TYPE {prefix}_{name} histogram')
+            total = 0
+            for bound, count in zip(values.bounds+('+Inf',), values.counts):
+                total += count
+                sample(name + '_bucket', total, f'le="{bound}"')
+            sample(name + '_sum', values.sum)
+            sample(name + '_count', values.count)
+
+        metric('size', 'gauge', 'Key/value pairs in the map.', snapshot['size'])
+        metric('capacity', 'gauge', 'Buckets in the table.', snapshot['capacity'])
+        metric('load', 'gauge', 'Size divided by capacity.', snapshot['load'])
+        histogram('lookup_probes', 'Buckets or chain nodes examined per lookup.',
+                  self.lookups)
+        histogram('insert_probes', 'Buckets or chain nodes examined per put.',
+                  self.inserts)
+        if self._open_addressing:
+            metric('tombstone_ratio', 'gauge', 'Tombstones divided by capacity.',
+                   snapshot['tombstone_ratio'])
+        else:
+            histogram('chain_length', 'Nodes per bucket.', self._chains())
+        metric('resizes_total', 'counter', 'Table resizes.', self.resizes)
+        metric('resize_seconds_total', 'counter', 'Time spent resizing.',
+               self.resize_seconds)
+        metric('resize_entries_total', 'counter', 'Entries moved by resizes.',
+               self.resize_entries)
+        metric('resize_bytes_total', 'counter',
+               'Approximate bytes of entries and tables moved by resizes.',
+               self.resize_bytes)
+        metric('hash_calls_total', 'counter', 'Hash function calls.', self.hash_calls)
+        metric('hash_seconds_total', 'counter', 'Time spent in the hash function.',
+               self.hash_seconds)
+        return '\n'.join(lines) + '\n'
+
+
+def enable_stats(hash_map, callback: callable = None, every: int = 10_000) -> MapStats:
+    """
+    Starts recording measurements of a map: its probe loops report the
+    buckets or chain nodes each lookup and put examines to the returned
+    MapStats, and its hash function, resize_table and _resize are wrapped
+    on the instance to time them. Batch lookups hash key by key while the
+    hash function is wrapped, so stats slow the map down while they are
+    enabled.
+
+    :param hash_map: separate chaining or open addressing HashMap
+    :param callback: function called with a snapshot every `every` lookups
+    :param every:    number of lookups between callbacks
+
+    :return:         MapStats of the map
+    """
+    if hash_map._stats is not None:
+        raise ValueError("stats are already enabled for this map")
+    function = hash_map._hash_function
+    stats = MapStats(hash_map, function, callback, every)
+    resize_table = hash_map.resize_table
+    resize = hash_map._resize
+
+    def timed_hash(key: str) -> int:
+        start = time.perf_counter()
+        hash = function(key)
+        stats.hash_seconds += time.perf_counter()-start
+        stats.hash_calls += 1
+        return hash
+
+    def timed(method):
+        def timed_resize(new_capacity: int) -> None:
+            # automatic resizes call resize_table, which is only counted once
+            if stats._resizing:
+                method(new_capacity)
+                return
+            stats._resizing = True
+            entries = hash_map.get_size()
+            start = time.perf_counter()
+            try:
+                method(new_capacity)
+            finally:
+                stats._resizing = False
+            stats.resize_seconds += time.perf_counter()-start
+            stats.resizes += 1
+            stats.resize_entries += entries
+            stats.resize_bytes += entries*stats._entry_bytes+8*hash_map.get_capacity()
+        return timed_resize
+
+    hash_map._stats = stats
+    hash_map._hash_function = timed_hash
+    hash_map.resize_table = timed(resize_table)
+    hash_map._resize = timed(resize)
+    return stats
+
+
+def disable_stats(hash_map) -> None:
+    """
+    Stops recording measurements of a map and puts its own hash function
+    and methods back.
+
+    :param hash_map: map passed to enable_stats
+
+    :return:         None
+    """
+    stats = hash_map._stats
+    if stats is None:
+        return
+    hash_map._stats = None
+    hash_map._hash_function = stats._function
+    for name in _WRAPPED:
+        del vars(hash_map)[name]
+
+
+def stats(hash_map) -> dict:
+    """
+    Returns a snapshot of the measurements of a map with stats enabled.
+
+    :param hash_map: map passed to enable_stats
+
+    :return:         dict of the measurements, see MapStats.snapshot
+    """
+    if hash_map._stats is None:
+        raise ValueError("stats are not enabled for this map")
+    return hash_map._stats.snapshot()
+
+# ------------------- BASIC TESTING ---------------------------------------- #
+
+
+if __name__ == "__main__":
+    import hash_map_sc
+    from a6_include import hash_function_1
+    from hashing import fnv1a
+
+    print("\nseparate chaining stats example 1")
+    print("---------------------------------")
+    m = hash_map_sc.HashMap(11, hash_function_1)
+    enable_stats(m)
+    for i in range(1000):
+        m.put('str' + str(i), i)
+    for i in range(2000):
+        m.get('str' + str(i))
+    snapshot = stats(m)
+    print(snapshot['size'], snapshot['capacity'], snapshot['resizes'], snapshot['hash_calls'])
+    print(snapshot['lookup_probes']['count'], round(snapshot['lookup_probes']['mean'], 2),
+          snapshot['insert_probes']['count'], snapshot['chain_lengths']['count'])
+    disable_stats(m)
+    print('resize_table' in vars(m), m._hash_function is hash_function_1, m.get('str7'))
+
+    print("\nopen addressing stats example 1")
+    print("-------------------------------")
+    m = hash_map_oa.HashMap(11, fnv1a)
+    reports = []
+    enable_stats(m, reports.append, every=500)
+    for i in range(1000):
+        m.put('str' + str(i), i)
+    for i in range(0, 1000, 3):
+        m.remove('str' + str(i))
+    for i in range(1000):
+        m.contains_key('str' + str(i))
+    snapshot = stats(m)
+    print(snapshot['resizes'], snapshot['resize_entries'], round(snapshot['tombstone_ratio'], 3),
+          snapshot['lookup_probes']['count'], snapshot['insert_probes']['count'], len(reports))
+    print(m._stats.prometheus(labels={'map': 'tokens'}).splitlines()[:8])
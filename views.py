@@ -0,0 +1,80 @@
+# Name: Blake Jennings
+# Email: blakej94@gmail.com
+# Description: Lazy keys, values and items views over either hash map. The
+#              views walk the buckets of the map with a generator each time
+#              they are iterated, so nothing is copied, and they always
+#              reflect the current contents of the map.
+
+
+class _View:
+    """
+    Base class of the views. The map only has to provide get_size,
+    contains_key, get and an iterator over its live nodes or entries,
+    each with a key and a value attribute.
+    """
+
+    def __init__(self, hash_map) -> None:
+        """Initialize a view of the given hash map."""
+        self._map = hash_map
+
+    def __len__(self) -> int:
+        """Return the number of key/value pairs in the map."""
+        return self._map.get_size()
+
+    def __str__(self) -> str:
+        """Override string method to provide more readable output."""
+        return type(self).__name__ + '(' + str(list(self)) + ')'
+
+    __repr__ = __str__
+
+
+class KeysView(_View):
+    """
+    View of the keys of a hash map
+    """
+
+    def __iter__(self):
+        """Generate every key of the map."""
+        for entry in self._map:
+            yield entry.key
+
+    def __contains__(self, key: str) -> bool:
+        """Determine if the key is in the map with a single lookup."""
+        return self._map.contains_key(key)
+
+
+class ValuesView(_View):
+    """
+    View of the values of a hash map
+    """
+
+    def __iter__(self):
+        """Generate every value of the map."""
+        for entry in self._map:
+            yield entry.value
+
+    def __contains__(self, value: object) -> bool:
+        """Determine if any key of the map has the value, scanning the map."""
+        for entry in self._map:
+            if entry.value is value or entry.value == value:
+                return True
+        return False
+
+
+class ItemsView(_View):
+    """
+    View of the key/value pairs of a hash map, as tuples
+    """
+
+    def __iter__(self):
+        """Generate a key/value tuple for every pair of the map."""
+        for entry in self._map:
+            yield (entry.key, entry.value)
+
+    def __contains__(self, item: tuple) -> bool:
+        """Determine if the key is in the map with the given value."""
+        key, value = item
+        if not self._map.contains_key(key):
+            return False
+        found = self._map.get(key)
+        return found is value or found == value
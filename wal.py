@@ -0,0 +1,525 @@
+# Name: Blake Jennings
+# Email: blakej94@gmail.com
+# Description: An append-only write-ahead log and a separate chaining hash
+#              map that logs every put and remove to it, so its contents
+#              survive a crash. Records are fsynced in groups once enough
+#              bytes or time have accumulated, the log is replayed through
+#              put_many on startup and it can be compacted down to the live
+#              key/value pairs.
+#
+#              Every record is a header of operation (u8), payload length
+#              (u32) and CRC-32 of the payload (u32), all little-endian,
+#              followed by the pickled payload: (key, value) for a put, the
+#              key for a remove and nothing for a clear.
+
+import os
+import pickle
+import threading
+import time
+import zlib
+from struct import Struct
+
+from a6_include import hash_function_1
+from hash_map_sc import HashMap
+
+# Operations
+PUT = 1
+REMOVE = 2
+CLEAR = 3
+
+_RECORD = Struct('<BII')
+
+
+class WriteAheadLog:
+    """
+    Append-only log file of put, remove and clear records with group commit
+    """
+
+    def __init__(self, path: str, sync_bytes: int = 64*1024,
+                 sync_interval: float = 0.01) -> None:
+        """
+        Open the log at the given path, creating it if needed. Appended
+        records are written to the file right away, but only fsynced once
+        sync_bytes bytes have been appended or sync_interval seconds have
+        passed since the last fsync, whichever comes first; a crash can lose
+        the records appended since then. sync_bytes=0 fsyncs every record.
+        The interval is kept by a flusher thread that commits pending records
+        even if nothing else is appended; sync_interval=None leaves it to
+        appends and explicit commits.
+        """
+        self._path = path
+        self._sync_bytes = sync_bytes
+        self._sync_interval = sync_interval
+        self._file = open(path, 'ab')
+        self._pending = 0
+        self._last_sync = time.monotonic()
+
+        # the flusher commits from a thread of its own, so every use of the
+        # file and of the pending count holds the lock; it sleeps on the
+        # condition until records are pending and their interval is up
+        self._lock = threading.RLock()
+        self._pending_records = threading.Condition(self._lock)
+        self._flusher = None
+        if sync_interval is not None:
+            self._flusher = threading.Thread(target=self._flush_loop, daemon=True)
+            self._flusher.start()
+
+        # counters
+        self.records = 0
+        self.fsyncs = 0
+        self.bytes_written = 0
+        self.logical_bytes = 0
+
+    def append(self, operation: int, payload: object = None) -> None:
+        """
+        Append a record and commit the group if it is large or old enough.
+
+        :param operation: PUT, REMOVE or CLEAR
+        :param payload:   (key, value) for a put, the key for a remove,
+                          None for a clear
+
+        :return:          None
+        """
+        self.extend(operation, [payload])
+
+    def extend(self, operation: int, payloads: list) -> None:
+        """
+        Append one record per payload, all with the same operation, and
+        commit the group if it is large or old enough. Every payload is
+        pickled before anything is written, so a payload that cannot be
+        pickled leaves the log unchanged.
+
+        :param operation: PUT, REMOVE or CLEAR
+        :param payloads:  list of payloads, as for append
+
+        :return:          None
+        """
+        records = []
+        logical = 0
+        for payload in payloads:
+            data = b'' if payload is None else pickle.dumps(payload, pickle.HIGHEST_PROTOCOL)
+            records.append(_RECORD.pack(operation, len(data), zlib.crc32(data)))
+            records.append(data)
+            logical += len(data)
+        data = b''.join(records)
+        with self._lock:
+            self._file.write(data)
+            self.records += len(payloads)
+            self.logical_bytes += logical
+            self.bytes_written += len(data)
+            self._pending += len(data)
+            if self._sync_interval is None:
+                if self._pending >= self._sync_bytes:
+                    self.commit()
+            elif self._pending >= self._sync_bytes or \
+                    time.monotonic()-self._last_sync >= self._sync_interval:
+                self.commit()
+            else:
+                self._pending_records.notify()
+
+    def _flush_loop(self) -> None:
+        """
+        Body of the flusher thread: commit pending records once the sync
+        interval has passed since the last fsync, until the log is closed.
+        """
+        with self._lock:
+            while not self._file.closed:
+                if self._pending == 0:
+                    self._pending_records.wait()
+                    continue
+                delay = self._last_sync+self._sync_interval-time.monotonic()
+                if delay > 0:
+                    self._pending_records.wait(delay)
+                else:
+                    self.commit()
+
+    def commit(self) -> None:
+        """
+        Flush and fsync every record appended so far.
+
+        :return: None
+        """
+        with self._lock:
+            if self._pending == 0:
+                return
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self.fsyncs += 1
+            self._pending = 0
+            self._last_sync = time.monotonic()
+
+    def close(self) -> None:
+        """
+        Commit the pending records, close the log and stop the flusher.
+
+        :return: None
+        """
+        with self._lock:
+            self.commit()
+            self._file.close()
+            self._pending_records.notify()
+        if self._flusher is not None:
+            self._flusher.join()
+
+    def replay(self):
+        """
+        Generator over the (operation, payload) records of the log file. A
+        record cut short by a crash, or one whose checksum does not match,
+        ends the log; it and anything after it are truncated away.
+
+        :return: generator of (operation, payload) tuples
+        """
+        self._file.flush()
+        good = 0
+        with open(self._path, 'rb') as file:
+            while True:
+                header = file.read(_RECORD.size)
+                if len(header) < _RECORD.size:
+                    break
+                operation, length, checksum = _RECORD.unpack(header)
+                data = file.read(length)
+                if len(data) < length or zlib.crc32(data) != checksum:
+                    break
+                good = file.tell()
+                yield operation, pickle.loads(data) if data else None
+        if good < os.path.getsize(self._path):
+            self._file.truncate(good)
+
+    def rewrite(self, items) -> None:
+        """
+        Replace the log with one put record per key/value pair. The new log
+        is written and fsynced next to the old one, then renamed over it, so
+        a crash leaves either the old or the new log in place.
+
+        :param items: iterable of key/value tuples
+
+        :return:      None
+        """
+        with self._lock:
+            self.commit()
+            temporary = self._path + '.tmp'
+            with open(temporary, 'wb') as file:
+                for item in items:
+                    data = pickle.dumps(item, pickle.HIGHEST_PROTOCOL)
+                    file.write(_RECORD.pack(PUT, len(data), zlib.crc32(data)))
+                    file.write(data)
+                    self.bytes_written += _RECORD.size+len(data)
+                file.flush()
+                os.fsync(file.fileno())
+            self.fsyncs += 1
+            self._file.close()
+            os.replace(temporary, self._path)
+            self._file = open(self._path, 'ab')
+
+    def size(self) -> int:
+        """
+        Return the size of the log file in bytes.
+        """
+        with self._lock:
+            self._file.flush()
+            return os.path.getsize(self._path)
+
+    def stats(self) -> dict:
+        """
+        Return the counters of the log, along with the fsyncs per thousand
+        records and the write amplification: bytes written to disk,
+        including record headers and compactions, per payload byte.
+        """
+        return {
+            'records': self.records,
+            'fsyncs': self.fsyncs,
+            'bytes_written': self.bytes_written,
+            'logical_bytes': self.logical_bytes,
+            'fsyncs_per_1k_ops': 1000*self.fsyncs/self.records if self.records else 0.0,
+            'write_amplification':
+                self.bytes_written/self.logical_bytes if self.logical_bytes else 0.0,
+        }
+
+
+class DurableHashMap(HashMap):
+    def __init__(self, path: str, function=hash_function_1,
+                 sync_bytes: int = 64*1024, sync_interval: float = 0.01,
+                 replay_batch: int = 4096, capacity: int = 11,
+                 **options) -> None:
+        """
+        Initialize a separate chaining HashMap whose puts and removes are
+        logged to a write-ahead log at the given path, puts before they are
+        applied and removes once they have removed a key. If the log already exists it is replayed first: runs of
+        puts are inserted replay_batch pairs at a time through put_many.
+        sync_bytes and sync_interval control the group commit of the log,
+        and the other arguments are passed on to HashMap.
+        """
+        super().__init__(capacity, function, **options)
+        self._log = WriteAheadLog(path, sync_bytes, sync_interval)
+        # logged records that could not be applied on replay
+        self.skipped = 0
+        batch = []
+        for operation, payload in self._log.replay():
+            if operation == PUT:
+                batch.append(payload)
+                if len(batch) >= replay_batch:
+                    self._replay_puts(batch)
+                    batch = []
+                continue
+            self._replay_puts(batch)
+            batch = []
+            try:
+                if operation == REMOVE:
+                    super().remove(payload)
+                else:
+                    super().clear()
+            except Exception:
+                self.skipped += 1
+        self._replay_puts(batch)
+
+    def _replay_puts(self, batch: list) -> None:
+        """
+        Applies a run of logged puts with a single put_many. If any of them
+        cannot be applied, such as a key the hash function rejects, the
+        run is put again pair by pair and the pairs that fail are skipped
+        and counted, so one bad record never keeps the log from opening.
+
+        :param batch: list of logged (key, value) payloads
+
+        :return:      None
+        """
+        try:
+            super().put_many(batch)
+        except Exception:
+            for payload in batch:
+                try:
+                    key, value = payload
+                    super().put(key, value)
+                except Exception:
+                    self.skipped += 1
+
+    @classmethod
+    def from_items(cls, items, path: str, function: callable = hash_function_1,
+                   capacity: int = 11, **options) -> "DurableHashMap":
+        """
+        Opens the DurableHashMap at the given path and adds an iterable of
+        key/value pairs to it with a single logged put_many.
+
+        :param items:    iterable of key/value tuples
+        :param path:     path of the write-ahead log
+        :param function: hash function for the new map
+        :param capacity: initial capacity for the new map
+        :param options:  any other DurableHashMap arguments
+
+        :return:         the new DurableHashMap
+        """
+        new_map = cls(path, function, capacity=capacity, **options)
+        new_map.put_many(items)
+        return new_map
+
+    @classmethod
+    def load(cls, fileobj, path: str, function: callable = hash_function_1,
+             **options) -> "DurableHashMap":
+        """
+        Opens the DurableHashMap at the given path and reads a snapshot
+        written by dump into it, as HashMap.load does. The pairs are not
+        logged one by one; the log is compacted afterwards instead, so it
+        records every pair of the map.
+
+        :param fileobj:  binary file object to read from
+        :param path:     path of the write-ahead log
+        :param function: hash function for the new map
+        :param options:  any other DurableHashMap arguments
+
+        :return:         the new DurableHashMap
+        """
+        new_map = super().load(fileobj, function, path=path, **options)
+        new_map.compact()
+        return new_map
+
+    def __enter__(self) -> "DurableHashMap":
+        """Return the map for use in a with statement."""
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        """Close the log at the end of a with statement."""
+        self.close()
+
+    def put(self, key: str, value: object) -> None:
+        """
+        Logs the key/value pair, then adds it to the HashMap. If the key
+        already exists, it updates the keys value to the new value. The key
+        is hashed before anything is logged, so a key the hash function
+        rejects raises without leaving a record behind.
+
+        :param key:   string to assign to key of key/value pair
+        :param value: object to assign to value of key/value pair
+
+        :return:      None
+        """
+        hash = self._hash_function(key)
+        self._log.append(PUT, (key, value))
+        self._put(key, value, hash)
+
+    def put_many(self, items) -> None:
+        """
+        Hashes the key of every key/value pair of an iterable, logs the
+        pairs, then adds them to the HashMap after a single resize. If any
+        key cannot be hashed, nothing is logged or added.
+
+        :param items: iterable of key/value tuples
+
+        :return:      None
+        """
+        items = list(items)
+        hashes = [self._hash_function(key) for key, _ in items]
+        self._log.extend(PUT, items)
+        self._reserve(len(items))
+        for (key, value), hash in zip(items, hashes):
+            self._insert(key, value, hash)
+
+    def remove(self, key: str) -> None:
+        """
+        Removes the given key, if it is in the HashMap, and logs the
+        removal. The key is looked up once; a key that is not there is
+        not logged.
+
+        :param key: key to remove from the hash map
+
+        :return:    None
+        """
+        if self._remove(key, self._hash_function(key)):
+            self._log.append(REMOVE, key)
+
+    def clear(self) -> None:
+        """
+        Logs and clears the contents of the hash map.
+
+        :return: None
+        """
+        self._log.append(CLEAR)
+        super().clear()
+
+    def commit(self) -> None:
+        """
+        Fsyncs every logged operation that has not been fsynced yet.
+
+        :return: None
+        """
+        self._log.commit()
+
+    def compact(self) -> None:
+        """
+        Rewrites the log from the live key/value pairs, dropping overwritten
+        values and removed keys.
+
+        :return: None
+        """
+        self._log.rewrite(self.items())
+
+    def close(self) -> None:
+        """
+        Commits and closes the log. The map cannot be changed afterwards.
+
+        :return: None
+        """
+        self._log.close()
+
+    def log_size(self) -> int:
+        """
+        Return the size of the log file in bytes.
+        """
+        return self._log.size()
+
+    def stats(self) -> dict:
+        """
+        Return the counters of the write-ahead log, along with the number
+        of logged records that were skipped on replay because they could
+        not be applied.
+        """
+        return dict(self._log.stats(), skipped=self.skipped)
+
+# ------------------- BASIC TESTING ---------------------------------------- #
+
+
+if __name__ == "__main__":
+    import io
+    import tempfile
+
+    print("\nlog / replay / compact example 1")
+    print("--------------------------------")
+    directory = tempfile.mkdtemp()
+    path = os.path.join(directory, 'map.wal')
+    m = DurableHashMap(path, sync_bytes=16*1024, sync_interval=1.0)
+    for i in range(1000):
+        m.put('str' + str(i), i * 100)
+    for i in range(0, 1000, 2):
+        m.remove('str' + str(i))
+    m.put('str1', 'updated')
+    stats = m.stats()
+    print(stats['records'], stats['fsyncs'], round(stats['fsyncs_per_1k_ops'], 2),
+          round(stats['write_amplification'], 2))
+    m.close()
+
+    # a crash in the middle of a record leaves a torn tail behind
+    with open(path, 'ab') as file:
+        file.write(_RECORD.pack(PUT, 100, 0) + b'torn')
+
+    m = DurableHashMap(path)
+    print(m.get_size(), m.get('str1'), m.get('str2'), m.get('str3'))
+    before = m.log_size()
+    m.compact()
+    print(before > m.log_size(), m.stats()['fsyncs'])
+    m.close()
+
+    m = DurableHashMap(path)
+    print(m.get_size(), m.get('str1'), m.get('str999'))
+    m.clear()
+    m.close()
+    print(DurableHashMap(path).get_size())
+
+    print("\ngroup commit by time example 1")
+    print("------------------------------")
+    # nothing is appended after the put, so only the flusher commits it
+    m = DurableHashMap(os.path.join(directory, 'idle.wal'), sync_bytes=1 << 20,
+                       sync_interval=0.05)
+    m.put('key1', 10)
+    print(m.stats()['fsyncs'])
+    time.sleep(0.2)
+    print(m.stats()['fsyncs'])
+    m.close()
+
+    print("\nrejected key example 1")
+    print("----------------------")
+    path = os.path.join(directory, 'rejected.wal')
+    m = DurableHashMap(path)
+    m.put('key1', 10)
+    try:
+        m.put(123, 'x')
+    except TypeError:
+        print('rejected', m.stats()['records'], m.get_size())
+    try:
+        m.put_many([('key2', 20), (456, 'y')])
+    except TypeError:
+        print('rejected', m.stats()['records'], m.get_size())
+    m.close()
+
+    # a record that cannot be applied, as an older version could log, is
+    # skipped on replay instead of keeping the log from opening
+    log = WriteAheadLog(path)
+    log.extend(PUT, [(789, 'z'), ('key3', 30)])
+    log.close()
+    m = DurableHashMap(path)
+    print(m.get_size(), m.get('key1'), m.get('key3'), m.stats()['skipped'])
+    m.close()
+
+    print("\nfrom_items / load example 1")
+    print("---------------------------")
+    path = os.path.join(directory, 'built.wal')
+    m = DurableHashMap.from_items([('str' + str(i), i) for i in range(100)], path)
+    snapshot = io.BytesIO()
+    m.dump(snapshot)
+    m.close()
+    with DurableHashMap(path) as m:
+        print(m.get_size())
+    snapshot.seek(0)
+    path = os.path.join(directory, 'loaded.wal')
+    DurableHashMap.load(snapshot, path).close()
+    m = DurableHashMap(path)
+    print(m.get_size(), m.get('str42'), m.stats()['records'])
+    m.close()